@@ -0,0 +1 @@
+"""Performance benchmarks for the storage and warehouse code."""
@@ -0,0 +1,150 @@
+"""Benchmark latency percentiles of the sync and async serving modes.
+
+Both modes serve the same seeded SQLite file from a separate process:
+the WSGI app on Werkzeug's threaded server and the ASGI app on uvicorn.
+An asyncio client keeps ``concurrency`` requests in flight against the
+warehouse list and warehouse pages and reports latency percentiles. The
+page cache is off so every request reads the database. Needs the
+packages of the ASGI mode, see ``web.asgi``. Run from the ``src``
+directory::
+
+    python -m benchmarks.async_load [concurrency] [requests] [warehouses]
+"""
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from werkzeug.serving import run_simple
+from benchmarks.cache_throughput import seed_warehouses
+from web.app import create_app
+from web.models import db
+
+
+def server_config(uri):
+    """Return the app config both servers use."""
+    return {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'PROFILE': 'production',
+        'CACHE_BACKEND': None,
+    }
+
+
+def seed(uri, warehouses):
+    """Create the database file with warehouses and items."""
+    app = create_app(server_config(uri))
+    seed_warehouses(app, warehouses)
+    with app.app_context():
+        db.engine.dispose()
+
+
+def serve(mode, uri, port):
+    """Serve the app in the given mode until terminated."""
+    config = server_config(uri)
+    if mode == 'sync':
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        run_simple('127.0.0.1', port, create_app(config), threaded=True)
+    else:
+        # pylint: disable-next=import-outside-toplevel
+        import uvicorn
+        # pylint: disable-next=import-outside-toplevel
+        from web.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(config), host='127.0.0.1', port=port,
+                    log_level='warning')
+
+
+def free_port():
+    """Return a TCP port that is currently free."""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port, timeout=15.0):
+    """Wait until a server accepts connections on the port."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+async def fetch(port, path):
+    """Return the latency of one GET request on a new connection."""
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.0\r\nHost: localhost\r\n\r\n'.encode())
+    await writer.drain()
+    await reader.read()
+    writer.close()
+    return time.perf_counter() - started
+
+
+async def load(port, paths, concurrency):
+    """Request all paths with concurrency requests in flight.
+
+    Returns the latencies and the total wall time.
+    """
+    pending = iter(paths)
+    latencies = []
+
+    async def worker():
+        for path in pending:
+            latencies.append(await fetch(port, path))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - started
+
+
+def run_mode(mode, uri, paths, concurrency):
+    """Start a server in the given mode and load it with requests."""
+    port = free_port()
+    command = [sys.executable, '-m', 'benchmarks.async_load', 'serve',
+               mode, uri, str(port)]
+    with subprocess.Popen(command) as server:
+        try:
+            wait_until_listening(port)
+            return asyncio.run(load(port, paths, concurrency))
+        finally:
+            server.terminate()
+
+
+def report(mode, latencies, elapsed):
+    """Print throughput and latency percentiles of a run."""
+    cuts = statistics.quantiles(latencies, n=100)
+    p50, p90, p99 = (cuts[i] * 1000 for i in (49, 89, 98))
+    print(f'{mode:>5}: {len(latencies) / elapsed:7,.0f} req/sec  '
+          f'p50 {p50:7.1f} ms  p90 {p90:7.1f} ms  p99 {p99:7.1f} ms')
+
+
+def main(concurrency=100, count=2000, warehouses=200):
+    """Print latency percentiles of both serving modes."""
+    directory = tempfile.mkdtemp()
+    uri = f"sqlite:///{os.path.join(directory, 'load.db')}"
+    paths = [
+        f'/warehouse/{i % warehouses + 1}' if i % 2 else '/'
+        for i in range(count)
+    ]
+    try:
+        seed(uri, warehouses)
+        for mode in ('sync', 'async'):
+            report(mode, *run_mode(mode, uri, paths, concurrency))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['serve']:
+        serve(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(*(int(arg) for arg in sys.argv[1:4]))
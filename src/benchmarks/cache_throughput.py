@@ -0,0 +1,54 @@
+"""Benchmark page requests per second with the cache on and off.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.cache_throughput [warehouses] [requests]
+"""
+import sys
+import time
+from web.app import create_app
+from web.models import db, Warehouse, Item
+
+
+def build_app(backend, warehouses):
+    """Create an in-memory app with seeded warehouses and items."""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'CACHE_BACKEND': backend,
+    })
+    seed_warehouses(app, warehouses)
+    return app
+
+
+def seed_warehouses(app, warehouses):
+    """Insert warehouses with 20 items each."""
+    with app.app_context():
+        db.session.add_all(
+            Warehouse(name=f'Warehouse {i}', items=[
+                Item(name=f'Item {j}', quantity=j + 1) for j in range(20)
+            ])
+            for i in range(warehouses)
+        )
+        db.session.commit()
+
+
+def requests_per_second(app, url, count):
+    """Return GET requests per second for a URL."""
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get(url)
+    return count / (time.perf_counter() - start)
+
+
+def main(warehouses=200, count=500):
+    """Print requests per second for cached and uncached pages."""
+    for backend in (None, 'memory'):
+        app = build_app(backend, warehouses)
+        for url in ('/', '/warehouse/1'):
+            rate = requests_per_second(app, url, count)
+            print(f'{backend or "off":>6} {url:<13}: {rate:9,.0f} req/sec')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
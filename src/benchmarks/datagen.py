@@ -0,0 +1,50 @@
+"""Seeded synthetic warehouse data for the benchmarks.
+
+The same seed always produces the same warehouses and items. Item
+counts per warehouse follow a Pareto distribution, so a few warehouses
+hold most of the items as in real inventories, and the first warehouse
+is the busiest one.
+"""
+import random
+from web.models import db, Warehouse, Item
+
+ADJECTIVES = ('Red', 'Steel', 'Small', 'Large', 'Spare', 'Brass', 'Oak')
+NOUNS = ('Bolt', 'Nut', 'Hinge', 'Valve', 'Pipe', 'Gear', 'Spring', 'Cable')
+
+
+def warehouse_rows(rng, count):
+    """Return rows for count warehouses with random names."""
+    return [
+        {'id': number, 'name': f'{rng.choice(NOUNS)} depot {number}'}
+        for number in range(1, count + 1)
+    ]
+
+
+def item_names(rng, count):
+    """Return count random item names."""
+    return [
+        f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.randrange(1000)}'
+        for _ in range(count)
+    ]
+
+
+def item_rows(rng, warehouses, count):
+    """Return rows for count items spread over the warehouses."""
+    return [
+        {'name': name, 'quantity': rng.randrange(1, 500),
+         'warehouse_id': min(int(rng.paretovariate(1.2)), warehouses)}
+        for name in item_names(rng, count)
+    ]
+
+
+def seed_database(app, warehouses, items, seed=0):
+    """Insert the generated warehouses and items into the app database."""
+    rng = random.Random(seed)
+    with app.app_context():
+        db.session.execute(
+            Warehouse.__table__.insert(), warehouse_rows(rng, warehouses)
+        )
+        db.session.execute(
+            Item.__table__.insert(), item_rows(rng, warehouses, items)
+        )
+        db.session.commit()
@@ -0,0 +1,71 @@
+"""Benchmark item writes per second with and without group commit.
+
+Concurrent clients add items to a SQLite file with per-request commits,
+with group commit waiting for each batch and with group commit that
+acknowledges writes when they are queued. Run from the ``src``
+directory::
+
+    python -m benchmarks.group_commit [clients] [writes per client]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from web.app import create_app
+from web.models import db, Warehouse
+
+MODES = {
+    'per-request': {'GROUP_COMMIT': False},
+    'group wait': {'GROUP_COMMIT': True, 'GROUP_COMMIT_WAIT': True},
+    'group ack': {'GROUP_COMMIT': True, 'GROUP_COMMIT_WAIT': False},
+}
+
+
+def build_app(path, settings):
+    """Create an app on a fresh database file with one warehouse."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+                      **settings})
+    with app.app_context():
+        db.session.add(Warehouse(name='Benchmark'))
+        db.session.commit()
+    return app
+
+
+def add_items(app, writes):
+    """Add items through the web route, one request each."""
+    client = app.test_client()
+    for number in range(writes):
+        client.post('/warehouse/1/item/add',
+                    data={'name': f'Item {number}', 'quantity': '1'})
+
+
+def writes_per_second(app, clients, writes):
+    """Return writes per second of concurrent clients, all committed."""
+    threads = [threading.Thread(target=add_items, args=(app, writes))
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if 'group_commit' in app.extensions:
+        app.extensions['group_commit'].flush()
+    return clients * writes / (time.perf_counter() - start)
+
+
+def main(clients=16, writes=50):
+    """Print writes per second for each commit mode."""
+    directory = tempfile.mkdtemp()
+    try:
+        for number, (mode, settings) in enumerate(MODES.items()):
+            app = build_app(os.path.join(directory, f'{number}.db'), settings)
+            rate = writes_per_second(app, clients, writes)
+            print(f'{mode:>11}: {rate:8,.0f} writes/sec')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
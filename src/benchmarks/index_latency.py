@@ -0,0 +1,94 @@
+"""Benchmark item and warehouse query latency with and without indexes.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.index_latency [warehouses] [items_per_warehouse]
+"""
+import os
+import random
+import sys
+import tempfile
+import timeit
+from sqlalchemy import create_engine, text
+from web.models import db
+
+QUERIES = {
+    'index page': (
+        'SELECT id, name FROM warehouse ORDER BY name, id LIMIT 50', {}
+    ),
+    'warehouse items': (
+        'SELECT id, name, quantity FROM item WHERE warehouse_id = :w '
+        'ORDER BY id LIMIT 100', {'w': 1}
+    ),
+    'item name search': (
+        'SELECT id, quantity FROM item WHERE warehouse_id = :w '
+        "AND name LIKE 'Item 1%'", {'w': 1}
+    ),
+}
+
+
+def seed(engine, warehouses, items_per_warehouse):
+    """Fill the database with random warehouses and items."""
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(db.metadata.tables['warehouse'].insert(), [
+            {'id': i, 'name': f'Warehouse {rng.random():.12f}'}
+            for i in range(1, warehouses + 1)
+        ])
+        connection.execute(db.metadata.tables['item'].insert(), [
+            {'name': f'Item {rng.randrange(100_000)}',
+             'quantity': rng.randrange(1, 100),
+             'warehouse_id': rng.randrange(1, warehouses + 1)}
+            for _ in range(warehouses * items_per_warehouse)
+        ])
+
+
+def set_indexes(engine, enabled):
+    """Create or drop every model index."""
+    action = 'create' if enabled else 'drop'
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            getattr(index, action)(engine, checkfirst=True)
+
+
+def latencies(engine, repeat=20):
+    """Return the best latency in milliseconds of each query."""
+    results = {}
+    with engine.connect() as connection:
+        for label, (sql, params) in QUERIES.items():
+            statement = text(sql)
+            results[label] = min(timeit.repeat(
+                lambda s=statement, p=params: connection.execute(s, p).all(),
+                number=1, repeat=repeat
+            )) * 1000
+    return results
+
+
+def compare(path, warehouses, items_per_warehouse):
+    """Return query latencies without and with indexes."""
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        db.metadata.create_all(engine)
+        seed(engine, warehouses, items_per_warehouse)
+        set_indexes(engine, False)
+        before = latencies(engine)
+        set_indexes(engine, True)
+        return before, latencies(engine)
+    finally:
+        engine.dispose()
+
+
+def main(warehouses=10_000, items_per_warehouse=50):
+    """Seed a database and compare query latency before and after."""
+    handle, path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        before, after = compare(path, warehouses, items_per_warehouse)
+    finally:
+        os.remove(path)
+    for label, millis in before.items():
+        print(f'{label:>17}: {millis:9.3f} ms -> {after[label]:9.3f} ms')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,93 @@
+"""Benchmark item search latency on a large inventory.
+
+Millions of generated items are spread over the warehouses of a SQLite
+file, indexed a chunk at a time as bulk imports do, and typical
+searches are then timed for their first and a later page, with the
+totals of their item names. Run from the ``src`` directory::
+
+    python -m benchmarks.item_search [items] [warehouses]
+"""
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from benchmarks.datagen import item_rows, warehouse_rows
+from web.app import create_app
+from web.models import db, Warehouse, Item
+from web.search import deferred_indexing, index_pending, search_items
+
+CHUNK = 100_000
+SEARCHES = ('bolt', 'b', 'red bolt', 'steel 12', '123', 'spring', 'anvil')
+TARGET_MS = 10
+
+
+def seed_items(app, items, warehouses):
+    """Insert the warehouses and items in chunks of generated rows."""
+    rng = random.Random(0)
+    with app.app_context():
+        db.session.execute(
+            Warehouse.__table__.insert(), warehouse_rows(rng, warehouses)
+        )
+        for start in range(0, items, CHUNK):
+            with deferred_indexing():
+                db.session.execute(
+                    Item.__table__.insert(),
+                    item_rows(rng, warehouses, min(CHUNK, items - start))
+                )
+        index_pending()
+        db.session.commit()
+
+
+def build_app(path, items, warehouses):
+    """Create an app on a new database file holding the items."""
+    app = create_app({'PROFILE': 'production',
+                      'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    start = time.perf_counter()
+    seed_items(app, items, warehouses)
+    print(f'insert and index {items:,} items: '
+          f'{time.perf_counter() - start:6.1f} s')
+    return app
+
+
+def search_latencies(app, text, after, repeat=20):
+    """Return the latencies in milliseconds of a warmed up search page."""
+    latencies = []
+    with app.app_context():
+        search_items(text, after, app.config['SEARCH_RESULTS_PER_PAGE'])
+        for _ in range(repeat):
+            start = time.perf_counter()
+            search_items(text, after, app.config['SEARCH_RESULTS_PER_PAGE'])
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def report(app, text, after):
+    """Print the latencies of a search page and return the slowest."""
+    latencies = search_latencies(app, text, after)
+    print(f'{text!r:>12} after {after:>9,}: '
+          f'p50 {statistics.median(latencies):6.2f} ms, '
+          f'max {max(latencies):6.2f} ms')
+    return max(latencies)
+
+
+def main(items=2_000_000, warehouses=1000):
+    """Print search latencies and whether they stay under the target."""
+    directory = tempfile.mkdtemp()
+    try:
+        app = build_app(os.path.join(directory, 'search.db'), items,
+                        warehouses)
+        worst = max(
+            report(app, text, after)
+            for text in SEARCHES for after in (0, items // 2)
+        )
+        verdict = 'under' if worst < TARGET_MS else 'OVER'
+        print(f'slowest search {worst:.2f} ms, {verdict} {TARGET_MS} ms')
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
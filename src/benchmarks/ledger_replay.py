@@ -0,0 +1,72 @@
+"""Benchmark replaying the storage ledger.
+
+A log of alternating additions and takes over many storages is written
+directly in the ledger's binary format. Opening it replays every event
+from the memory-mapped log and writes the snapshots, and point-in-time
+queries then load a snapshot and replay at most one snapshot period.
+Run from the ``src`` directory::
+
+    python -m benchmarks.ledger_replay [events] [storages] [period]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from tilikirja import Tilikirja, TAPAHTUMA, LUONTI, LISAYS, OTTO
+
+CHUNK = 1_000_000
+
+
+def write_log(path, events, storages):
+    """Write a log creating the storages and then adding and taking."""
+    with open(path, 'wb') as log:
+        log.write(b''.join(
+            TAPAHTUMA.pack(number, number, LUONTI, 100.0)
+            for number in range(storages)
+        ))
+        for start in range(storages, events, CHUNK):
+            log.write(b''.join(
+                TAPAHTUMA.pack(number, number % storages,
+                               LISAYS if number // storages % 2 else OTTO,
+                               1.0)
+                for number in range(start, min(start + CHUNK, events))
+            ))
+
+
+def replay_rate(directory, events, period):
+    """Open the ledger, replaying its log, and return it and events/sec."""
+    start = time.perf_counter()
+    ledger = Tilikirja(directory, period)
+    return ledger, events / (time.perf_counter() - start)
+
+
+def query_time(ledger, events, count=20):
+    """Return the mean time of rebuilding the state at random times."""
+    moments = random.Random(1).sample(range(events), count)
+    start = time.perf_counter()
+    for moment in moments:
+        ledger.tilanne(moment)
+    return (time.perf_counter() - start) / count
+
+
+def main(events=20_000_000, storages=1000, period=1_000_000):
+    """Print replay throughput and point-in-time query latency."""
+    directory = tempfile.mkdtemp()
+    try:
+        start = time.perf_counter()
+        write_log(os.path.join(directory, 'tapahtumat.log'), events, storages)
+        print(f'write {events:,} events: '
+              f'{time.perf_counter() - start:6.2f} s')
+        ledger, rate = replay_rate(directory, events, period)
+        print(f'full replay: {rate:12,.0f} events/sec\n'
+              f'state at time T: {query_time(ledger, events) * 1000:8.1f} '
+              'ms per query')
+        ledger.sulje()
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,57 @@
+"""Benchmark allocating large orders against growing inventories.
+
+An order of many lines, each asking for a random quantity of an item
+name in stock, is fulfilled from inventories of increasing size spread
+over the same warehouses. Each line finds its items through the item
+name index, so allocation time should stay nearly flat as the inventory
+grows. Run from the ``src`` directory::
+
+    python -m benchmarks.order_fulfillment [lines] [warehouses]
+"""
+import random
+import sys
+import time
+from sqlalchemy import select
+from benchmarks.item_search import seed_items
+from web.app import create_app
+from web.fulfillment import fulfill_order
+from web.models import db, Item
+
+INVENTORIES = (10_000, 100_000, 1_000_000)
+
+
+def order_lines(items, lines, seed=1):
+    """Return order lines for the names of randomly chosen items."""
+    rng = random.Random(seed)
+    names = db.session.scalars(
+        select(Item.name)
+        .where(Item.id.in_(rng.sample(range(1, items + 1), lines)))
+    ).all()
+    return [(name, rng.randrange(1, 1000)) for name in names]
+
+
+def allocation_time(items, lines, warehouses):
+    """Return seconds, lines and allocations of one order of lines."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    seed_items(app, items, warehouses)
+    with app.app_context():
+        order = order_lines(items, lines)
+        start = time.perf_counter()
+        result = fulfill_order(order)
+        elapsed = time.perf_counter() - start
+    return elapsed, len(result), sum(len(line.allocations) for line in result)
+
+
+def main(lines=10_000, warehouses=1000):
+    """Print the allocation time of an order at each inventory size."""
+    for items in INVENTORIES:
+        elapsed, names, allocations = allocation_time(
+            items, min(lines, items), warehouses
+        )
+        print(f'{items:>9,} items: {names:,} names, {allocations:,} '
+              f'allocations in {elapsed * 1000:8.1f} ms '
+              f'({elapsed / names * 1e6:5.1f} us per name)')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
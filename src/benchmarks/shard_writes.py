@@ -0,0 +1,83 @@
+"""Benchmark item writes per second against the number of shards.
+
+Worker processes, each running its own app as a web server worker
+would, add items to warehouses spread over every shard through the web
+route. With one shard every write waits for the same SQLite write lock,
+and each extra shard file adds a lock that writes can take in parallel.
+Writes only scale while there are CPUs for the workers to run on. Run
+from the ``src`` directory::
+
+    python -m benchmarks.shard_writes [workers] [writes per worker]
+"""
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from web.app import create_app
+
+SHARD_COUNTS = (1, 2, 4, 8)
+WAREHOUSES = 64
+
+
+def shard_config(directory, shards):
+    """Return the config of an app with the given number of shard files."""
+    uris = [f"sqlite:///{os.path.join(directory, f'{number}.db')}"
+            for number in range(shards)]
+    return {'PROFILE': 'production', 'CACHE_BACKEND': None,
+            'SQLALCHEMY_DATABASE_URI': uris[0],
+            'SHARD_DATABASE_URIS': tuple(uris[1:])}
+
+
+def create_warehouses(config):
+    """Create the warehouses, which the app spreads over the shards."""
+    client = create_app(config).test_client()
+    for number in range(WAREHOUSES):
+        client.post('/warehouse/create', data={'name': f'Depot {number}'})
+
+
+def add_items(config, writes, seed, barrier):
+    """Add items to random warehouses once every worker is ready."""
+    client = create_app(config).test_client()
+    rng = random.Random(seed)
+    barrier.wait()
+    for number in range(writes):
+        client.post(f'/warehouse/{rng.randint(1, WAREHOUSES)}/item/add',
+                    data={'name': f'Item {number}', 'quantity': '1'})
+
+
+def writes_per_second(config, workers, writes):
+    """Return the writes per second of concurrent worker processes."""
+    barrier = multiprocessing.Barrier(workers + 1)
+    processes = [
+        multiprocessing.Process(target=add_items,
+                                args=(config, writes, seed, barrier))
+        for seed in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for process in processes:
+        process.join()
+    return workers * writes / (time.perf_counter() - start)
+
+
+def main(workers=8, writes=200):
+    """Print writes per second for each shard count."""
+    print(f'{workers} workers on {os.cpu_count()} CPUs')
+    for shards in SHARD_COUNTS:
+        directory = tempfile.mkdtemp()
+        try:
+            config = shard_config(directory, shards)
+            create_warehouses(config)
+            rate = writes_per_second(config, workers, writes)
+            print(f'{shards} shard(s): {rate:8,.0f} writes/sec')
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
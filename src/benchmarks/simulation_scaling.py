@@ -0,0 +1,47 @@
+"""Benchmark how the storage simulation scales with processes.
+
+The same scenario is simulated with 1, 2, 4, ... processes up to the
+number of CPUs, and the operations per second and speedup over a single
+process are printed. The results of every run are checked to be equal,
+as batches seed their own generators. Run from the ``src`` directory::
+
+    python -m benchmarks.simulation_scaling [storages] [operations]
+"""
+import os
+import sys
+import time
+from simulaatio import Skenaario, simuloi
+
+
+def process_counts(cpus):
+    """Return the powers of two below a CPU count, and the count itself."""
+    counts = [1]
+    while counts[-1] * 2 < cpus:
+        counts.append(counts[-1] * 2)
+    return counts + [cpus] if cpus > 1 else counts
+
+
+def run(scenario, processes):
+    """Return the seconds and final summary of simulating a scenario."""
+    start = time.perf_counter()
+    *_, (_, summary) = simuloi(1, [scenario], processes)
+    return time.perf_counter() - start, vars(summary)
+
+
+def main(storages=100_000, operations=50):
+    """Print the throughput of the simulation at each process count."""
+    scenario = Skenaario('scaling', storages, 100.0, 50.0, operations,
+                         20.0, 20.0)
+    baseline = expected = None
+    for processes in process_counts(os.cpu_count()):
+        elapsed, summary = run(scenario, processes)
+        baseline = baseline or elapsed
+        expected = expected or summary
+        print(f'{processes:>3} processes: '
+              f'{storages * operations / elapsed:12,.0f} ops/s, '
+              f'speedup {baseline / elapsed:5.2f}, '
+              f'{"same" if summary == expected else "DIFFERENT"} results')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
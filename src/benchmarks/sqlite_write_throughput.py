@@ -0,0 +1,54 @@
+"""Benchmark concurrent write throughput of the SQLite profiles.
+
+Several processes add items through the Flask app at the same time, as
+gunicorn workers would. Run from the ``src`` directory::
+
+    python -m benchmarks.sqlite_write_throughput [processes] [writes]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from web.app import create_app
+
+
+def worker(args):
+    """Add items through the app and return the number of failed writes.
+
+    The app answers a write that fails on the database lock with a 500
+    response rather than raising.
+    """
+    uri, profile, writes = args
+    app = create_app({'PROFILE': profile, 'SQLALCHEMY_DATABASE_URI': uri})
+    client = app.test_client()
+    errors = 0
+    for i in range(writes):
+        response = client.post('/warehouse/1/item/add',
+                               data={'name': f'Item {i}', 'quantity': '1'})
+        errors += response.status_code >= 500
+    return errors
+
+
+def measure(profile, processes, writes):
+    """Return successful writes per second and lock errors for a profile."""
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'warehouse.db')}"
+        app = create_app({'PROFILE': profile, 'SQLALCHEMY_DATABASE_URI': uri})
+        app.test_client().post('/warehouse/create', data={'name': 'Bench'})
+        with multiprocessing.Pool(processes) as pool:
+            start = time.perf_counter()
+            errors = sum(pool.map(worker, [(uri, profile, writes)] * processes))
+            elapsed = time.perf_counter() - start
+    return (processes * writes - errors) / elapsed, errors
+
+
+def main(processes=4, writes=500):
+    """Print write throughput of the default and production profiles."""
+    for profile in ('default', 'production'):
+        rate, errors = measure(profile, processes, writes)
+        print(f'{profile:>10}: {rate:9,.0f} writes/sec, {errors} lock errors')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
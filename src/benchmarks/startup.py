@@ -0,0 +1,92 @@
+"""Benchmark the cold start of the web application.
+
+Every run starts a new interpreter, as an autoscaled worker does, which
+imports the app under ``-X importtime`` and creates it. The import time
+is broken down by the top-level package of each module loaded, and the
+best time of create_app is measured for a new database file, for an
+existing one and for an existing one with FAST_START. Run from the
+``src`` directory::
+
+    python -m benchmarks.startup [repeat]
+"""
+import collections
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+CHILD = '''
+import json, sys, time
+start = time.perf_counter()
+from web.app import create_app
+imported = time.perf_counter()
+create_app(json.loads(sys.argv[1]))
+print(json.dumps([imported - start, time.perf_counter() - imported]))
+'''
+SOURCE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_breakdown(report):
+    """Return the import microseconds spent in each top-level package.
+
+    ``report`` is the ``-X importtime`` output of an interpreter, and
+    each module's own time is added to the package it belongs to.
+    """
+    totals = collections.Counter()
+    for line in report.splitlines()[1:]:
+        own, _cumulative, name = line.removeprefix('import time:').split('|')
+        totals[name.strip().split('.')[0]] += int(own)
+    return totals
+
+
+def start_once(config):
+    """Return the import and create_app seconds and import breakdown."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD, json.dumps(config)],
+        cwd=SOURCE, capture_output=True, text=True, check=True
+    )
+    imported, created = json.loads(completed.stdout)
+    return imported, created, import_breakdown(completed.stderr)
+
+
+def cold_start(config, repeat=5):
+    """Return the best import and create_app seconds of cold starts."""
+    runs = [start_once(config)[:2] for _ in range(repeat)]
+    return min(run[0] for run in runs), min(run[1] for run in runs)
+
+
+def database_config(path, fast_start=False):
+    """Return the config of an app on a database file."""
+    return {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+            'FAST_START': fast_start}
+
+
+def print_breakdown(imported, breakdown, packages=8):
+    """Print the import time and the packages taking the most of it."""
+    print(f'import web.app: {imported * 1000:23.1f} ms')
+    for name, micros in breakdown.most_common(packages):
+        print(f'  {name:<28} {micros / 1000:10.1f} ms')
+
+
+def main(repeat=5):
+    """Print the import breakdown and create_app times of cold starts."""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'startup.db')
+    try:
+        _, created, breakdown = start_once(database_config(path))
+        print(f'create_app, new database: {created * 1000:13.1f} ms')
+        for label, fast_start in (('existing database', False),
+                                  ('existing, FAST_START', True)):
+            imported, created = cold_start(
+                database_config(path, fast_start), repeat
+            )
+            print(f'create_app, {label + ":":<24} {created * 1000:6.1f} ms')
+        print_breakdown(imported, breakdown)
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,262 @@
+"""Benchmark suite for the storage core and the web application.
+
+Measures Varasto throughput and memory per object, latency of the
+warehouse list and the busiest warehouse page at 10, 1k and 100k
+warehouses and items, the bulk insert rate, and the cold start of a
+new interpreter creating the app on an existing database. Data sets
+come from the seeded generator in ``benchmarks.datagen``. Results are
+written as JSON and compared with the stored baseline, and the run fails
+if any result is worse than the baseline by more than the threshold.
+Run from the ``src`` directory::
+
+    python -m benchmarks.suite [--quick] [--output FILE]
+        [--baseline FILE] [--threshold FRACTION] [--save-baseline]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from benchmarks.datagen import item_names, seed_database
+from benchmarks.startup import cold_start, database_config, start_once
+from benchmarks.varasto_memory import bytes_per_instance
+from lukittu_varasto import LukittuVarasto
+from varasto import Varasto
+from varasto_array import VarastoArray
+from web.app import create_app
+from web.bulk import import_items
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SCALES = (10, 1000, 100_000)
+QUICK_SCALES = (10, 1000)
+SCALING = {
+    'ops/s': lambda speed: 1 / speed,
+    'rows/s': lambda speed: 1 / speed,
+    'ms': lambda speed: speed,
+    'bytes': lambda speed: 1,
+}
+
+
+def result(value, unit, higher_is_better, compared=True):
+    """Return a result entry.
+
+    Results that are not compared are only reported, such as tail
+    latencies that vary too much between runs to gate on.
+    """
+    return {'value': value, 'unit': unit,
+            'higher_is_better': higher_is_better, 'compared': compared}
+
+
+def calls_per_second(function, count, repeat=5):
+    """Return the best calls per second of function over repeats."""
+    number = count // repeat
+    return number / min(timeit.repeat(function, number=number, repeat=repeat))
+
+
+def calibration_seconds():
+    """Return the best time of a fixed pure Python reference workload.
+
+    Speed results are compared relative to this time, so a baseline
+    taken on a faster or slower machine still applies.
+    """
+    return min(timeit.repeat(
+        lambda: sum(number * number for number in range(100_000)),
+        number=5, repeat=5
+    ))
+
+
+def varasto_results(count):
+    """Return construct, add and take throughput of Varasto."""
+    roomy = Varasto(1e18, 1e17)
+    return {
+        'varasto.construct': result(calls_per_second(
+            lambda: Varasto(100.0, 10.0), count), 'ops/s', True),
+        'varasto.add': result(calls_per_second(
+            lambda: roomy.lisaa_varastoon(1.0), count), 'ops/s', True),
+        'varasto.take': result(calls_per_second(
+            lambda: roomy.ota_varastosta(1.0), count), 'ops/s', True),
+    }
+
+
+def array_bytes_per_storage(count):
+    """Return bytes allocated per storage of a VarastoArray."""
+    tracemalloc.start()
+    varastot = VarastoArray([100.0] * count, 10.0)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / len(varastot)
+
+
+def memory_results(count):
+    """Return memory per storage object of each storage layout."""
+    return {
+        'memory.varasto': result(
+            bytes_per_instance(Varasto, count), 'bytes', False),
+        'memory.lukittu_varasto': result(
+            bytes_per_instance(LukittuVarasto, count), 'bytes', False),
+        'memory.varasto_array': result(
+            array_bytes_per_storage(count), 'bytes', False),
+    }
+
+
+def create_memory_app():
+    """Create an app on an in-memory database without caching."""
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'CACHE_BACKEND': None,
+    })
+
+
+def timed_requests(client, url, count):
+    """Return the latencies in milliseconds of GET requests to a URL."""
+    client.get(url)
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def latency_results(scale, requests):
+    """Return page latencies with scale warehouses and items."""
+    app = create_memory_app()
+    seed_database(app, scale, scale)
+    client = app.test_client()
+    results = {}
+    for page, url in (('index', '/'), ('view_warehouse', '/warehouse/1')):
+        latencies = timed_requests(client, url, requests)
+        results[f'web.{page}.{scale}.p50'] = result(
+            statistics.median(latencies), 'ms', False)
+        results[f'web.{page}.{scale}.p95'] = result(
+            statistics.quantiles(latencies, n=20)[18], 'ms', False,
+            compared=False)
+    return results
+
+
+def bulk_results(count):
+    """Return the rate of bulk inserting items into one warehouse."""
+    app = create_memory_app()
+    seed_database(app, 1, 1)
+    pairs = [(name, '5') for name in item_names(random.Random(0), count)]
+    with app.app_context():
+        start = time.perf_counter()
+        import_items(1, pairs, app.config['BULK_CHUNK_SIZE'])
+        elapsed = time.perf_counter() - start
+    return {'bulk.import_items': result(count / elapsed, 'rows/s', True)}
+
+
+def startup_results(repeat):
+    """Return the cold start time of an app on an existing database.
+
+    Only the total is compared; its parts are reported.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        config = database_config(os.path.join(directory, 'startup.db'), True)
+        start_once(config)
+        imported, created = cold_start(config, repeat)
+    finally:
+        shutil.rmtree(directory)
+    return {
+        'startup.import': result(imported * 1000, 'ms', False, False),
+        'startup.create_app': result(created * 1000, 'ms', False, False),
+        'startup.cold_start': result(
+            (imported + created) * 1000, 'ms', False),
+    }
+
+
+def run_suite(quick):
+    """Run every benchmark and return the results by name."""
+    count = 100_000 if quick else 1_000_000
+    results = {**varasto_results(count), **memory_results(count // 10)}
+    for scale in QUICK_SCALES if quick else SCALES:
+        results.update(latency_results(scale, 20 if quick else 50))
+    results.update(bulk_results(count // 10))
+    results.update(startup_results(3 if quick else 10))
+    return results
+
+
+def regressions(current, baseline, threshold):
+    """Describe the results worse than the baseline by over threshold.
+
+    ``current`` and ``baseline`` are result documents. ``threshold`` is a
+    fraction of the baseline value, and speed results are first scaled
+    by the ratio of the calibration times of the runs. Results missing
+    from the baseline are not compared.
+    """
+    speed = (current['meta']['calibration_seconds']
+             / baseline['meta']['calibration_seconds'])
+    found = []
+    for name, entry in current['results'].items():
+        previous = baseline['results'].get(name)
+        if not (entry['compared'] and previous and previous['value']):
+            continue
+        ratio = (entry['value'] / previous['value']
+                 / SCALING[entry['unit']](speed))
+        worse = 1 / ratio - 1 if entry['higher_is_better'] else ratio - 1
+        if worse > threshold:
+            found.append(f"{name}: {previous['value']:.4g} -> "
+                         f"{entry['value']:.4g} {entry['unit']} "
+                         f"({worse:.0%} worse)")
+    return found
+
+
+def run_metadata(quick):
+    """Return a description of the environment of a run."""
+    return {
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'quick': quick,
+        'calibration_seconds': calibration_seconds(),
+    }
+
+
+def parse_args(argv):
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n', maxsplit=1)[0]
+    )
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller data sets and fewer repetitions')
+    parser.add_argument('--output', default='benchmark-results.json',
+                        help='file to write the results to')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='baseline results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown as a fraction of baseline')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results as the new baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run the suite and return 1 if a result regressed, else 0."""
+    args = parse_args(argv)
+    document = {'meta': run_metadata(args.quick),
+                'results': run_suite(args.quick)}
+    with open(args.baseline if args.save_baseline else args.output, 'w',
+              encoding='utf-8') as output:
+        json.dump(document, output, indent=2)
+    for name, entry in document['results'].items():
+        print(f"{name:>32}: {entry['value']:14,.3f} {entry['unit']}")
+    if args.save_baseline or not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding='utf-8') as baseline:
+        found = regressions(document, json.load(baseline), args.threshold)
+    for line in found:
+        print(f'REGRESSION {line}')
+    return 1 if found else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""Benchmark memory use and speed of slotted and dict-based Varasto.
+
+Run from the ``src`` directory::
+
+    python -m benchmarks.varasto_memory [instances]
+"""
+# The dict-based class is a deliberate copy of the original Varasto.
+# pylint: disable=duplicate-code
+import sys
+import timeit
+import tracemalloc
+from varasto import Varasto
+
+
+class DictVarasto:
+    """Copy of Varasto as it was before __slots__, with an instance dict."""
+    def __init__(self, tilavuus, alku_saldo = 0):
+        """Initialize Varasto with given volume and initial balance."""
+        self.tilavuus = self._aseta_tilavuus(tilavuus)
+        self.saldo = self._aseta_saldo(alku_saldo, tilavuus)
+
+    def _aseta_tilavuus(self, tilavuus):
+        """Set volume, zero if invalid."""
+        if tilavuus > 0.0:
+            return tilavuus
+        return 0.0
+
+    def _aseta_saldo(self, alku_saldo, tilavuus):
+        """Set balance, validate against volume."""
+        if alku_saldo < 0.0:
+            return 0.0
+        if alku_saldo <= tilavuus:
+            return alku_saldo
+        return tilavuus
+
+    # huom: ominaisuus voidaan myös laskea.
+    # Ei tarvita erillistä kenttää viela_tilaa tms.
+    def paljonko_mahtuu(self):
+        """Calculate how much space is available in the storage."""
+        return self.tilavuus - self.saldo
+
+    def lisaa_varastoon(self, maara):
+        """Add amount to the storage."""
+        if maara < 0:
+            return
+        if maara <= self.paljonko_mahtuu():
+            self.saldo = self.saldo + maara
+        else:
+            self.saldo = self.tilavuus
+
+    def ota_varastosta(self, maara):
+        """Remove amount from the storage and return the amount taken."""
+        if maara < 0:
+            return 0.0
+        if maara > self.saldo:
+            kaikki_mita_voidaan = self.saldo
+            self.saldo = 0.0
+
+            return kaikki_mita_voidaan
+
+        self.saldo = self.saldo - maara
+
+        return maara
+
+    def __str__(self):
+        """Return string representation of the storage."""
+        return f"saldo = {self.saldo}, vielä tilaa {self.paljonko_mahtuu()}"
+
+
+def bytes_per_instance(cls, count):
+    """Return average bytes allocated per instance of given class."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [cls(100.0, 10.0) for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    list_bytes = sys.getsizeof(instances)
+    return (after - before - list_bytes) / count
+
+
+def ops_per_second(cls, count):
+    """Return add/take operation pairs per second for given class."""
+    varasto = cls(100.0, 50.0)
+    seconds = timeit.timeit(
+        lambda: (varasto.lisaa_varastoon(1.0), varasto.ota_varastosta(1.0)),
+        number=count
+    )
+    return count / seconds
+
+
+def main(count=100_000):
+    """Print memory and throughput for both Varasto layouts."""
+    for label, cls in (("dict", DictVarasto), ("slots", Varasto)):
+        size = bytes_per_instance(cls, count)
+        speed = ops_per_second(cls, count)
+        print(f"{label:>5}: {size:6.1f} bytes/instance, "
+              f"{speed:12,.0f} add+take ops/sec")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
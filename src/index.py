@@ -1,4 +1,11 @@
-"""Main module for demonstrating Varasto functionality."""
+"""Main module for demonstrating Varasto functionality.
+
+Given a scenario file, runs its simulation instead of the demo::
+
+    python index.py skenaariot.json [prosesseja]
+"""
+import sys
+from simulaatio import suorita
 from varasto import Varasto
 
 
@@ -76,8 +83,8 @@ def alusta_varastot():
     return mehua, olutta
 
 
-def main():
-    """Main function to demonstrate Varasto class usage."""
+def nayta_esittely():
+    """Demonstrate Varasto class usage."""
     mehua, olutta = alusta_varastot()
     nayta_getterit(olutta)
     nayta_setterit(mehua)
@@ -88,5 +95,14 @@ def main():
     nayta_ylivuoto_mehu(mehua)
 
 
+def main(argv=None):
+    """Run the demo, or simulate the scenario file given as an argument."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        suorita(argv[0], *(int(arg) for arg in argv[1:2]))
+    else:
+        nayta_esittely()
+
+
 if __name__ == "__main__":
     main()
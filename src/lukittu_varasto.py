@@ -0,0 +1,144 @@
+"""Thread-safe storage module for concurrent producers and consumers."""
+import threading
+from collections import deque
+from varasto import Varasto
+
+_SAIE = threading.local()
+
+
+class LukittuVarasto(Varasto):
+    """Storage whose operations are protected by a lock."""
+    __slots__ = ("lukko",)
+
+    def __init__(self, tilavuus, alku_saldo = 0):
+        """Initialize storage and its lock."""
+        super().__init__(tilavuus, alku_saldo)
+        self.lukko = threading.Lock()
+
+    def lisaa_varastoon(self, maara):
+        """Add amount to the storage while holding the lock."""
+        with self.lukko:
+            super().lisaa_varastoon(maara)
+
+    def ota_varastosta(self, maara):
+        """Remove amount while holding the lock and return amount taken."""
+        with self.lukko:
+            return super().ota_varastosta(maara)
+
+    def kasittele_jono(self):
+        """Apply operations queued while the lock was held.
+
+        Called after releasing the lock from outside the storage's own
+        methods. A plain locked storage queues nothing.
+        """
+
+
+def _oma_tapahtuma():
+    """Return the event the current thread waits on for its operations."""
+    try:
+        return _SAIE.tapahtuma
+    except AttributeError:
+        _SAIE.tapahtuma = threading.Event()
+        return _SAIE.tapahtuma
+
+
+class _Pyynto:  # pylint: disable=too-few-public-methods
+    """Queued operation waiting to be applied by a combining thread."""
+    __slots__ = ("toiminto", "maara", "tulos", "valmis", "tapahtuma")
+
+    def __init__(self, toiminto, maara, tapahtuma):
+        """Initialize a pending operation of the thread owning the event."""
+        self.toiminto = toiminto
+        self.maara = maara
+        self.tulos = None
+        self.valmis = False
+        self.tapahtuma = tapahtuma
+
+
+class YhdistavaVarasto(LukittuVarasto):
+    """Locked storage that combines queued operations.
+
+    Each thread queues its operation and then tries to take the lock
+    without blocking. Whichever thread gets it applies every queued
+    operation in one go, and the others wait on an event of their own
+    until their operation has been applied, so at high thread counts
+    the lock is taken once per batch instead of once per operation.
+
+    A thread that releases the lock checks the queue again, since others
+    may have queued operations and failed to take the lock meanwhile.
+    """
+    __slots__ = ("jono",)
+
+    def __init__(self, tilavuus, alku_saldo = 0):
+        """Initialize storage, its lock and the operation queue."""
+        super().__init__(tilavuus, alku_saldo)
+        self.jono = deque()
+
+    def lisaa_varastoon(self, maara):
+        """Queue an add and wait until it has been applied."""
+        self._suorita(Varasto.lisaa_varastoon, maara)
+
+    def ota_varastosta(self, maara):
+        """Queue a take and return the amount taken once applied."""
+        return self._suorita(Varasto.ota_varastosta, maara)
+
+    def _suorita(self, toiminto, maara):
+        """Queue an operation and return its result once applied."""
+        tapahtuma = _oma_tapahtuma()
+        pyynto = _Pyynto(toiminto, maara, tapahtuma)
+        self.jono.append(pyynto)
+        self._kasittele(tapahtuma)
+        # The event may still be set for an earlier operation, so the flag
+        # decides whether this one is done.
+        while not pyynto.valmis:
+            tapahtuma.wait()
+            tapahtuma.clear()
+        return pyynto.tulos
+
+    def kasittele_jono(self):
+        """Apply queued operations unless another thread holds the lock."""
+        self._kasittele(None)
+
+    def _kasittele(self, oma):
+        """Apply queued operations for as long as the lock is free.
+
+        A thread that fails to take the lock leaves its operation to the
+        holder, which applies it or finds it in the queue after release.
+        The thread owning the event oma needs no wake-up.
+        """
+        # pylint: disable-next=consider-using-with
+        while self.jono and self.lukko.acquire(blocking=False):
+            try:
+                self._yhdista(oma)
+            finally:
+                self.lukko.release()
+
+    def _yhdista(self, oma):
+        """Apply all queued operations, called with the lock held."""
+        while self.jono:
+            pyynto = self.jono.popleft()
+            pyynto.tulos = pyynto.toiminto(self, pyynto.maara)
+            pyynto.valmis = True
+            if pyynto.tapahtuma is not oma:
+                pyynto.tapahtuma.set()
+
+
+def siirra(lahde, kohde, maara):
+    """Move amount atomically between storages and return amount moved.
+
+    No more is moved than the source holds or the target has room for.
+    Locks are always taken in the same order, so concurrent transfers in
+    opposite directions cannot deadlock. Operations queued on either
+    storage while the locks were held are applied afterwards.
+    """
+    if lahde is kohde:
+        return 0.0
+    ensimmainen, toinen = sorted((lahde, kohde), key=id)
+    with ensimmainen.lukko, toinen.lukko:
+        otettu = Varasto.ota_varastosta(
+            lahde, min(maara, kohde.paljonko_mahtuu())
+        )
+        Varasto.lisaa_varastoon(kohde, otettu)
+    lahde.kasittele_jono()
+    kohde.kasittele_jono()
+    return otettu
@@ -0,0 +1,192 @@
+"""Parallel simulation of random add and take workloads on storages.
+
+A scenario file lists workloads as JSON::
+
+    {"siemen": 1, "skenaariot": [
+        {"nimi": "kesa", "varastoja": 100000, "tilavuus": 100.0,
+         "alku_saldo": 50.0, "operaatioita": 50,
+         "lisays": 30.0, "otto": 25.0, "lisaysosuus": 0.5}
+    ]}
+
+Every storage of a scenario gets its number of operations, each adding a
+random amount up to ``lisays`` with probability ``lisaysosuus`` and
+otherwise taking one up to ``otto``, with the semantics of ``Varasto``.
+The storages are simulated in batches on a process pool. Each batch
+seeds its own generator from the file's seed, its scenario and its
+number, so the results do not depend on the number of processes.
+
+Workers return a summary of their batch instead of the operations:
+overflow and underflow counts and amounts, and the fill level after each
+operation as a histogram from which percentiles are read. Summaries are
+merged in batch order as they arrive, so the aggregate statistics can be
+reported while the simulation runs.
+"""
+import json
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+from varasto import Varasto
+
+TASOJA = 1000
+ERA = 1000
+
+Skenaario = namedtuple(
+    "Skenaario",
+    ["nimi", "varastoja", "tilavuus", "alku_saldo", "operaatioita",
+     "lisays", "otto", "lisaysosuus"],
+    defaults=(0.0, 10, 1.0, 1.0, 0.5)
+)
+
+
+class Yhteenveto:  # pylint: disable=too-many-instance-attributes
+    """Aggregate statistics of simulated storages."""
+
+    def __init__(self):
+        """Initialize an empty summary."""
+        self.varastoja = self.operaatioita = 0
+        self.ylivuotoja = self.alivuotoja = 0
+        self.ylivuotoa = self.alivuotoa = self.tasosumma = 0.0
+        self.histogrammi = [0] * TASOJA
+
+    def kirjaa_lisays(self, maara, mahtuu):
+        """Record an addition of amount to a storage with room for mahtuu."""
+        if maara > mahtuu:
+            self.ylivuotoja += 1
+            self.ylivuotoa += maara - mahtuu
+
+    def kirjaa_otto(self, maara, saatiin):
+        """Record a take of amount that got saatiin."""
+        if saatiin < maara:
+            self.alivuotoja += 1
+            self.alivuotoa += maara - saatiin
+
+    def kirjaa_taso(self, taso):
+        """Record the fill level of a storage after an operation."""
+        self.histogrammi[min(int(taso * TASOJA), TASOJA - 1)] += 1
+        self.tasosumma += taso
+        self.operaatioita += 1
+
+    def yhdista(self, toinen):
+        """Add the statistics of another summary to this one."""
+        for kentta in ("varastoja", "operaatioita", "ylivuotoja",
+                       "alivuotoja", "ylivuotoa", "alivuotoa", "tasosumma"):
+            vars(self)[kentta] += vars(toinen)[kentta]
+        self.histogrammi = list(map(sum, zip(self.histogrammi,
+                                             toinen.histogrammi)))
+
+    def persentiili(self, osuus):
+        """Return the fill level that a share of the operations stay under.
+
+        Levels are resolved to 1 / TASOJA, rounding up.
+        """
+        raja = max(osuus * self.operaatioita, 1)
+        kertyma = 0
+        for lokero, maara in enumerate(self.histogrammi):
+            kertyma += maara
+            if kertyma >= raja:
+                return (lokero + 1) / TASOJA
+        return 0.0
+
+    def keskitaso(self):
+        """Return the mean fill level after an operation."""
+        return self.tasosumma / self.operaatioita if self.operaatioita else 0.0
+
+
+def lue_skenaariot(polku):
+    """Return the seed and scenarios of a scenario file.
+
+    Raises ValueError if a scenario has no storages or no volume.
+    """
+    with open(polku, encoding="utf-8") as tiedosto:
+        tiedot = json.load(tiedosto)
+    skenaariot = [Skenaario(**skenaario) for skenaario in tiedot["skenaariot"]]
+    for skenaario in skenaariot:
+        if skenaario.varastoja <= 0 or skenaario.tilavuus <= 0:
+            raise ValueError(f"{skenaario.nimi}: varastoja and tilavuus "
+                             "must be positive")
+    return tiedot.get("siemen", 0), skenaariot
+
+
+def _operoi(varasto, arpa, skenaario, tulos):
+    """Apply one random operation to a storage and record it."""
+    if arpa.random() < skenaario.lisaysosuus:
+        maara = arpa.uniform(0.0, skenaario.lisays)
+        tulos.kirjaa_lisays(maara, varasto.paljonko_mahtuu())
+        varasto.lisaa_varastoon(maara)
+    else:
+        maara = arpa.uniform(0.0, skenaario.otto)
+        tulos.kirjaa_otto(maara, varasto.ota_varastosta(maara))
+    tulos.kirjaa_taso(varasto.saldo / varasto.tilavuus)
+
+
+def simuloi_era(tehtava):
+    """Simulate a batch of storages and return its scenario and summary.
+
+    ``tehtava`` is the seed, scenario index, scenario, batch number and
+    number of storages in the batch.
+    """
+    siemen, indeksi, skenaario, era, varastoja = tehtava
+    arpa = random.Random(f"{siemen}/{indeksi}/{era}")
+    tulos = Yhteenveto()
+    tulos.varastoja = varastoja
+    for _ in range(varastoja):
+        varasto = Varasto(skenaario.tilavuus, skenaario.alku_saldo)
+        for _ in range(skenaario.operaatioita):
+            _operoi(varasto, arpa, skenaario, tulos)
+    return indeksi, tulos
+
+
+def erat(siemen, skenaariot, era=ERA):
+    """Yield the batch tasks of scenarios in order."""
+    for indeksi, skenaario in enumerate(skenaariot):
+        for alku in range(0, skenaario.varastoja, era):
+            yield (siemen, indeksi, skenaario, alku // era,
+                   min(era, skenaario.varastoja - alku))
+
+
+def simuloi(siemen, skenaariot, prosesseja=None, era=ERA):
+    """Simulate scenarios on a process pool and yield their progress.
+
+    After each batch, yields the index of its scenario and the summary
+    of the scenario's batches so far. ``prosesseja`` defaults to the
+    number of CPUs.
+    """
+    yhteenvedot = [Yhteenveto() for _ in skenaariot]
+    with multiprocessing.Pool(prosesseja) as pool:
+        for indeksi, tulos in pool.imap(simuloi_era,
+                                        erat(siemen, skenaariot, era)):
+            yhteenvedot[indeksi].yhdista(tulos)
+            yield indeksi, yhteenvedot[indeksi]
+
+
+def raportti(skenaario, yhteenveto):
+    """Return a line of a scenario's statistics so far."""
+    operaatioita = max(yhteenveto.operaatioita, 1)
+    return (
+        f"{skenaario.nimi}: {yhteenveto.varastoja:,}/{skenaario.varastoja:,}"
+        f" varastoa, {yhteenveto.operaatioita:,} operaatiota, ylivuotoja "
+        f"{yhteenveto.ylivuotoja / operaatioita:.1%} "
+        f"({yhteenveto.ylivuotoa:,.1f}), alivuotoja "
+        f"{yhteenveto.alivuotoja / operaatioita:.1%} "
+        f"({yhteenveto.alivuotoa:,.1f}), täyttöaste ka "
+        f"{yhteenveto.keskitaso():.3f} p50 {yhteenveto.persentiili(0.5):.3f}"
+        f" p90 {yhteenveto.persentiili(0.9):.3f}"
+        f" p99 {yhteenveto.persentiili(0.99):.3f}"
+    )
+
+
+def suorita(polku, prosesseja=None, valiaika=1.0, tulosta=print):
+    """Simulate a scenario file and print its statistics as they grow.
+
+    A scenario's line is printed when it completes, and at most every
+    valiaika seconds while it runs.
+    """
+    siemen, skenaariot = lue_skenaariot(polku)
+    edellinen = time.monotonic()
+    for indeksi, yhteenveto in simuloi(siemen, skenaariot, prosesseja):
+        skenaario = skenaariot[indeksi]
+        valmis = yhteenveto.varastoja == skenaario.varastoja
+        if valmis or time.monotonic() - edellinen >= valiaika:
+            tulosta(raportti(skenaario, yhteenveto))
+            edellinen = time.monotonic()
@@ -0,0 +1,85 @@
+"""Test module for the benchmark data generator and baseline comparison."""
+import random
+import unittest
+from benchmarks.datagen import item_rows, warehouse_rows
+from benchmarks.startup import import_breakdown
+from benchmarks.suite import regressions, result
+
+
+def document(calibration, **results):
+    """Return a result document with the given calibration time."""
+    return {'meta': {'calibration_seconds': calibration}, 'results': results}
+
+
+class TestDatagen(unittest.TestCase):
+    """Test class for the seeded synthetic data generator."""
+
+    def test_same_seed_same_data(self):
+        """Test that a seed always generates the same rows."""
+        first, second = random.Random(3), random.Random(3)
+        self.assertEqual(warehouse_rows(first, 5), warehouse_rows(second, 5))
+        self.assertEqual(item_rows(first, 5, 50), item_rows(second, 5, 50))
+
+    def test_items_belong_to_warehouses(self):
+        """Test that items refer to existing warehouses, mostly the first."""
+        rows = item_rows(random.Random(1), 10, 1000)
+        owners = [row['warehouse_id'] for row in rows]
+        self.assertTrue(all(1 <= owner <= 10 for owner in owners))
+        self.assertGreater(owners.count(1), len(owners) / 3)
+
+
+class TestRegressions(unittest.TestCase):
+    """Test class for comparing results with a baseline."""
+
+    def setUp(self):
+        """Set up a baseline."""
+        self.baseline = document(
+            1.0, rate=result(100.0, 'ops/s', True),
+            page=result(10.0, 'ms', False),
+            size=result(48.0, 'bytes', False),
+            tail=result(20.0, 'ms', False, compared=False)
+        )
+
+    def compare(self, calibration, **values):
+        """Return regressions of values against the baseline."""
+        current = document(calibration, **{
+            name: dict(self.baseline['results'][name], value=value)
+            for name, value in values.items()
+        })
+        return regressions(current, self.baseline, 0.25)
+
+    def test_within_threshold(self):
+        """Test that changes within the threshold pass."""
+        self.assertEqual(self.compare(1.0, rate=85.0, page=12.0), [])
+
+    def test_worse_results_are_reported(self):
+        """Test that slower, larger and lower results are regressions."""
+        found = self.compare(1.0, rate=70.0, page=13.0, size=64.0)
+        self.assertEqual([line.split(':')[0] for line in found],
+                         ['rate', 'page', 'size'])
+
+    def test_speed_results_scale_with_calibration(self):
+        """Test that a slower machine is allowed slower results."""
+        self.assertEqual(self.compare(2.0, rate=50.0, page=20.0), [])
+        self.assertEqual(len(self.compare(2.0, size=64.0)), 1)
+
+    def test_uncompared_and_new_results_are_skipped(self):
+        """Test that reported-only and new results never regress."""
+        current = document(1.0, tail=result(99.0, 'ms', False, False),
+                           new=result(1.0, 'ops/s', True))
+        self.assertEqual(regressions(current, self.baseline, 0.25), [])
+
+
+class TestImportBreakdown(unittest.TestCase):
+    """Test class for summing import times by package."""
+
+    def test_own_times_add_up_per_package(self):
+        """Test that modules count towards their top-level package."""
+        report = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       100 |        100 |     flask.json\n'
+            'import time:        40 |        140 |   flask\n'
+            'import time:         5 |          5 |     web.models\n'
+            'import time:         7 |        152 | web.app\n'
+        )
+        self.assertEqual(import_breakdown(report), {'flask': 140, 'web': 12})
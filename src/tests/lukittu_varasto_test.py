@@ -0,0 +1,118 @@
+"""Test module for thread-safe storages."""
+import random
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from lukittu_varasto import LukittuVarasto, YhdistavaVarasto, siirra
+
+
+def aja_saikeissa(tehtava, saikeita=8):
+    """Run task concurrently in given number of threads."""
+    saikeet = [
+        threading.Thread(target=tehtava, args=(i,)) for i in range(saikeita)
+    ]
+    for saie in saikeet:
+        saie.start()
+    for saie in saikeet:
+        saie.join()
+
+
+def odota_jonoa(varasto, pituus, aikaraja=5.0):
+    """Wait until the queue of a combining storage is long enough."""
+    raja = time.monotonic() + aikaraja
+    while len(varasto.jono) < pituus and time.monotonic() < raja:
+        time.sleep(0.001)
+
+
+class TestLukittuVarasto(unittest.TestCase):
+    """Test class for thread-safe storage functionality."""
+    luokka = LukittuVarasto
+
+    def setUp(self):
+        """Make thread switches frequent to expose races."""
+        self.vaihtovali = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        """Restore thread switch interval."""
+        sys.setswitchinterval(self.vaihtovali)
+
+    def test_rajaa_kuten_varasto(self):
+        """Test that clamping semantics match Varasto."""
+        varasto = self.luokka(10, 4)
+        varasto.lisaa_varastoon(20)
+        self.assertEqual(varasto.saldo, 10)
+        self.assertEqual(varasto.ota_varastosta(15), 10)
+        self.assertEqual(varasto.ota_varastosta(-1), 0)
+        self.assertEqual(str(varasto), "saldo = 0.0, vielä tilaa 10.0")
+
+    def test_rinnakkainen_otto_ei_anna_liikaa(self):
+        """Test that concurrent takes never hand out more than exists."""
+        varasto = self.luokka(10000, 5000)
+        saadut = []
+
+        def ota(_):
+            saadut.append(sum(varasto.ota_varastosta(1) for _ in range(1000)))
+
+        aja_saikeissa(ota)
+        self.assertEqual(sum(saadut), 5000)
+        self.assertEqual(varasto.saldo, 0)
+
+    def test_rinnakkainen_lisays_ja_otto_sailyttaa_maarat(self):
+        """Test that concurrent adds and takes conserve amounts."""
+        varasto = self.luokka(1_000_000, 1000)
+        saadut = []
+
+        def kayta(_):
+            otettu = 0
+            for _ in range(1000):
+                varasto.lisaa_varastoon(2)
+                otettu += varasto.ota_varastosta(3)
+            saadut.append(otettu)
+
+        aja_saikeissa(kayta)
+        self.assertEqual(varasto.saldo, 1000 + 8 * 2000 - sum(saadut))
+
+    def test_siirrot_sailyttavat_kokonaismaaran(self):
+        """Test that concurrent transfers conserve the total amount."""
+        varastot = [self.luokka(100, 50) for _ in range(4)]
+
+        def siirtele(siemen):
+            satunnainen = random.Random(siemen)
+            for _ in range(2000):
+                lahde, kohde = satunnainen.sample(varastot, 2)
+                siirra(lahde, kohde, satunnainen.randint(-5, 30))
+
+        aja_saikeissa(siirtele)
+        self.assertEqual(sum(v.saldo for v in varastot), 200)
+        for varasto in varastot:
+            self.assertTrue(0 <= varasto.saldo <= 100)
+
+    def test_siirto_rajaa_kohteen_tilaan(self):
+        """Test that transfer moves no more than target has room for."""
+        lahde, kohde = self.luokka(10, 10), self.luokka(10, 7)
+        self.assertEqual(siirra(lahde, kohde, 5), 3)
+        self.assertEqual((lahde.saldo, kohde.saldo), (7, 10))
+        self.assertEqual(siirra(lahde, lahde, 5), 0)
+
+
+class TestYhdistavaVarasto(TestLukittuVarasto):
+    """Run the same tests against the combining storage."""
+    luokka = YhdistavaVarasto
+
+    def test_odottajat_jattavat_toiminnot_lukon_haltijalle(self):
+        """Test that threads queue instead of blocking on a held lock."""
+        varasto = self.luokka(100, 50)
+        varasto.lukko.acquire()  # pylint: disable=consider-using-with
+        with ThreadPoolExecutor(4) as pool:
+            otot = [pool.submit(varasto.ota_varastosta, 10) for _ in range(4)]
+            odota_jonoa(varasto, 4)
+            jonossa = (len(varasto.jono), varasto.saldo)
+            varasto.lukko.release()
+            varasto.kasittele_jono()
+        self.assertEqual(
+            (jonossa, [otto.result() for otto in otot], varasto.saldo),
+            ((4, 50), [10] * 4, 10)
+        )
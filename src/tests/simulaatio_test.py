@@ -0,0 +1,120 @@
+"""Test module for the parallel storage simulation."""
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from index import main
+from simulaatio import (
+    Skenaario, Yhteenveto, TASOJA, lue_skenaariot, simuloi, suorita
+)
+
+SKENAARIOT = [
+    {"nimi": "tasapaino", "varastoja": 25, "tilavuus": 10.0,
+     "alku_saldo": 5.0, "operaatioita": 20, "lisays": 4.0, "otto": 4.0},
+    {"nimi": "ruuhka", "varastoja": 7, "tilavuus": 10.0,
+     "operaatioita": 30, "lisays": 6.0, "lisaysosuus": 0.9},
+]
+
+
+class TestYhteenveto(unittest.TestCase):
+    """Test class for recording and merging simulation statistics."""
+
+    def test_kirjaa_yli_ja_alivuodot(self):
+        """Test that clamped operations are counted with their excess."""
+        tulos = Yhteenveto()
+        tulos.kirjaa_lisays(5.0, 3.0)
+        tulos.kirjaa_lisays(2.0, 3.0)
+        tulos.kirjaa_otto(4.0, 1.5)
+        tulos.kirjaa_otto(1.0, 1.0)
+        self.assertEqual((tulos.ylivuotoja, tulos.ylivuotoa), (1, 2.0))
+        self.assertEqual((tulos.alivuotoja, tulos.alivuotoa), (1, 2.5))
+
+    def test_persentiilit(self):
+        """Test that percentiles are read from the fill level histogram."""
+        tulos = Yhteenveto()
+        for taso in (0.0, 0.1, 0.1, 0.5, 1.0):
+            tulos.kirjaa_taso(taso)
+        self.assertAlmostEqual(tulos.persentiili(0.5), 0.101)
+        self.assertAlmostEqual(tulos.persentiili(0.8), 0.501)
+        self.assertEqual(tulos.persentiili(1.0), 1.0)
+        self.assertEqual(tulos.persentiili(0.0), 1 / TASOJA)
+        self.assertAlmostEqual(tulos.keskitaso(), 0.34)
+        self.assertEqual(Yhteenveto().persentiili(0.5), 0.0)
+
+    def test_yhdista(self):
+        """Test that merging adds counts and histograms."""
+        tulos, toinen = Yhteenveto(), Yhteenveto()
+        tulos.kirjaa_taso(0.25)
+        toinen.kirjaa_taso(0.25)
+        toinen.kirjaa_lisays(2.0, 1.0)
+        tulos.yhdista(toinen)
+        self.assertEqual((tulos.operaatioita, tulos.ylivuotoja), (2, 1))
+        self.assertEqual(tulos.histogrammi[250], 2)
+
+
+class TestSimulaatio(unittest.TestCase):
+    """Test class for running scenario files on a process pool."""
+
+    def setUp(self):
+        """Write a scenario file in a temporary directory."""
+        self.hakemisto = tempfile.mkdtemp()
+        self.polku = self.kirjoita({"siemen": 7, "skenaariot": SKENAARIOT})
+
+    def tearDown(self):
+        """Remove the scenario file."""
+        shutil.rmtree(self.hakemisto)
+
+    def kirjoita(self, tiedot):
+        """Write a scenario file and return its path."""
+        polku = os.path.join(self.hakemisto, "skenaariot.json")
+        with open(polku, "w", encoding="utf-8") as tiedosto:
+            json.dump(tiedot, tiedosto)
+        return polku
+
+    def lopputulokset(self, prosesseja, era):
+        """Return the final statistics of each scenario as dicts."""
+        siemen, skenaariot = lue_skenaariot(self.polku)
+        tulokset = {}
+        for indeksi, tulos in simuloi(siemen, skenaariot, prosesseja, era):
+            tulokset[indeksi] = vars(tulos).copy()
+        return [tulokset[indeksi] for indeksi in range(len(skenaariot))]
+
+    def test_lue_skenaariot(self):
+        """Test that scenarios get defaults for missing fields."""
+        siemen, skenaariot = lue_skenaariot(self.polku)
+        self.assertEqual(siemen, 7)
+        self.assertEqual(skenaariot[1], Skenaario(
+            "ruuhka", 7, 10.0, 0.0, 30, 6.0, 1.0, 0.9
+        ))
+        self.kirjoita({"skenaariot": [{"nimi": "tyhja", "varastoja": 1,
+                                       "tilavuus": 0}]})
+        with self.assertRaises(ValueError):
+            lue_skenaariot(self.polku)
+
+    def test_tulokset_eivat_riipu_prosesseista(self):
+        """Test that the results only depend on the seed."""
+        tulokset = self.lopputulokset(1, 10)
+        self.assertEqual(self.lopputulokset(2, 10), tulokset)
+        self.assertEqual(tulokset[0]["varastoja"], 25)
+        self.assertEqual(tulokset[0]["operaatioita"], 500)
+        self.assertEqual(sum(tulokset[1]["histogrammi"]), 210)
+        self.assertGreater(tulokset[1]["ylivuotoja"], 0)
+
+    def test_suorita_raportoi_skenaariot(self):
+        """Test that each scenario's statistics are printed."""
+        rivit = []
+        suorita(self.polku, 2, valiaika=0.0, tulosta=rivit.append)
+        self.assertEqual(len(rivit), 2)
+        self.assertTrue(rivit[0].startswith(
+            "tasapaino: 25/25 varastoa, 500 operaatiota"
+        ))
+        self.assertIn("p99", rivit[1])
+
+    def test_index_simuloi_tiedoston(self):
+        """Test that index.py simulates a scenario file it is given."""
+        with redirect_stdout(io.StringIO()) as tuloste:
+            main([self.polku, "1"])
+        self.assertEqual(len(tuloste.getvalue().splitlines()), 2)
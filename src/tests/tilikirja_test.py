@@ -0,0 +1,155 @@
+"""Test module for the event-sourced storage ledger."""
+import glob
+import itertools
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from tilikirja import (
+    Tilikirja, Tapahtuma, LUONTI, LISAYS, TAYTTO, OTTO, TYHJENNYS
+)
+
+
+class TestTilikirja(unittest.TestCase):
+    """Test class for ledger recording, snapshots and replay."""
+
+    def setUp(self):
+        """Create a ledger in a temporary directory with a fake clock."""
+        self.hakemisto = tempfile.mkdtemp()
+        self.kirja = self.avaa(tilannevali=4)
+
+    def tearDown(self):
+        """Close the ledger and remove its files."""
+        self.kirja.sulje()
+        shutil.rmtree(self.hakemisto)
+
+    def avaa(self, tilannevali):
+        """Open a ledger whose clock ticks once per event."""
+        return Tilikirja(self.hakemisto, tilannevali,
+                         kello=itertools.count(1).__next__)
+
+    def avaa_uudelleen(self, tilannevali=4):
+        """Close the ledger and open it again from its files."""
+        self.kirja.sulje()
+        self.kirja = self.avaa(tilannevali)
+        return self.kirja
+
+    def test_kirjaa_toteutuneet_maarat(self):
+        """Test that events record the clamped amounts."""
+        varasto = self.kirja.uusi_varasto(10, 4)
+        varasto.lisaa_varastoon(3)
+        varasto.lisaa_varastoon(20)
+        varasto.lisaa_varastoon(-1)
+        self.assertEqual(varasto.ota_varastosta(2), 2)
+        self.assertEqual(varasto.ota_varastosta(50), 8)
+        self.assertEqual(list(self.kirja.tapahtumat()), [
+            Tapahtuma(1, 0, LUONTI, 10), Tapahtuma(2, 0, LISAYS, 4),
+            Tapahtuma(3, 0, LISAYS, 3), Tapahtuma(4, 0, TAYTTO, 3),
+            Tapahtuma(5, 0, OTTO, 2), Tapahtuma(6, 0, TYHJENNYS, 8),
+        ])
+
+    def test_toisto_palauttaa_tarkat_saldot(self):
+        """Test that reopening rebuilds bit-identical balances."""
+        satunnainen = random.Random(5)
+        varastot = [self.kirja.uusi_varasto(satunnainen.uniform(1, 9))
+                    for _ in range(5)]
+        for _ in range(500):
+            varasto = satunnainen.choice(varastot)
+            varasto.lisaa_varastoon(satunnainen.uniform(0, 3))
+            varasto.ota_varastosta(satunnainen.uniform(0, 3))
+        kirja = self.avaa_uudelleen()
+        self.assertEqual([varasto.saldo for varasto in kirja.varastot()],
+                         [varasto.saldo for varasto in varastot])
+
+    def test_tilanne_ajanhetkella(self):
+        """Test rebuilding balances at every point in time."""
+        varasto = self.kirja.uusi_varasto(10)
+        historia = {self.kirja.aika: 0.0}
+        for maara in [3, 4, 8, -1, 2]:
+            varasto.lisaa_varastoon(maara)
+            varasto.ota_varastosta(maara / 2)
+            historia[self.kirja.aika] = varasto.saldo
+        kirja = self.avaa_uudelleen()
+        for aika, saldo in historia.items():
+            self.assertEqual(kirja.tilanne(aika), ([10.0], [saldo]))
+        self.assertEqual(kirja.tilanne(0), ([], []))
+
+    def test_tilannekuvat_tallennetaan_jaksoittain(self):
+        """Test that snapshots are saved every tilannevali events."""
+        varasto = self.kirja.uusi_varasto(10)
+        for _ in range(8):
+            varasto.lisaa_varastoon(1)
+        self.assertEqual(len(self.kirja), 9)
+        self.assertEqual(self.kirja.tilannekuvat, [(4, 4), (8, 8)])
+
+    def test_puuttuvat_tilannekuvat_luodaan_avattaessa(self):
+        """Test that opening a log writes its missing snapshots."""
+        self.kirja.sulje()
+        for polku in glob.glob(os.path.join(self.hakemisto, "*")):
+            os.remove(polku)
+        self.kirja = self.avaa(tilannevali=1000)
+        varasto = self.kirja.uusi_varasto(10)
+        for _ in range(6):
+            varasto.lisaa_varastoon(1)
+        kirja = self.avaa_uudelleen(tilannevali=3)
+        self.assertEqual(kirja.tilannekuvat, [(3, 3), (6, 6)])
+        self.assertEqual(kirja.tilanne(), ([10.0], [6.0]))
+        self.assertEqual(kirja.tilanne(5), ([10.0], [4.0]))
+
+    def test_katkennut_tapahtuma_hylataan(self):
+        """Test that a partially written last event is dropped."""
+        self.kirja.uusi_varasto(10, 5)
+        self.kirja.sulje()
+        polku = os.path.join(self.hakemisto, "tapahtumat.log")
+        with open(polku, "ab") as loki:
+            loki.write(b"\x01\x02\x03")
+        self.kirja = self.avaa(tilannevali=4)
+        self.assertEqual(len(self.kirja), 2)
+        self.kirja.uusi_varasto(1)
+        self.assertEqual(self.kirja.tilanne(), ([10.0, 1.0], [5.0, 0.0]))
+
+    def test_varasto_jatkuu_avattaessa(self):
+        """Test that a reopened ledger hands out its storages by number."""
+        self.kirja.uusi_varasto(10, 4)
+        self.kirja.uusi_varasto(5)
+        kirja = self.avaa_uudelleen()
+        varasto = kirja.varasto(0)
+        self.assertEqual((varasto.tilavuus, varasto.saldo), (10, 4))
+        varasto.lisaa_varastoon(9)
+        self.assertEqual(varasto.ota_varastosta(3), 3)
+        self.assertEqual(len(kirja), 5)
+        self.assertEqual(self.avaa_uudelleen().tilanne(),
+                         ([10.0, 5.0], [7.0, 0.0]))
+
+    def test_varasto_tuntemattomalla_numerolla(self):
+        """Test that only storages in the ledger can be handed out."""
+        self.kirja.uusi_varasto(10)
+        for tunnus in (1, -1):
+            with self.assertRaises(IndexError):
+                self.kirja.varasto(tunnus)
+
+    def test_tilannekuva_korvataan_kokonaisena(self):
+        """Test that snapshots leave no temporary files to be loaded."""
+        with open(os.path.join(self.hakemisto, "tilanne.tmp"), "wb") as kuva:
+            kuva.write(b"\x01")
+        varasto = self.kirja.uusi_varasto(10)
+        for _ in range(3):
+            varasto.lisaa_varastoon(1)
+        self.assertEqual(
+            sorted(os.listdir(self.hakemisto)),
+            ["tapahtumat.log", "tilanne-000000000004.bin"]
+        )
+        self.assertEqual(self.avaa_uudelleen().tilannekuvat, [(4, 4)])
+
+    def test_saman_varaston_kahvat_jakavat_saldon(self):
+        """Test that two storages of one number clamp against one balance."""
+        self.kirja.uusi_varasto(10, 10)
+        kirja = self.avaa_uudelleen()
+        ensimmainen, toinen = kirja.varasto(0), kirja.varasto(0)
+        self.assertEqual(ensimmainen.ota_varastosta(8), 8)
+        self.assertEqual(toinen.ota_varastosta(8), 2)
+        self.assertEqual(ensimmainen.saldo, 0.0)
+        toinen.lisaa_varastoon(15)
+        self.assertEqual(ensimmainen.paljonko_mahtuu(), 0.0)
+        self.assertEqual(self.avaa_uudelleen().tilanne(), ([10.0], [10.0]))
@@ -0,0 +1,82 @@
+"""Test module for VarastoArray class."""
+import unittest
+from unittest import mock
+import varasto_array
+from varasto import Varasto
+from varasto_array import VarastoArray
+
+
+class TestVarastoArray(unittest.TestCase):
+    """Test class for VarastoArray functionality."""
+    def setUp(self):
+        """Set up test fixtures."""
+        self.varastot = VarastoArray([10, 10, 10])
+
+    def test_konstruktori_luo_tyhjat_varastot(self):
+        """Test that constructor creates empty storages."""
+        self.assertEqual(list(self.varastot.saldo), [0, 0, 0])
+        self.assertEqual(list(self.varastot.tilavuus), [10, 10, 10])
+        self.assertEqual(len(self.varastot), 3)
+
+    def test_konstruktori_rajaa_kuten_varasto(self):
+        """Test that constructor clamps values like Varasto."""
+        varastot = VarastoArray([-1, 5, 10], [-5, 8, 4])
+        self.assertEqual(list(varastot.tilavuus), [0, 5, 10])
+        self.assertEqual(list(varastot.saldo), [0, 5, 4])
+
+    def test_lisays_rajaa_kuten_varasto(self):
+        """Test that batched adding clamps like Varasto."""
+        self.varastot.lisaa_varastoon([8, -1, 15])
+        self.assertEqual(list(self.varastot.saldo), [8, 0, 10])
+        self.assertEqual(list(self.varastot.paljonko_mahtuu()), [2, 10, 0])
+
+    def test_lisays_yhdella_maaralla(self):
+        """Test that a single amount is added to every storage."""
+        self.varastot.lisaa_varastoon(3)
+        self.assertEqual(list(self.varastot.saldo), [3, 3, 3])
+
+    def test_otto_palauttaa_otetut_maarat(self):
+        """Test that batched taking returns the amounts actually taken."""
+        self.varastot.lisaa_varastoon(6)
+        saatu = self.varastot.ota_varastosta([2, -2, 10])
+        self.assertEqual(list(saatu), [2, 0, 6])
+        self.assertEqual(list(self.varastot.saldo), [4, 6, 0])
+
+    def test_vaara_maarien_lukumaara(self):
+        """Test that amounts of wrong length raise ValueError."""
+        with self.assertRaises(ValueError):
+            self.varastot.lisaa_varastoon([1, 2])
+
+    def test_muunnos_varastoista_ja_takaisin(self):
+        """Test conversion from and to Varasto objects."""
+        varastot = VarastoArray.varastoista([Varasto(10, 3), Varasto(5, 9)])
+        takaisin = varastot.varastoiksi()
+        self.assertEqual(
+            [(v.tilavuus, v.saldo) for v in takaisin], [(10, 3), (5, 5)]
+        )
+
+    def test_vastaa_yksittaisia_varastoja(self):
+        """Test that batched operations match single Varasto objects."""
+        yksittaiset = [Varasto(10, 2), Varasto(4), Varasto(7, 7)]
+        varastot = VarastoArray.varastoista(yksittaiset)
+        saatu = varastot.ota_varastosta([5, 1, 3])
+        odotettu = [v.ota_varastosta(m) for v, m in
+                    zip(yksittaiset, [5, 1, 3])]
+        self.assertEqual(list(saatu), odotettu)
+        self.assertEqual(
+            list(varastot.saldo), [v.saldo for v in yksittaiset]
+        )
+
+
+class TestVarastoArrayIlmanNumpya(TestVarastoArray):
+    """Test class for VarastoArray on array columns without NumPy."""
+    def setUp(self):
+        """Set up test fixtures without NumPy."""
+        patcher = mock.patch.object(varasto_array, "numpy", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+    def test_sarakkeet_ovat_taulukoita(self):
+        """Test that the columns are arrays of doubles."""
+        self.assertEqual(self.varastot.saldo.typecode, "d")
@@ -87,3 +87,9 @@ class TestVarasto(unittest.TestCase):
         """Test string representation format."""
         self.varasto.lisaa_varastoon(3)
         self.assertEqual(str(self.varasto), "saldo = 3, vielä tilaa 7")
+
+    def test_varastolla_ei_ole_dict_attribuuttia(self):
+        """Test that storage uses slots instead of an instance dict."""
+        self.assertFalse(hasattr(self.varasto, "__dict__"))
+        with self.assertRaises(AttributeError):
+            setattr(self.varasto, "muu", 1)
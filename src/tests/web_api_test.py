@@ -0,0 +1,151 @@
+"""Test module for the JSON API."""
+from tests.web_helpers import WebTestCase
+
+
+class TestWarehouseApi(WebTestCase):
+    """Test class for warehouse API routes."""
+
+    def test_create_and_list_warehouses(self):
+        """Test creating a warehouse and listing it with counts."""
+        response = self.client.post('/api/warehouses', json={'name': 'Main'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {
+            'id': 1, 'name': 'Main', 'version': 0, 'capacity': None,
+            'used': 0, 'free': None
+        })
+        response = self.client.get('/api/warehouses')
+        self.assertEqual(response.get_json(), {
+            'warehouses': [{'id': 1, 'name': 'Main', 'item_count': 0,
+                            'total_quantity': 0}],
+            'next': None
+        })
+
+    def test_create_warehouse_requires_name(self):
+        """Test that a warehouse without a name is rejected."""
+        for name in (' ', None, 5, ['Main']):
+            response = self.client.post('/api/warehouses',
+                                        json={'name': name})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/warehouses').get_json()['warehouses'], []
+        )
+
+    def test_create_warehouse_requires_object(self):
+        """Test that a body that is not a JSON object is rejected."""
+        response = self.client.post('/api/warehouses', json=['Main'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(),
+                         {'error': 'body must be a JSON object'})
+
+    def test_list_is_conditional(self):
+        """Test that an unchanged list answers 304 to its ETag."""
+        self.seed_warehouses(2)
+        etag = self.client.get('/api/warehouses').headers['ETag']
+        response = self.client.get(
+            '/api/warehouses', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_and_delete_warehouse(self):
+        """Test getting and deleting a warehouse."""
+        self.seed_warehouses(1)
+        response = self.client.get('/api/warehouses/1')
+        self.assertEqual(response.get_json()['name'], 'Warehouse 000')
+        self.assertEqual(
+            self.client.delete('/api/warehouses/1').status_code, 204
+        )
+        self.assertEqual(self.client.get('/api/warehouses/1').status_code, 404)
+        self.assertEqual(
+            self.client.delete('/api/warehouses/1').status_code, 404
+        )
+
+    def test_reused_id_gets_new_etag(self):
+        """Test that a warehouse taking a deleted one's id is not cached."""
+        self.seed_warehouses(1)
+        etag = self.client.get('/api/warehouses/1').headers['ETag']
+        self.client.delete('/api/warehouses/1')
+        self.client.post('/api/warehouses', json={'name': 'New'})
+        response = self.client.get('/api/warehouses/1',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['name'], 'New')
+
+
+class TestItemApi(WebTestCase):
+    """Test class for item API routes and conditional requests."""
+
+    def setUp(self):
+        """Set up a warehouse with two items."""
+        super().setUp()
+        self.seed_warehouses(1)
+
+    def test_list_items(self):
+        """Test listing the items of a warehouse."""
+        response = self.client.get('/api/warehouses/1/items')
+        self.assertEqual(response.get_json(), {
+            'items': [{'id': 1, 'name': 'Item 0', 'quantity': 1},
+                      {'id': 2, 'name': 'Item 1', 'quantity': 2}],
+            'next': None
+        })
+        self.assertIn(b'"items":[{', response.data)
+
+    def test_unchanged_items_return_not_modified(self):
+        """Test that ETag and Last-Modified give a 304 when unchanged."""
+        first = self.client.get('/api/warehouses/1/items')
+        for headers in ({'If-None-Match': first.headers['ETag']},
+                        {'If-Modified-Since': first.headers['Last-Modified']}):
+            response = self.client.get(
+                '/api/warehouses/1/items', headers=headers
+            )
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.data, b'')
+
+    def test_changes_invalidate_etag(self):
+        """Test that adding items bumps the warehouse version."""
+        etag = self.client.get('/api/warehouses/1/items').headers['ETag']
+        response = self.client.post(
+            '/api/warehouses/1/items',
+            json=[{'name': 'Bolt', 'quantity': 3}, {'name': '', 'quantity': 1},
+                  {'name': None, 'quantity': 2}]
+        )
+        self.assertEqual(response.get_json(), {'created': 1})
+        response = self.client.get(
+            '/api/warehouses/1/items', headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['items']), 3)
+
+    def test_create_item_in_missing_warehouse(self):
+        """Test creating an item in a missing warehouse."""
+        response = self.client.post(
+            '/api/warehouses/9/items', json={'name': 'Bolt', 'quantity': 1}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_delete_items(self):
+        """Test deleting many items at once."""
+        response = self.client.delete(
+            '/api/warehouses/1/items', json={'ids': [1, 2, 99, 'x', True]}
+        )
+        self.assertEqual(response.get_json(), {'deleted': 2})
+        for body in ([1], {'ids': 5}):
+            response = self.client.delete('/api/warehouses/1/items',
+                                          json=body)
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.client.get('/api/warehouses/1').get_json()['version'], 1
+        )
+
+    def test_get_and_delete_item(self):
+        """Test getting and deleting a single item."""
+        response = self.client.get('/api/warehouses/1/items/2')
+        self.assertEqual(response.get_json()['quantity'], 2)
+        self.assertEqual(
+            self.client.get('/api/warehouses/9/items/2').status_code, 404
+        )
+        self.assertEqual(
+            self.client.delete('/api/warehouses/1/items/2').status_code, 204
+        )
+        self.assertEqual(
+            self.client.delete('/api/warehouses/1/items/2').status_code, 404
+        )
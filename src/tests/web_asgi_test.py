@@ -0,0 +1,180 @@
+"""Test module for the ASGI serving mode.
+
+The web test suites run again against the ASGI application through a
+small WSGI-to-ASGI bridge, so both serving modes are held to the same
+tests.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from http import HTTPStatus
+from sqlalchemy import event
+from werkzeug.datastructures import EnvironHeaders
+from werkzeug.test import Client
+from tests import web_items_test, web_listing_test, web_test
+from tests.web_helpers import WebTestCase
+from web.models import db
+
+try:
+    from web.asgi import AsyncWarehouseApp
+except ImportError as error:
+    raise unittest.SkipTest(f'async dependencies missing: {error}')
+
+
+def http_scope(environ):
+    """Build an ASGI HTTP scope for a WSGI environ."""
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': environ['REQUEST_METHOD'],
+        'scheme': environ['wsgi.url_scheme'],
+        'path': environ['PATH_INFO'].encode('latin-1').decode(),
+        'root_path': '',
+        'query_string': environ['QUERY_STRING'].encode('latin-1'),
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in EnvironHeaders(environ).items()
+        ],
+        'server': (environ['SERVER_NAME'], int(environ['SERVER_PORT'])),
+    }
+
+
+class AsgiBridge:
+    """WSGI callable running an ASGI app on its own event loop."""
+
+    def __init__(self, app):
+        """Wrap an ASGI app."""
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+
+    def __call__(self, environ, start_response):
+        """Run one request through the ASGI app."""
+        body = environ['wsgi.input'].read()
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        self.loop.run_until_complete(
+            self.app(http_scope(environ), receive, send)
+        )
+        status = HTTPStatus(messages[0]['status'])
+        start_response(f'{status.value} {status.phrase}', [
+            (name.decode('latin-1'), value.decode('latin-1'))
+            for name, value in messages[0]['headers']
+        ])
+        return [message.get('body', b'') for message in messages[1:]]
+
+    def lifespan(self, *events):
+        """Send lifespan events to the app and return its replies."""
+        replies = []
+        pending = [{'type': f'lifespan.{name}'} for name in events]
+
+        async def receive():
+            return pending.pop(0)
+
+        async def send(message):
+            replies.append(message['type'])
+
+        self.loop.run_until_complete(
+            self.app({'type': 'lifespan'}, receive, send)
+        )
+        return replies
+
+    def close(self):
+        """Dispose of the app's engine and close the event loop."""
+        self.loop.run_until_complete(self.app.engine.dispose())
+        self.loop.close()
+
+
+class AsgiTestCase(WebTestCase):
+    """Base class serving the web app through the ASGI app."""
+
+    def setUp(self):
+        """Set up the ASGI app on a temporary database file."""
+        self.directory = tempfile.mkdtemp()
+        self.database_uri = (
+            f"sqlite:///{os.path.join(self.directory, 'test.db')}"
+        )
+        super().setUp()
+        self.bridge = AsgiBridge(AsyncWarehouseApp(self.app))
+        self.client = Client(self.bridge)
+
+    def tearDown(self):
+        """Close the ASGI app and remove the database file."""
+        super().tearDown()
+        self.bridge.close()
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def engines(self):
+        """Return the Flask-SQLAlchemy engine and the async engine."""
+        return super().engines() + [self.bridge.app.engine.sync_engine]
+
+
+class TestAsgiWebApp(AsgiTestCase, web_test.TestWebApp):
+    """Test class running the web app tests in ASGI mode."""
+
+
+class TestAsgiWarehouseListing(
+        AsgiTestCase, web_listing_test.TestWarehouseListing):
+    """Test class running the listing tests in ASGI mode."""
+
+
+class TestAsgiWarehouseItems(AsgiTestCase, web_items_test.TestWarehouseItems):
+    """Test class running the item page tests in ASGI mode."""
+
+    def test_streaming_mode(self):
+        """Test that streamed pages are served by the synchronous view."""
+        self.app.config['STREAM_WAREHOUSE_PAGES'] = True
+        response = self.client.get('/warehouse/1')
+        self.assertIn(b'Item 1 - Quantity: 2', response.data)
+        self.assertIn(b'Next page', response.data)
+
+
+class TestAsgiApp(AsgiTestCase):
+    """Test class for behaviour specific to the ASGI app."""
+
+    def test_pages_read_through_async_engine(self):
+        """Test that the list and warehouse pages skip the sync engine."""
+        self.seed_warehouses(1)
+        statements = []
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda *_args: statements.append(None))
+        self.assertIn(b'Warehouse 000', self.client.get('/').data)
+        self.assertIn(b'Item 1', self.client.get('/warehouse/1').data)
+        self.assertEqual(statements, [])
+
+    def test_lifespan(self):
+        """Test that startup and shutdown are acknowledged."""
+        self.assertEqual(
+            self.bridge.lifespan('startup', 'shutdown'),
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
+
+
+class TestAsgiMetrics(AsgiTestCase):
+    """Test class for metrics of the asynchronously served pages."""
+
+    app_config = {'METRICS_ENABLED': True}
+
+    def test_async_pages_count_statements(self):
+        """Test that statements of the async engine are counted."""
+        self.seed_warehouses(1)
+        self.client.get('/')
+        self.client.get('/warehouse/1')
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('warehouse_sql_statements_total{endpoint="index"} 1',
+                      text)
+        self.assertIn(
+            'warehouse_sql_statements_total{endpoint="view_warehouse"} 2',
+            text
+        )
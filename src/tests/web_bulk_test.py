@@ -0,0 +1,110 @@
+"""Test module for bulk item import and export."""
+import io
+import json
+from web.models import Item
+from tests.web_helpers import WebTestCase
+
+
+class TestBulkItems(WebTestCase):
+    """Test class for streaming bulk import and export."""
+
+    def setUp(self):
+        """Set up an empty warehouse."""
+        super().setUp()
+        self.seed_warehouses(1, items_each=0)
+
+    def upload(self, content, filename, warehouse_id=1):
+        """Upload text or bytes to the import endpoint."""
+        if isinstance(content, str):
+            content = content.encode()
+        return self.client.post(
+            f'/warehouse/{warehouse_id}/items/import',
+            data={'file': (io.BytesIO(content), filename)},
+            content_type='multipart/form-data'
+        )
+
+    def item_rows(self):
+        """Return (name, quantity) of all items ordered by id."""
+        with self.app.app_context():
+            items = Item.query.order_by(Item.id).all()
+            return [(item.name, item.quantity) for item in items]
+
+    def test_import_csv_skips_invalid_rows(self):
+        """Test CSV import with header and invalid rows."""
+        self.upload(
+            'name,quantity\nBolt,5\n,3\nNut,abc\nScrew,0\nWasher, 7\n',
+            'stock.csv'
+        )
+        self.assertEqual(self.item_rows(), [('Bolt', 5), ('Washer', 7)])
+
+    def test_import_ndjson(self):
+        """Test NDJSON import skips malformed lines."""
+        self.upload(
+            '{"name": "Bolt", "quantity": 2}\nnot json\n[1]\n'
+            '{"name": "Nut", "quantity": null}\n{"name": "Nut", "quantity": 4}',
+            'stock.ndjson'
+        )
+        self.assertEqual(self.item_rows(), [('Bolt', 2), ('Nut', 4)])
+
+    def test_import_ndjson_needs_integer_quantities(self):
+        """Test that NDJSON quantities must be JSON integers."""
+        self.upload(
+            '{"name": "Bolt", "quantity": 3.7}\n'
+            '{"name": "Nut", "quantity": true}\n'
+            '{"name": "Screw", "quantity": "4"}\n'
+            '{"name": "Washer", "quantity": 2}\n'
+            '{"name": null, "quantity": 4}\n'
+            '{"name": {"x": 1}, "quantity": 4}\n'
+            '{"name": 7, "quantity": 4}\n',
+            'stock.jsonl'
+        )
+        self.assertEqual(self.item_rows(), [('Screw', 4), ('Washer', 2)])
+
+    def test_import_rejects_files_that_are_not_utf8(self):
+        """Test that undecodable files get 400 and keep whole chunks."""
+        self.app.config['BULK_CHUNK_SIZE'] = 500
+        content = ''.join(f'Bolt {i},1\n' for i in range(1000)).encode()
+        response = self.upload(content + b'\xff\xfe,2\n', 'stock.csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.item_rows()), 500)
+        result = self.client.get('/api/search',
+                                 query_string={'q': 'bolt 499'})
+        self.assertEqual([hit['name'] for hit in result.get_json()['hits']],
+                         ['Bolt 499'])
+
+    def test_import_in_chunks(self):
+        """Test that import inserts every chunk."""
+        self.app.config['BULK_CHUNK_SIZE'] = 2
+        self.upload(''.join(f'Item {i},{i + 1}\n' for i in range(5)), 'a.csv')
+        self.assertEqual(len(self.item_rows()), 5)
+
+    def test_import_to_nonexistent_warehouse(self):
+        """Test that import to a missing warehouse inserts nothing."""
+        response = self.upload('Bolt,5\n', 'stock.csv', warehouse_id=999)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.item_rows(), [])
+
+    def test_export_csv(self):
+        """Test CSV export of warehouse items."""
+        self.upload('Bolt,5\n"Nut, small",2\n', 'stock.csv')
+        response = self.client.get('/warehouse/1/items/export.csv')
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(
+            response.data.decode(),
+            'name,quantity\r\nBolt,5\r\n"Nut, small",2\r\n'
+        )
+
+    def test_export_ndjson(self):
+        """Test NDJSON export of warehouse items."""
+        self.upload('Bolt,5\nNut,2\n', 'stock.csv')
+        response = self.client.get('/warehouse/1/items/export.ndjson')
+        lines = response.data.decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'name': 'Bolt', 'quantity': 5}, {'name': 'Nut', 'quantity': 2}]
+        )
+
+    def test_export_nonexistent_warehouse_redirects(self):
+        """Test that exporting a missing warehouse redirects to index."""
+        response = self.client.get('/warehouse/999/items/export.csv')
+        self.assertEqual(response.status_code, 302)
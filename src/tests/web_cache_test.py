@@ -0,0 +1,168 @@
+"""Test module for the read-through cache."""
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+from web.app import create_app
+from web.cache import Cache, LRUBackend, MemcachedBackend, NullBackend
+from tests.web_helpers import WebTestCase
+
+
+class FakeMemcachedHandler(socketserver.StreamRequestHandler):
+    """Handler understanding the memcached get and set commands."""
+
+    def handle(self):
+        """Serve commands until the client disconnects."""
+        for line in self.rfile:
+            command, key, *rest = line.split()
+            if command == b'set':
+                self.server.values[key] = self.rfile.read(int(rest[2]) + 2)
+                self.wfile.write(b'STORED\r\n')
+            elif key in self.server.values:
+                data = self.server.values[key]
+                self.wfile.write(b'VALUE %s 0 %d\r\n%sEND\r\n'
+                                 % (key, len(data) - 2, data))
+            else:
+                self.wfile.write(b'END\r\n')
+
+
+def start_fake_memcached(path):
+    """Start a fake memcached server on a Unix socket in a thread."""
+    server = socketserver.ThreadingUnixStreamServer(
+        path, FakeMemcachedHandler
+    )
+    server.values = {}
+    server.daemon_threads = True
+    server.block_on_close = False
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestCacheBackends(unittest.TestCase):
+    """Test class for cache backends and the generational cache."""
+
+    def test_lru_evicts_least_recently_used(self):
+        """Test that the LRU backend keeps at most max_entries."""
+        backend = LRUBackend(max_entries=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        backend.get('a')
+        backend.set('c', 3)
+        self.assertEqual((backend.get('a'), backend.get('b')), (1, None))
+        self.assertEqual(len(backend), 2)
+
+    def test_lru_expires_entries(self):
+        """Test that entries older than the TTL are not returned."""
+        backend = LRUBackend(ttl=-1)
+        backend.set('a', 1)
+        self.assertIsNone(backend.get('a'))
+
+    def test_get_or_set_counts_hits_and_misses(self):
+        """Test hit and miss counting and invalidation."""
+        cache = Cache(LRUBackend())
+        values = iter([1, 2])
+        self.assertEqual(cache.get_or_set('ns', 'k', lambda: next(values)), 1)
+        self.assertEqual(cache.get_or_set('ns', 'k', lambda: next(values)), 1)
+        cache.invalidate('ns')
+        self.assertEqual(cache.get_or_set('ns', 'k', lambda: next(values)), 2)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 2})
+
+    def test_none_is_not_cached(self):
+        """Test that a None result is computed again."""
+        cache = Cache(NullBackend())
+        self.assertIsNone(cache.get_or_set('ns', 'k', lambda: None))
+        self.assertEqual(cache.get_or_set('ns', 'k', lambda: 5), 5)
+
+    def test_memcached_backend_without_server_misses(self):
+        """Test that an unreachable server behaves like an empty cache."""
+        backend = MemcachedBackend('/nonexistent/memcached.sock')
+        backend.set('page', 1)
+        self.assertIsNone(backend.get('page'))
+
+
+class TestMemcachedBackend(unittest.TestCase):
+    """Test class for the socket backend against a fake server."""
+
+    def setUp(self):
+        """Start a fake memcached server on a Unix socket."""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'memcached.sock')
+        self.server = start_fake_memcached(self.path)
+
+    def tearDown(self):
+        """Stop the server and remove its socket."""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_get_and_set(self):
+        """Test storing and reading JSON values."""
+        backend = MemcachedBackend(self.path)
+        self.assertIsNone(backend.get('page'))
+        backend.set('page', ['<html>', 3])
+        self.assertEqual(backend.get('page'), ['<html>', 3])
+
+    def test_apps_share_invalidation(self):
+        """Test that a change made by one app is seen through another."""
+        uri = f"sqlite:///{os.path.join(self.directory, 'test.db')}"
+        first, second = (create_app({
+            'SQLALCHEMY_DATABASE_URI': uri, 'CACHE_BACKEND': 'memcached',
+            'CACHE_SOCKET': self.path
+        }).test_client() for _ in range(2))
+        first.post('/warehouse/create', data={'name': 'Main'})
+        self.assertNotIn(b'Bolt', second.get('/warehouse/1').data)
+        first.post('/warehouse/1/item/add',
+                   data={'name': 'Bolt', 'quantity': '7'})
+        self.assertIn(b'Bolt - Quantity: 7', second.get('/warehouse/1').data)
+
+
+class TestCachedPages(WebTestCase):
+    """Test class for cached pages and their invalidation."""
+
+    def setUp(self):
+        """Set up an app with the in-memory cache enabled."""
+        super().setUp()
+        self.app.extensions['warehouse_cache'] = Cache(LRUBackend())
+        self.seed_warehouses(1)
+
+    def stats(self):
+        """Return the cache counters."""
+        return self.client.get('/api/cache/stats').get_json()
+
+    def test_repeated_pages_are_cached(self):
+        """Test that repeated page views hit the cache."""
+        for _ in range(3):
+            self.client.get('/')
+            self.client.get('/warehouse/1')
+        self.assertEqual(self.stats(), {'hits': 4, 'misses': 3})
+
+    def test_creating_warehouse_invalidates_index(self):
+        """Test that a new warehouse shows up on the cached index."""
+        self.client.get('/')
+        self.client.post('/warehouse/create', data={'name': 'Fresh'})
+        self.assertIn(b'Fresh', self.client.get('/').data)
+
+    def test_item_changes_invalidate_pages(self):
+        """Test that item changes show up on cached pages."""
+        self.client.get('/')
+        self.client.get('/warehouse/1')
+        self.client.post('/warehouse/1/item/add',
+                         data={'name': 'Bolt', 'quantity': '7'})
+        self.assertIn(b'Bolt - Quantity: 7',
+                      self.client.get('/warehouse/1').data)
+        self.assertIn(b'(3 items, 10 in stock)', self.client.get('/').data)
+        self.client.post('/warehouse/1/item/3/adjust',
+                         data={'action': 'take', 'amount': '2'})
+        self.assertIn(b'Bolt - Quantity: 5',
+                      self.client.get('/warehouse/1').data)
+        self.client.post('/warehouse/1/item/3/delete')
+        self.assertNotIn(b'Bolt', self.client.get('/warehouse/1').data)
+
+    def test_deleting_warehouse_invalidates_pages(self):
+        """Test that a deleted warehouse is no longer served from cache."""
+        self.client.get('/warehouse/1')
+        self.client.post('/warehouse/1/delete')
+        self.assertEqual(self.client.get('/warehouse/1').status_code, 302)
+        self.assertIn(b'No warehouses yet.', self.client.get('/').data)
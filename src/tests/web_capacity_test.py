@@ -0,0 +1,176 @@
+"""Test module for warehouse capacity."""
+from web.capacity import free_space_query
+from web.models import db, Warehouse
+from web.stock import add_stock
+from tests.web_helpers import WebTestCase
+
+
+class TestCapacity(WebTestCase):
+    """Test class for clamping additions to the warehouse capacity."""
+
+    def setUp(self):
+        """Set up a warehouse with capacity 10 and one without a limit."""
+        super().setUp()
+        self.client.post('/warehouse/create',
+                         data={'name': 'Small', 'capacity': '10'})
+        self.client.post('/warehouse/create',
+                         data={'name': 'Open', 'capacity': ''})
+
+    def add_item(self, name, quantity, warehouse_id=1):
+        """Add an item to a warehouse through the web route."""
+        self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                         data={'name': name, 'quantity': str(quantity)})
+
+    def space(self, warehouse_id=1):
+        """Return the (capacity, used, free) of a warehouse."""
+        data = self.client.get(f'/api/warehouses/{warehouse_id}').get_json()
+        return data['capacity'], data['used'], data['free']
+
+    def quantities(self, warehouse_id=1):
+        """Return the item quantities of a warehouse by name."""
+        data = self.client.get(
+            f'/api/warehouses/{warehouse_id}/items'
+        ).get_json()
+        return {item['name']: item['quantity'] for item in data['items']}
+
+    def test_added_items_are_clamped_to_capacity(self):
+        """Test that additions fill the warehouse and no more."""
+        self.add_item('Bolt', 6)
+        self.add_item('Nut', 6)
+        self.add_item('Screw', 1)
+        self.assertEqual(self.quantities(), {'Bolt': 6, 'Nut': 4})
+        self.assertEqual(self.space(), (10, 10, 0))
+        self.add_item('Screw', 100, warehouse_id=2)
+        self.assertEqual(self.space(2), (None, 100, None))
+
+    def test_add_stock_returns_amount_added(self):
+        """Test that adding stock fills the warehouse to capacity."""
+        self.add_item('Bolt', 4)
+        self.add_item('Nut', 3)
+        with self.app.app_context():
+            self.assertEqual(add_stock(1, 1, 5), 3)
+            self.assertEqual(add_stock(1, 1, 5), 0)
+            self.assertEqual(add_stock(2, 3, 5), 0)
+            db.session.commit()
+        self.assertEqual(self.quantities(), {'Bolt': 7, 'Nut': 3})
+
+    def test_stock_changes_update_used_capacity(self):
+        """Test that adds, takes and deletes keep used capacity current."""
+        self.add_item('Bolt', 4)
+        self.add_item('Nut', 3)
+        self.client.post('/warehouse/1/item/1/adjust',
+                         data={'action': 'add', 'amount': '3'})
+        self.client.post('/warehouse/1/item/2/adjust',
+                         data={'action': 'take', 'amount': '2'})
+        self.assertEqual(self.space(), (10, 8, 2))
+        self.client.post('/warehouse/1/item/1/delete')
+        self.assertEqual(self.space(), (10, 1, 9))
+
+    def test_import_leaves_out_what_does_not_fit(self):
+        """Test that bulk imports stop storing items once full."""
+        response = self.client.post('/api/warehouses/1/items', json=[
+            {'name': 'Bolt', 'quantity': 7}, {'name': 'Nut', 'quantity': 5},
+            {'name': 'Screw', 'quantity': 1}
+        ])
+        self.assertEqual(response.get_json(), {'created': 2})
+        self.assertEqual(self.quantities(), {'Bolt': 7, 'Nut': 3})
+
+    def test_form_rejects_invalid_capacity(self):
+        """Test that the form creates no warehouse for a bad capacity."""
+        for capacity in ('abc', '-5', '0'):
+            response = self.client.post(
+                '/warehouse/create', data={'name': 'Bad', 'capacity': capacity}
+            )
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/warehouse/create',
+                                    data={'name': 'Good', 'capacity': ' 5 '})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.space(3), (5, 0, 5))
+        self.assertEqual(self.client.get('/api/warehouses/4').status_code,
+                         404)
+
+    def test_chunked_import_counts_used_capacity_once(self):
+        """Test that each import chunk adds its total to used capacity."""
+        self.app.config['BULK_CHUNK_SIZE'] = 2
+        self.client.post('/api/warehouses/1/items', json=[
+            {'name': f'Item {i}', 'quantity': 2} for i in range(4)
+        ])
+        self.assertEqual(self.space(), (10, 8, 2))
+        self.add_item('Bolt', 5)
+        self.assertEqual(self.space(), (10, 10, 0))
+        self.assertEqual(self.quantities()['Bolt'], 2)
+
+    def test_api_creates_warehouse_with_capacity(self):
+        """Test creating warehouses with valid and invalid capacities."""
+        response = self.client.post('/api/warehouses',
+                                    json={'name': 'Big', 'capacity': 50})
+        self.assertEqual(response.get_json()['free'], 50)
+        for capacity in (0, -5, 'lots'):
+            response = self.client.post(
+                '/api/warehouses', json={'name': 'Bad', 'capacity': capacity}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_warehouse_page_shows_capacity(self):
+        """Test that the warehouse page shows used and free capacity."""
+        self.add_item('Bolt', 4)
+        self.assertIn(b'Capacity: 10, in stock 4, free 6',
+                      self.client.get('/warehouse/1').data)
+
+
+class TestWarehousesWithSpace(WebTestCase):
+    """Test class for finding warehouses with free capacity."""
+
+    def setUp(self):
+        """Set up warehouses with 5, 20, 0 and 8 free and one unlimited."""
+        super().setUp()
+        with self.app.app_context():
+            db.session.add_all([
+                Warehouse(name='A', capacity=5),
+                Warehouse(name='B', capacity=20),
+                Warehouse(name='C', capacity=3),
+                Warehouse(name='D', capacity=8),
+                Warehouse(name='E'),
+            ])
+            db.session.commit()
+        self.client.post('/api/warehouses/3/items',
+                         json={'name': 'Bolt', 'quantity': 3})
+
+    def find(self, amount, **cursor):
+        """Return the result of a search for warehouses with room."""
+        return self.client.get('/api/warehouses/space', query_string={
+            'amount': amount, **cursor
+        }).get_json()
+
+    def test_tightest_fits_come_first(self):
+        """Test that warehouses are listed by free capacity."""
+        result = self.find(6)
+        self.assertEqual(result['warehouses'], [
+            {'id': 4, 'name': 'D', 'capacity': 8, 'free': 8},
+            {'id': 2, 'name': 'B', 'capacity': 20, 'free': 20},
+        ])
+        self.assertIsNone(result['next'])
+        self.assertEqual(
+            [row['id'] for row in self.find(1)['warehouses']], [1, 4, 2]
+        )
+
+    def test_pagination(self):
+        """Test that pages follow the (free, id) cursor."""
+        self.app.config['WAREHOUSES_PER_PAGE'] = 2
+        first = self.find(1)
+        self.assertEqual(first['next'], [8, 4])
+        second = self.find(1, after_free=8, after_id=4)
+        self.assertEqual([row['id'] for row in second['warehouses']], [2])
+        self.assertIsNone(second['next'])
+
+    def test_query_uses_free_capacity_index(self):
+        """Test that the search is an index range scan."""
+        query = free_space_query(5).compile(
+            compile_kwargs={'literal_binds': True}
+        )
+        with self.app.app_context():
+            plan = db.session.execute(
+                db.text(f'EXPLAIN QUERY PLAN {query}')
+            ).all()
+        self.assertEqual(len(plan), 1)
+        self.assertIn('USING INDEX ix_warehouse_free', plan[0][3])
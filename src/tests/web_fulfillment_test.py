@@ -0,0 +1,193 @@
+"""Test module for order fulfillment and stock transfers."""
+from unittest import mock
+from sqlalchemy import event
+from web import fulfillment
+from web.fulfillment import Allocation, fulfill_order, stock_query
+from web.models import db
+from tests.web_helpers import WebTestCase
+
+
+class TestFulfillment(WebTestCase):
+    """Test class for taking orders and moving stock between warehouses."""
+
+    def setUp(self):
+        """Set up three warehouses, the second with capacity 10."""
+        super().setUp()
+        for name, capacity in (('A', ''), ('B', '10'), ('C', '')):
+            self.client.post('/warehouse/create',
+                             data={'name': name, 'capacity': capacity})
+        self.add_item(1, 'Bolt', 4)
+        self.add_item(2, 'Bolt', 5)
+        self.add_item(3, 'Nut', 3)
+
+    def add_item(self, warehouse_id, name, quantity):
+        """Add an item to a warehouse through the web route."""
+        self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                         data={'name': name, 'quantity': str(quantity)})
+
+    def quantities(self, warehouse_id):
+        """Return the item quantities of a warehouse by name."""
+        data = self.client.get(
+            f'/api/warehouses/{warehouse_id}/items'
+        ).get_json()
+        return {item['name']: item['quantity'] for item in data['items']}
+
+    def warehouse(self, warehouse_id):
+        """Return the JSON of a warehouse."""
+        return self.client.get(f'/api/warehouses/{warehouse_id}').get_json()
+
+    def transfer(self, source_id, body):
+        """Post a transfer and return the response."""
+        return self.client.post(
+            f'/api/warehouses/{source_id}/transfers', json=body
+        )
+
+    def test_order_takes_what_is_available(self):
+        """Test that lines are merged and taken in warehouse id order."""
+        result = self.client.post('/api/orders', json={'lines': [
+            {'name': 'Nut', 'quantity': 5},
+            {'name': 'Bolt', 'quantity': 6},
+            {'name': 'Bolt', 'quantity': 1},
+            {'name': 'Washer', 'quantity': 2},
+            {'name': 'Bolt', 'quantity': -3},
+            {'name': None, 'quantity': 2},
+        ]}).get_json()
+        self.assertFalse(result['complete'])
+        self.assertEqual(
+            [(line['name'], line['requested'], line['allocated'])
+             for line in result['lines']],
+            [('Bolt', 7, 7), ('Nut', 5, 3), ('Washer', 2, 0)]
+        )
+        self.assertEqual(result['lines'][0]['allocations'], [
+            {'warehouse_id': 1, 'item_id': 1, 'quantity': 4},
+            {'warehouse_id': 2, 'item_id': 2, 'quantity': 3},
+        ])
+        self.assertEqual(self.quantities(2), {'Bolt': 2})
+        self.assertEqual(self.quantities(3), {'Nut': 0})
+
+    def test_order_updates_warehouses(self):
+        """Test that warehouses taken from get new versions and used."""
+        with self.app.app_context():
+            lines = fulfill_order([('Bolt', 2)])
+            self.assertEqual(lines[0].allocations[0].warehouse_id, 1)
+        self.assertEqual(
+            [(self.warehouse(i)['version'], self.warehouse(i)['used'])
+             for i in (1, 2)],
+            [(2, 2), (1, 5)]
+        )
+
+    def test_complete_order(self):
+        """Test that an order fully in stock is complete."""
+        result = self.client.post('/api/orders', json={
+            'lines': [{'name': 'Bolt', 'quantity': 9}]
+        }).get_json()
+        self.assertTrue(result['complete'])
+        self.assertEqual(self.quantities(1), {'Bolt': 0})
+
+    def test_order_body_must_be_object_with_lines(self):
+        """Test that malformed order bodies are rejected."""
+        for body in ([{'name': 'Bolt', 'quantity': 1}], {'lines': 5}):
+            response = self.client.post('/api/orders', json=body)
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(1), {'Bolt': 4})
+
+    def test_order_takes_with_one_update(self):
+        """Test that all lines of an order are taken in one statement."""
+        statements = []
+        with self.app.app_context():
+            event.listen(
+                db.engine, 'before_cursor_execute',
+                lambda _conn, _cursor, statement, *_args:
+                statements.append(statement)
+            )
+            fulfill_order([('Bolt', 6), ('Nut', 1)])
+        self.assertEqual(
+            len([s for s in statements if s.startswith('UPDATE item')]), 1
+        )
+        self.assertEqual(self.quantities(2), {'Bolt': 3})
+
+    def test_stale_reads_are_taken_again(self):
+        """Test that items changed since they were read are read again."""
+        stale = [[Allocation(1, 1, 4)], [Allocation(2, 2, 7)]]
+        with self.app.app_context(), mock.patch.object(
+            fulfillment, 'read_allocations',
+            side_effect=lambda *args, read=fulfillment.read_allocations: (
+                stale.pop() if stale else read(*args)
+            )
+        ):
+            lines = fulfill_order([('Bolt', 5), ('Nut', 1)])
+        self.assertEqual(lines[0].allocations,
+                         [Allocation(1, 1, 4), Allocation(2, 2, 1)])
+        self.assertEqual(self.quantities(1), {'Bolt': 0})
+        self.assertEqual(self.quantities(2), {'Bolt': 4})
+
+    def test_takes_roll_back_with_their_order(self):
+        """Test that the savepoint of the takes does not commit them."""
+        with self.app.app_context():
+            fulfillment.take_lines([('Bolt', 6)])
+            db.session.rollback()
+        self.assertEqual(self.quantities(2), {'Bolt': 5})
+
+    def test_transfer_is_clamped_to_target_capacity(self):
+        """Test that transfers move what the target has room for."""
+        self.add_item(1, 'Nut', 2)
+        result = self.transfer(1, {'target': 2, 'lines': [
+            {'name': 'Bolt', 'quantity': 10},
+            {'name': 'Nut', 'quantity': 2},
+        ]}).get_json()
+        self.assertEqual(result['lines'], [
+            {'name': 'Bolt', 'requested': 10, 'moved': 4},
+            {'name': 'Nut', 'requested': 2, 'moved': 1},
+        ])
+        self.assertEqual(self.quantities(1), {'Bolt': 0, 'Nut': 1})
+        self.assertEqual(self.quantities(2), {'Bolt': 9, 'Nut': 1})
+        self.assertEqual(self.warehouse(2)['free'], 0)
+
+    def test_transfer_to_warehouse_without_limit(self):
+        """Test that a transfer creates the target's item if missing."""
+        result = self.transfer(2, {'target': 3, 'lines': [
+            {'name': 'Bolt', 'quantity': 3}
+        ]}).get_json()
+        self.assertEqual(result['lines'][0]['moved'], 3)
+        self.assertEqual(self.quantities(3), {'Bolt': 3, 'Nut': 3})
+        self.assertEqual(self.warehouse(2)['free'], 8)
+
+    def test_empty_transfer_keeps_versions(self):
+        """Test that a transfer moving nothing leaves both versions."""
+        versions = [self.warehouse(1)['version'], self.warehouse(2)['version']]
+        result = self.transfer(1, {'target': 2, 'lines': [
+            {'name': 'Nut', 'quantity': 2}
+        ]}).get_json()
+        self.assertEqual(result['lines'][0]['moved'], 0)
+        self.assertEqual(
+            [self.warehouse(1)['version'], self.warehouse(2)['version']],
+            versions
+        )
+
+    def test_transfer_locks_before_reading(self):
+        """Test that a transfer holds the write lock from its first read."""
+        with self.app.app_context():
+            fulfillment.lock_warehouses([1, 2])
+            connection = db.session.connection().connection
+            self.assertTrue(connection.driver_connection.in_transaction)
+            db.session.rollback()
+
+    def test_invalid_transfers(self):
+        """Test that transfers need an existing source and other target."""
+        self.assertEqual(self.transfer(99, {'target': 1}).status_code, 404)
+        for target in (1, '2', True, None, 99):
+            response = self.transfer(1, {'target': target, 'lines': []})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities(1), {'Bolt': 4})
+
+    def test_stock_query_uses_covering_index(self):
+        """Test that the items of a name are found through its index."""
+        with self.app.app_context():
+            query = stock_query('Bolt').compile(
+                db.engine, compile_kwargs={'literal_binds': True}
+            )
+            plan = db.session.execute(
+                db.text(f'EXPLAIN QUERY PLAN {query}')
+            ).all()
+        self.assertIn('COVERING INDEX ix_item_name_warehouse_id_quantity',
+                      plan[0][3])
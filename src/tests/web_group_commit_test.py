@@ -0,0 +1,101 @@
+"""Test module for group commit of item writes."""
+import threading
+from unittest import mock
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from web.group_commit import GroupCommitQueue
+from web.models import db, Item
+from tests.web_helpers import WebTestCase
+
+
+def insert_item(name):
+    """Add an item to the first warehouse."""
+    db.session.add(Item(name=name, quantity=1, warehouse_id=1))
+
+
+class TestGroupCommit(WebTestCase):
+    """Test class for batching item writes into shared transactions."""
+
+    def setUp(self):
+        """Set up an app with group commit and one warehouse."""
+        super().setUp()
+        self.app.config['GROUP_COMMIT_WAIT'] = True
+        self.queue = GroupCommitQueue(self.app, interval=0.2)
+        self.app.extensions['group_commit'] = self.queue
+        self.seed_warehouses(1)
+
+    def item_names(self):
+        """Return the names of all items in the database."""
+        with self.app.app_context():
+            return set(db.session.scalars(db.select(Item.name)))
+
+    def test_add_and_delete_wait_for_commit(self):
+        """Test that writes are visible when the request returns."""
+        self.client.post('/warehouse/1/item/add',
+                         data={'name': 'Bolt', 'quantity': '4'})
+        self.assertIn(b'Bolt - Quantity: 4',
+                      self.client.get('/warehouse/1').data)
+        self.client.post('/warehouse/1/item/3/delete')
+        self.assertNotIn(b'Bolt', self.client.get('/warehouse/1').data)
+
+    def test_concurrent_writes_share_a_commit(self):
+        """Test that requests arriving together are committed together."""
+        commits = []
+        with self.app.app_context():
+            event.listen(db.engine, 'commit', commits.append)
+        self.add_concurrently(8)
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(self.queue.commits, 1)
+        self.assertEqual(len(self.item_names()), 10)
+
+    def add_concurrently(self, count):
+        """Add items from count concurrent requests."""
+        def add(number):
+            self.app.test_client().post(
+                '/warehouse/1/item/add',
+                data={'name': f'Bolt {number}', 'quantity': '1'}
+            )
+        threads = [threading.Thread(target=add, args=(number,))
+                   for number in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_batches_are_limited_in_size(self):
+        """Test that a full batch is committed without waiting."""
+        self.queue.max_operations = 2
+        for number in range(5):
+            self.queue.submit(insert_item, f'Nut {number}')
+        self.queue.flush()
+        self.assertEqual(self.queue.commits, 3)
+
+    def test_acknowledged_writes_are_committed_later(self):
+        """Test that without waiting, writes are committed by the queue."""
+        self.app.config['GROUP_COMMIT_WAIT'] = False
+        response = self.client.post('/warehouse/1/item/add',
+                                    data={'name': 'Bolt', 'quantity': '4'})
+        self.assertEqual(response.status_code, 302)
+        self.queue.flush()
+        self.assertIn('Bolt', self.item_names())
+
+    def test_failed_write_is_rolled_back_alone(self):
+        """Test that a failing operation does not fail its batch."""
+        with self.assertLogs(self.app.logger, 'ERROR') as logs:
+            failing = self.queue.submit(insert_item, None)
+            batched = self.queue.submit(insert_item, 'Kept')
+            self.assertRaises(IntegrityError, failing.result)
+            batched.result()
+        self.assertIn('insert_item failed', logs.output[0])
+        self.assertEqual(self.queue.commits, 1)
+        self.assertIn('Kept', self.item_names())
+
+    def test_failed_commit_fails_its_writes(self):
+        """Test that a failing commit fails its batch and not later."""
+        with self.assertLogs(self.app.logger, 'ERROR'), mock.patch.object(
+            db.session, 'commit', side_effect=RuntimeError('failed')
+        ):
+            lost = self.queue.submit(insert_item, 'Lost')
+            self.assertRaises(RuntimeError, lost.result)
+        self.queue.submit(insert_item, 'Kept').result()
+        self.assertEqual(self.item_names() & {'Lost', 'Kept'}, {'Kept'})
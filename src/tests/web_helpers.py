@@ -0,0 +1,74 @@
+"""Shared fixtures for the web application tests."""
+import functools
+import unittest
+from sqlalchemy import event
+from web.app import create_app
+from web.models import db, Warehouse, Item
+from web.schema import serialize_database
+
+
+@functools.cache
+def database_template():
+    """Return an empty prepared database shared by all test apps."""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    with app.app_context():
+        return serialize_database(db.engine)
+
+
+class WebTestCase(unittest.TestCase):
+    """Base class that creates an app with an in-memory database.
+
+    The database starts as a copy of a template prepared once, so that
+    tests do not create the schema for every app.
+    """
+
+    database_uri = 'sqlite:///:memory:'
+    app_config = {}
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': self.database_uri,
+            'FAST_START': True,
+            'DATABASE_TEMPLATE': database_template(),
+            **self.app_config
+        })
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Tear down test fixtures."""
+        with self.app.app_context():
+            db.drop_all()
+
+    def seed_warehouses(self, count, items_each=2):
+        """Insert warehouses with items directly into the database."""
+        with self.app.app_context():
+            for i in range(count):
+                db.session.add(Warehouse(
+                    name=f'Warehouse {i:03d}',
+                    items=[Item(name=f'Item {j}', quantity=j + 1)
+                           for j in range(items_each)]
+                ))
+            db.session.commit()
+
+    def count_statements(self, url):
+        """Return the number of SQL statements issued by a GET request."""
+        statements = []
+
+        def record(*_args):
+            statements.append(None)
+
+        for engine in self.engines():
+            event.listen(engine, 'before_cursor_execute', record)
+        try:
+            self.client.get(url)
+        finally:
+            for engine in self.engines():
+                event.remove(engine, 'before_cursor_execute', record)
+        return len(statements)
+
+    def engines(self):
+        """Return the engines whose statements count_statements counts."""
+        with self.app.app_context():
+            return [db.engine]
@@ -0,0 +1,82 @@
+"""Test module for the paginated and streamed item view."""
+from web.models import db
+from web.queries import warehouse_items_query
+from tests.web_helpers import WebTestCase
+
+
+class TestWarehouseItems(WebTestCase):
+    """Test class for item pagination, filtering and streaming."""
+
+    def setUp(self):
+        """Set up a warehouse with five items."""
+        super().setUp()
+        self.app.config['ITEMS_PER_PAGE'] = 2
+        self.seed_warehouses(1, items_each=5)
+
+    def test_first_page_links_to_next(self):
+        """Test that the first page shows a limited number of items."""
+        response = self.client.get('/warehouse/1')
+        self.assertIn(b'Item 1 - ', response.data)
+        self.assertNotIn(b'Item 2 - ', response.data)
+        self.assertIn(b'/warehouse/1?after=2', response.data)
+
+    def test_last_page_has_no_next_link(self):
+        """Test that the page after the cursor ends the listing."""
+        response = self.client.get('/warehouse/1?after=4')
+        self.assertIn(b'Item 4 - Quantity: 5', response.data)
+        self.assertNotIn(b'Item 3 - ', response.data)
+        self.assertNotIn(b'Next page', response.data)
+
+    def test_prefix_filter(self):
+        """Test that items are filtered by name prefix."""
+        self.client.post(
+            '/warehouse/1/item/add', data={'name': 'Bolt', 'quantity': '4'}
+        )
+        response = self.client.get('/warehouse/1?prefix=Bo')
+        self.assertIn(b'Bolt - Quantity: 4', response.data)
+        self.assertNotIn(b'Item 0', response.data)
+
+    def test_prefix_filter_without_matches(self):
+        """Test that a prefix without matches shows a message."""
+        response = self.client.get('/warehouse/1?prefix=%25')
+        self.assertIn(b'No matching items.', response.data)
+
+    def test_prefix_is_not_a_pattern(self):
+        """Test that the prefix matches literally and case-sensitively."""
+        self.client.post(
+            '/warehouse/1/item/add', data={'name': '%off', 'quantity': '1'}
+        )
+        response = self.client.get('/warehouse/1?prefix=%25')
+        self.assertIn(b'%off - Quantity: 1', response.data)
+        response = self.client.get('/warehouse/1?prefix=item')
+        self.assertIn(b'No matching items.', response.data)
+
+    def plan(self, **kwargs):
+        """Return the query plan steps of an item page query."""
+        with self.app.app_context():
+            query = warehouse_items_query(1, **kwargs).compile(
+                db.engine, compile_kwargs={'literal_binds': True}
+            )
+            return [row[3] for row in db.session.execute(
+                db.text(f'EXPLAIN QUERY PLAN {query}')
+            )]
+
+    def test_prefix_page_reads_name_index(self):
+        """Test that a prefix is looked up as a range of the name index."""
+        plan = self.plan(prefix='It')
+        self.assertIn('INDEX ix_item_warehouse_id_name', plan[0])
+        self.assertIn('name>? AND name<?', plan[0])
+
+    def test_page_reads_items_in_id_order(self):
+        """Test that an unfiltered page is read without sorting."""
+        plan = self.plan(after=2)
+        self.assertIn('INDEX ix_item_warehouse_id ', plan[0])
+        self.assertFalse([step for step in plan if 'TEMP B-TREE' in step])
+
+    def test_streaming_mode(self):
+        """Test that streaming mode renders the same page as a stream."""
+        self.app.config['STREAM_WAREHOUSE_PAGES'] = True
+        response = self.client.get('/warehouse/1')
+        self.assertTrue(response.is_streamed)
+        self.assertIn(b'Item 1 - Quantity: 2', response.data)
+        self.assertIn(b'Next page', response.data)
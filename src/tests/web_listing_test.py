@@ -0,0 +1,53 @@
+"""Test module for the warehouse listing."""
+from web.models import db
+from web.queries import warehouse_summaries_query
+from tests.web_helpers import WebTestCase
+
+
+class TestWarehouseListing(WebTestCase):
+    """Test class for the aggregated and paginated warehouse list."""
+
+    def test_index_shows_item_counts_and_totals(self):
+        """Test that index shows aggregated item counts and quantities."""
+        self.seed_warehouses(1, items_each=3)
+        response = self.client.get('/')
+        self.assertIn(b'(3 items, 6 in stock)', response.data)
+
+    def test_index_query_count_is_constant(self):
+        """Test that index issues the same statements for any size."""
+        self.seed_warehouses(3)
+        few = self.count_statements('/')
+        self.seed_warehouses(30)
+        self.assertEqual(self.count_statements('/'), few)
+
+    def test_index_query_walks_name_index(self):
+        """Test that a page is read in index order without sorting."""
+        with self.app.app_context():
+            query = warehouse_summaries_query(('M', 5)).compile(
+                db.engine, compile_kwargs={'literal_binds': True}
+            )
+            plan = [row[3] for row in db.session.execute(
+                db.text(f'EXPLAIN QUERY PLAN {query}')
+            )]
+        self.assertIn('USING COVERING INDEX ix_warehouse_name', plan[0])
+        self.assertFalse([step for step in plan if 'TEMP B-TREE' in step])
+
+    def test_index_first_page(self):
+        """Test that index shows the first page and a next page link."""
+        self.app.config['WAREHOUSES_PER_PAGE'] = 2
+        self.seed_warehouses(3)
+        response = self.client.get('/')
+        self.assertIn(b'Warehouse 001', response.data)
+        self.assertNotIn(b'Warehouse 002', response.data)
+        self.assertIn(b'Next page', response.data)
+
+    def test_index_keyset_pagination(self):
+        """Test that index continues after the (name, id) cursor."""
+        self.app.config['WAREHOUSES_PER_PAGE'] = 2
+        self.seed_warehouses(3)
+        response = self.client.get(
+            '/', query_string={'after_name': 'Warehouse 001', 'after_id': 2}
+        )
+        self.assertNotIn(b'Warehouse 001', response.data)
+        self.assertIn(b'Warehouse 002', response.data)
+        self.assertNotIn(b'Next page', response.data)
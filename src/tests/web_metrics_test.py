@@ -0,0 +1,68 @@
+"""Test module for request instrumentation and profiling."""
+import os
+import shutil
+import tempfile
+import unittest
+from web.app import create_app
+from web.metrics import RouteMetrics, prometheus_text
+
+
+class TestPrometheusText(unittest.TestCase):
+    """Test class for metric totals and their text format."""
+
+    def test_totals_are_formatted_per_endpoint(self):
+        """Test that totals are accumulated and formatted."""
+        metrics = RouteMetrics()
+        metrics.record('index', {'sql_statements': 2, 'response_bytes': 10})
+        metrics.record('index', {'sql_statements': 1, 'response_bytes': 5})
+        text = prometheus_text(metrics.snapshot(), {'hits': 4})
+        self.assertIn('# TYPE warehouse_requests_total counter', text)
+        self.assertIn('warehouse_requests_total{endpoint="index"} 2', text)
+        self.assertIn(
+            'warehouse_sql_statements_total{endpoint="index"} 3', text
+        )
+        self.assertIn('warehouse_cache_hits_total 4', text)
+
+
+class TestInstrumentedApp(unittest.TestCase):
+    """Test class for the instrumented application."""
+
+    def setUp(self):
+        """Create an app with metrics and profiling enabled."""
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+            'METRICS_ENABLED': True,
+            'PROFILE_SLOW_REQUESTS': True,
+            'PROFILE_THRESHOLD_MS': 0,
+            'PROFILE_DIR': self.directory,
+        })
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Remove dumped profiles."""
+        shutil.rmtree(self.directory)
+
+    def test_metrics_endpoint_reports_routes(self):
+        """Test that route metrics are exposed in Prometheus format."""
+        self.client.get('/')
+        self.client.get('/')
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('warehouse_requests_total{endpoint="index"} 2', text)
+        self.assertIn('warehouse_sql_statements_total{endpoint="index"} 2',
+                      text)
+        self.assertNotIn(
+            'warehouse_template_seconds_total{endpoint="index"} 0\n', text
+        )
+        self.assertNotIn(
+            'warehouse_response_bytes_total{endpoint="index"} 0\n', text
+        )
+
+    def test_slow_requests_are_profiled(self):
+        """Test that requests over the threshold are dumped."""
+        self.client.get('/warehouse/1')
+        self.assertTrue(any(
+            name.startswith('view_warehouse-') and name.endswith('.prof')
+            for name in os.listdir(self.directory)
+        ))
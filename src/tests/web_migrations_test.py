@@ -0,0 +1,106 @@
+"""Test module for schema migrations of existing databases."""
+import os
+import sqlite3
+import tempfile
+import unittest
+from sqlalchemy import inspect
+from web.app import create_app
+from web.capacity import CAPACITY_TRIGGERS
+from web.models import db
+
+
+class TestMigrations(unittest.TestCase):
+    """Test class for upgrading databases created by older versions."""
+
+    def setUp(self):
+        """Create a database file with the original unindexed schema."""
+        handle, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        with sqlite3.connect(self.path) as connection:
+            connection.executescript(
+                'CREATE TABLE warehouse ('
+                ' id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL);'
+                'CREATE TABLE item ('
+                ' id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL,'
+                ' quantity INTEGER NOT NULL,'
+                ' warehouse_id INTEGER NOT NULL REFERENCES warehouse (id));'
+            )
+        connection.close()
+
+    def tearDown(self):
+        """Remove the database file."""
+        os.remove(self.path)
+
+    def test_indexes_are_added_to_existing_tables(self):
+        """Test that creating the app adds missing indexes."""
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'})
+        with app.app_context():
+            inspector = inspect(db.engine)
+            item_indexes = {
+                index['name']: index['column_names']
+                for index in inspector.get_indexes('item')
+            }
+            warehouse_indexes = {
+                index['name']: index['column_names']
+                for index in inspector.get_indexes('warehouse')
+            }
+            db.engine.dispose()
+        self.assertEqual(
+            item_indexes['ix_item_warehouse_id_name'], ['warehouse_id', 'name']
+        )
+        self.assertIn('ix_item_warehouse_id', item_indexes)
+        self.assertEqual(warehouse_indexes, {
+            'ix_warehouse_name': ['name'], 'ix_warehouse_free': ['free']
+        })
+
+    def test_columns_are_added_to_existing_tables(self):
+        """Test that creating the app adds missing columns."""
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("INSERT INTO warehouse VALUES (1, 'Old')")
+        connection.close()
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'})
+        response = app.test_client().get('/api/warehouses/1')
+        with app.app_context():
+            db.engine.dispose()
+        self.assertEqual(response.get_json()['version'], 0)
+
+    def test_used_capacity_is_computed_for_existing_items(self):
+        """Test that upgrading counts the items already in a warehouse."""
+        with sqlite3.connect(self.path) as connection:
+            connection.executescript(
+                "INSERT INTO warehouse VALUES (1, 'Old');"
+                "INSERT INTO item VALUES (1, 'Bolt', 3, 1), (2, 'Nut', 4, 1);"
+            )
+        connection.close()
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'})
+        response = app.test_client().get('/api/warehouses/1')
+        with app.app_context():
+            db.engine.dispose()
+        self.assertEqual(response.get_json()['used'], 7)
+
+    def test_changed_capacity_triggers_are_replaced(self):
+        """Test that upgrading replaces capacity triggers of old versions."""
+        self.open_app()
+        with sqlite3.connect(self.path) as connection:
+            connection.executescript(
+                'DROP TRIGGER item_capacity_insert;'
+                'CREATE TRIGGER item_capacity_insert AFTER INSERT ON item '
+                'BEGIN UPDATE warehouse SET used = used + new.quantity '
+                'WHERE id = new.warehouse_id; END;'
+                'PRAGMA user_version = 0;'
+            )
+        connection.close()
+        self.open_app()
+        with sqlite3.connect(self.path) as connection:
+            trigger = connection.execute(
+                "SELECT sql FROM sqlite_master "
+                "WHERE name = 'item_capacity_insert'"
+            ).fetchone()[0]
+        connection.close()
+        self.assertEqual(trigger, CAPACITY_TRIGGERS[0])
+
+    def open_app(self):
+        """Create an app on the database file and release the file."""
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{self.path}'})
+        with app.app_context():
+            db.engine.dispose()
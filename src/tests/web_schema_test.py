@@ -0,0 +1,114 @@
+"""Test module for schema markers, fast start and template databases."""
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine
+from web.app import create_app
+from web.models import db
+from web.schema import schema_version, stored_version
+from tests.web_helpers import database_template
+
+
+def execute(statement=None):
+    """Run a statement on the app's database and close its connections."""
+    if statement:
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql(statement)
+    db.engine.dispose()
+
+
+class TestFastStart(unittest.TestCase):
+    """Test class for skipping the preparation of current databases."""
+
+    def setUp(self):
+        """Prepare a database file."""
+        self.directory = tempfile.mkdtemp()
+        self.uri = f"sqlite:///{os.path.join(self.directory, 'test.db')}"
+        self.run_app(False)
+
+    def tearDown(self):
+        """Remove the database file."""
+        shutil.rmtree(self.directory)
+
+    def create_app(self, fast_start):
+        """Create an app on the database file."""
+        return create_app({'SQLALCHEMY_DATABASE_URI': self.uri,
+                           'FAST_START': fast_start})
+
+    def run_app(self, fast_start, statement=None):
+        """Create an app, run a statement on it and return its statements.
+
+        The statements returned are those the app ran while starting.
+        """
+        statements = []
+
+        def record(_connection, _cursor, sql, *_args):
+            statements.append(sql)
+
+        event.listen(Engine, 'before_cursor_execute', record)
+        try:
+            app = self.create_app(fast_start)
+        finally:
+            event.remove(Engine, 'before_cursor_execute', record)
+        with app.app_context():
+            execute(statement)
+        return statements
+
+    def indexes(self):
+        """Return the warehouse table's index names and schema marker."""
+        app = self.create_app(True)
+        with app.app_context():
+            names = {index['name']
+                     for index in inspect(db.engine).get_indexes('warehouse')}
+            version = stored_version(db.engine)
+            db.engine.dispose()
+        return names, version
+
+    def test_current_database_is_not_reflected(self):
+        """Test that a fast start only reads the marker and shard layout."""
+        self.assertEqual(self.run_app(True), [
+            'PRAGMA user_version', 'SELECT shard, shards FROM shard_layout'
+        ])
+        self.assertGreater(len(self.run_app(False)), 10)
+
+    def test_changes_are_missed_only_with_a_current_marker(self):
+        """Test that a fast start trusts the marker of a database."""
+        self.run_app(True, 'DROP INDEX ix_warehouse_free')
+        self.assertNotIn('ix_warehouse_free', self.indexes()[0])
+        self.run_app(False)
+        self.assertIn('ix_warehouse_free', self.indexes()[0])
+
+    def test_outdated_marker_upgrades_the_schema(self):
+        """Test that a database with another marker is prepared again."""
+        self.run_app(True, 'DROP INDEX ix_warehouse_free')
+        self.run_app(True, 'PRAGMA user_version = 1')
+        names, version = self.indexes()
+        self.assertIn('ix_warehouse_free', names)
+        self.assertEqual(version, schema_version())
+
+
+class TestDatabaseTemplate(unittest.TestCase):
+    """Test class for in-memory databases copied from a template."""
+
+    def create_app(self):
+        """Create an app on a copy of the test database template."""
+        return create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                           'FAST_START': True,
+                           'DATABASE_TEMPLATE': database_template()})
+
+    def test_apps_get_separate_copies(self):
+        """Test that each app starts from the template's empty schema."""
+        first = self.create_app().test_client()
+        first.post('/api/warehouses', json={'name': 'Main', 'capacity': 5})
+        first.post('/warehouse/1/item/add',
+                   data={'name': 'Red Bolt', 'quantity': '9'})
+        self.assertEqual(
+            first.get('/api/search?q=bolt').get_json()['hits'][0]['quantity'],
+            5
+        )
+        second = self.create_app().test_client()
+        self.assertEqual(
+            second.get('/api/warehouses').get_json()['warehouses'], []
+        )
@@ -0,0 +1,164 @@
+"""Test module for the item search across warehouses."""
+import os
+import shutil
+import tempfile
+from web.app import create_app
+from web.models import db
+from web.search import deferred_indexing, index_pending
+from tests.web_helpers import WebTestCase
+
+
+def insert_pending(*names):
+    """Insert items into the first warehouse without indexing them."""
+    with deferred_indexing():
+        for name in names:
+            db.session.execute(db.text(
+                "INSERT INTO item (name, quantity, warehouse_id) "
+                "VALUES (:name, 1, 1)"
+            ), {'name': name})
+    db.session.commit()
+
+
+def index_and_check():
+    """Index the pending items and check the integrity of the index."""
+    index_pending()
+    db.session.execute(db.text(
+        "INSERT INTO item_search(item_search) VALUES ('integrity-check')"
+    ))
+    db.session.commit()
+
+
+class TestItemSearch(WebTestCase):
+    """Test class for the full-text item search and its index."""
+
+    def setUp(self):
+        """Set up two warehouses with items."""
+        super().setUp()
+        self.seed_warehouses(2, items_each=0)
+        self.add_items(1, ('Red Bolt', 3), ('Steel Valves', 7))
+        self.add_items(2, ('Red Bolt', 4), ('Spring', 1))
+
+    def add_items(self, warehouse_id, *items):
+        """Add items to a warehouse through the web route."""
+        for name, quantity in items:
+            self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                             data={'name': name, 'quantity': str(quantity)})
+
+    def search(self, text, after=''):
+        """Return the JSON result of an item search."""
+        return self.client.get(
+            '/api/search', query_string={'q': text, 'after': after}
+        ).get_json()
+
+    def hit_names(self, text):
+        """Return the names of the items matching a search."""
+        return [hit['name'] for hit in self.search(text)['hits']]
+
+    def test_search_returns_hits_and_totals(self):
+        """Test that hits name their warehouse and totals sum by name."""
+        result = self.search('bolt')
+        self.assertEqual(result['hits'], [
+            {'id': 1, 'name': 'Red Bolt', 'quantity': 3,
+             'warehouse_id': 1, 'warehouse_name': 'Warehouse 000'},
+            {'id': 3, 'name': 'Red Bolt', 'quantity': 4,
+             'warehouse_id': 2, 'warehouse_name': 'Warehouse 001'},
+        ])
+        self.assertEqual(result['totals'], [
+            {'name': 'Red Bolt', 'total_quantity': 7, 'warehouse_count': 2}
+        ])
+        self.assertIsNone(result['next'])
+
+    def test_words_match_prefixes_and_all_must_match(self):
+        """Test matching of word prefixes, long words and several words."""
+        self.assertEqual(self.hit_names('VALVE'), ['Steel Valves'])
+        self.assertEqual(self.hit_names('valve'), ['Steel Valves'])
+        self.assertEqual(self.hit_names('valves'), ['Steel Valves'])
+        self.assertEqual(self.hit_names('spring'), ['Spring'])
+        self.assertEqual(self.hit_names('sprin'), ['Spring'])
+        self.assertEqual(self.hit_names('sprints'), [])
+        self.assertEqual(self.hit_names('re bo'), ['Red Bolt', 'Red Bolt'])
+        self.assertEqual(self.hit_names('red valve'), [])
+        self.assertEqual(self.hit_names('" * -'), [])
+
+    def test_index_follows_item_changes(self):
+        """Test that deletes, imports and cascades update the index."""
+        self.client.post('/warehouse/1/item/1/delete')
+        self.client.post('/api/warehouses/1/items',
+                         json=[{'name': 'Brass Bolt', 'quantity': 2}])
+        self.assertEqual(self.hit_names('bolt'), ['Red Bolt', 'Brass Bolt'])
+        self.client.post('/warehouse/2/delete')
+        self.client.delete('/api/warehouses/1/items', json={'ids': [5]})
+        self.assertEqual(self.hit_names('bolt'), [])
+        self.assertEqual(self.hit_names('steel'), ['Steel Valves'])
+
+    def test_pending_items_are_indexed_at_the_end(self):
+        """Test that items changed before they are indexed stay consistent."""
+        with self.app.app_context():
+            insert_pending('Brass Bolt', 'Iron Bolt')
+        self.assertEqual(self.hit_names('bolt'), ['Red Bolt', 'Red Bolt'])
+        self.client.post('/warehouse/1/item/5/delete')
+        with self.app.app_context():
+            db.session.execute(db.text(
+                "UPDATE item SET name = 'Iron Nut' WHERE id = 6"
+            ))
+            index_and_check()
+        self.assertEqual(self.hit_names('bolt'), ['Red Bolt', 'Red Bolt'])
+        self.assertEqual(self.hit_names('nut'), ['Iron Nut'])
+
+    def test_pagination(self):
+        """Test that search pages follow the next cursor."""
+        self.app.config['SEARCH_RESULTS_PER_PAGE'] = 1
+        first = self.search('red')
+        self.assertEqual([hit['id'] for hit in first['hits']], [1])
+        second = self.search('red', first['next'])
+        self.assertEqual([hit['id'] for hit in second['hits']], [3])
+        self.assertIsNone(second['next'])
+
+    def test_search_page(self):
+        """Test that the search page lists hits, totals and warehouses."""
+        response = self.client.get('/search?q=bolt')
+        self.assertIn(b'Red Bolt: 7 in 2 warehouse(s)', response.data)
+        self.assertIn(b'<a href="/warehouse/2">Warehouse 001</a>',
+                      response.data)
+        self.assertIn(b'No items found',
+                      self.client.get('/search?q=anvil').data)
+
+
+class TestSearchIndexCreation(WebTestCase):
+    """Test class for creating the index of an existing database."""
+
+    def setUp(self):
+        """Set up an app on a temporary database file."""
+        self.directory = tempfile.mkdtemp()
+        self.database_uri = (
+            f"sqlite:///{os.path.join(self.directory, 'test.db')}"
+        )
+        super().setUp()
+
+    def tearDown(self):
+        """Remove the database file."""
+        super().tearDown()
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def test_existing_items_are_indexed(self):
+        """Test that an index created for existing items finds them."""
+        self.seed_warehouses(1)
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql('DROP TABLE item_search')
+            db.engine.dispose()
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': self.database_uri})
+        response = self.app.test_client().get('/api/search?q=item')
+        self.assertEqual(len(response.get_json()['hits']), 2)
+
+    def test_pending_items_are_indexed_on_start(self):
+        """Test that items of an unfinished import are indexed later."""
+        self.seed_warehouses(1, items_each=0)
+        with self.app.app_context():
+            insert_pending('Bolt')
+            db.engine.dispose()
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': self.database_uri})
+        response = self.app.test_client().get('/api/search?q=bolt')
+        self.assertEqual(len(response.get_json()['hits']), 1)
@@ -0,0 +1,215 @@
+"""Test module for sharding warehouses over several databases."""
+import os
+import shutil
+import tempfile
+import unittest
+from web.app import create_app
+from web.group_commit import GroupCommitQueue
+from web.models import db, Warehouse, Item
+from tests.web_helpers import WebTestCase
+
+
+class TestSharding(WebTestCase):
+    """Test class for routing warehouses and items to their shards."""
+
+    def setUp(self):
+        """Set up an app with two extra shard files."""
+        self.directory = tempfile.mkdtemp()
+        self.app_config = {'SHARD_DATABASE_URIS': tuple(
+            f"sqlite:///{os.path.join(self.directory, f'{number}.db')}"
+            for number in (1, 2)
+        )}
+        super().setUp()
+
+    def tearDown(self):
+        """Dispose of the shard engines and remove their files."""
+        super().tearDown()
+        for engine in self.engines():
+            engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def create_warehouses(self, *names):
+        """Create warehouses through the web route."""
+        for name in names:
+            self.client.post('/warehouse/create', data={'name': name})
+
+    def shard_ids(self, model):
+        """Return the ids of a model's rows on each shard."""
+        with self.app.app_context():
+            return [
+                db.session.scalars(
+                    db.select(model.id), bind_arguments={'bind': engine}
+                ).all()
+                for engine in self.engines()
+            ]
+
+    def engines(self):
+        """Return the engines of every shard."""
+        return self.app.extensions['shards'].engines
+
+    def test_warehouses_spread_over_shards(self):
+        """Test that new warehouses take turns and ids name their shard."""
+        self.create_warehouses(*'ABCDEF')
+        self.assertEqual(self.shard_ids(Warehouse), [[1, 4], [2, 5], [3, 6]])
+        response = self.client.post('/api/warehouses', json={'name': 'G'})
+        self.assertEqual(response.get_json()['id'], 7)
+        self.assertEqual(self.client.get('/api/warehouses/5').get_json(), {
+            'id': 5, 'name': 'E', 'version': 0, 'capacity': None, 'used': 0,
+            'free': None
+        })
+
+    def test_index_merges_shards_in_name_order(self):
+        """Test that listing pages cover every shard in name order."""
+        self.app.config['WAREHOUSES_PER_PAGE'] = 2
+        self.create_warehouses('E', 'B', 'D', 'A', 'C')
+        names, url = [], '/api/warehouses'
+        while url:
+            page = self.client.get(url).get_json()
+            names += [warehouse['name'] for warehouse in page['warehouses']]
+            url = page['next'] and (
+                f"/api/warehouses?after_name={page['next'][0]}"
+                f"&after_id={page['next'][1]}"
+            )
+        self.assertEqual(names, ['A', 'B', 'C', 'D', 'E'])
+        self.assertIn(b'href="/warehouse/4">A<', self.client.get('/').data)
+
+    def test_index_queries_each_shard_once(self):
+        """Test that the listing issues one statement per shard."""
+        self.create_warehouses('A', 'B')
+        self.assertEqual(self.count_statements('/'), 3)
+
+    def test_items_stay_on_their_warehouse_shard(self):
+        """Test that items with equal ids on two shards are kept apart."""
+        self.create_warehouses('A', 'B')
+        for warehouse_id in (1, 2):
+            self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                             data={'name': f'Bolt {warehouse_id}',
+                                   'quantity': '3'})
+        self.assertEqual(self.shard_ids(Item), [[1], [1], []])
+        self.client.post('/warehouse/2/item/1/delete')
+        self.assertIn(b'Bolt 1', self.client.get('/warehouse/1').data)
+        self.assertNotIn(b'Bolt 2', self.client.get('/warehouse/2').data)
+
+    def test_delete_warehouse_on_its_shard(self):
+        """Test that deleting a warehouse removes it and its items."""
+        self.create_warehouses('A', 'B')
+        self.client.post('/warehouse/2/item/add',
+                         data={'name': 'Bolt', 'quantity': '3'})
+        self.client.post('/warehouse/2/delete')
+        self.assertEqual(self.shard_ids(Warehouse), [[1], [], []])
+        self.assertEqual(self.shard_ids(Item), [[], [], []])
+
+    def test_group_commit_per_shard(self):
+        """Test that a batch spanning shards commits on each of them."""
+        self.app.config['GROUP_COMMIT_WAIT'] = False
+        commit_queue = GroupCommitQueue(self.app, interval=0.2)
+        self.app.extensions['group_commit'] = commit_queue
+        self.create_warehouses('A', 'B', 'C')
+        for warehouse_id in (1, 2, 3, 1):
+            self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                             data={'name': 'Bolt', 'quantity': '1'})
+        commit_queue.flush()
+        self.assertEqual(commit_queue.commits, 3)
+        self.assertEqual(self.shard_ids(Item), [[1, 2], [1], [1]])
+
+    def test_search_pages_through_every_shard(self):
+        """Test that search merges shards with equal item ids."""
+        self.app.config['SEARCH_RESULTS_PER_PAGE'] = 2
+        self.create_warehouses('A', 'B', 'C')
+        for warehouse_id in (3, 2, 1):
+            self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                             data={'name': 'Bolt', 'quantity': '2'})
+        first = self.client.get('/api/search?q=bolt').get_json()
+        second = self.client.get(
+            f"/api/search?q=bolt&after={first['next']}"
+        ).get_json()
+        self.assertEqual(
+            [hit['warehouse_id'] for hit in first['hits'] + second['hits']],
+            [1, 2, 3]
+        )
+        self.assertIsNone(second['next'])
+        self.assertEqual(first['totals'], [
+            {'name': 'Bolt', 'total_quantity': 6, 'warehouse_count': 3}
+        ])
+
+    def test_space_search_merges_shards(self):
+        """Test that warehouses with room are found on every shard."""
+        for name, capacity in (('A', '30'), ('B', '10'), ('C', '20')):
+            self.client.post('/warehouse/create',
+                             data={'name': name, 'capacity': capacity})
+        self.client.post('/warehouse/1/item/add',
+                         data={'name': 'Bolt', 'quantity': '25'})
+        result = self.client.get('/api/warehouses/space?amount=5').get_json()
+        self.assertEqual(
+            [(row['id'], row['free']) for row in result['warehouses']],
+            [(1, 5), (2, 10), (3, 20)]
+        )
+
+    def test_orders_and_transfers_stay_on_one_shard(self):
+        """Test that orders and transfers spanning shards are refused."""
+        self.create_warehouses('A', 'B', 'C', 'D')
+        for warehouse_id, name in ((1, 'Bolt'), (4, 'Bolt'), (2, 'Nut')):
+            self.client.post(f'/warehouse/{warehouse_id}/item/add',
+                             data={'name': name, 'quantity': '2'})
+        result = self.client.post('/api/orders', json={
+            'lines': [{'name': 'Bolt', 'quantity': 3}]
+        }).get_json()
+        self.assertEqual(
+            [(item['warehouse_id'], item['quantity'])
+             for item in result['lines'][0]['allocations']],
+            [(1, 2), (4, 1)]
+        )
+        response = self.client.post('/api/orders', json={
+            'lines': [{'name': 'Bolt', 'quantity': 1},
+                      {'name': 'Nut', 'quantity': 1}]
+        })
+        self.assertEqual(response.get_json(),
+                         {'error': 'order is stocked on several shards'})
+        self.assertEqual(
+            self.client.get('/api/warehouses/4/items').get_json()['items'],
+            [{'id': 2, 'name': 'Bolt', 'quantity': 1}]
+        )
+        response = self.client.post('/api/warehouses/3/transfers', json={
+            'target': 2, 'lines': [{'name': 'Bolt', 'quantity': 1}]
+        })
+        self.assertEqual(response.get_json(),
+                         {'error': 'target warehouse is on another shard'})
+
+
+class TestShardLayout(unittest.TestCase):
+    """Test class for refusing databases of another shard layout."""
+
+    def setUp(self):
+        """Prepare a directory for the database files."""
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Remove the database files."""
+        shutil.rmtree(self.directory)
+
+    def create_app(self, shards):
+        """Create an app on the main file and shards - 1 extra files."""
+        uris = [f"sqlite:///{os.path.join(self.directory, f'{number}.db')}"
+                for number in range(shards)]
+        app = create_app({'SQLALCHEMY_DATABASE_URI': uris[0],
+                          'SHARD_DATABASE_URIS': tuple(uris[1:])})
+        for engine in app.extensions['shards'].engines:
+            engine.dispose()
+        return app
+
+    def test_unsharded_database_with_warehouses_is_refused(self):
+        """Test that ids routed to other shards stop the app starting."""
+        client = self.create_app(1).test_client()
+        for name in 'AB':
+            client.post('/warehouse/create', data={'name': name})
+        with self.assertRaisesRegex(RuntimeError, 'other shards'):
+            self.create_app(2)
+
+    def test_changed_shard_count_is_refused(self):
+        """Test that shards only start in the layout they were made in."""
+        self.create_app(1)
+        self.create_app(3)
+        self.create_app(3)
+        for shards in (2, 1):
+            with self.assertRaisesRegex(RuntimeError, 'of 3, not'):
+                self.create_app(shards)
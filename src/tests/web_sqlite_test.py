@@ -0,0 +1,47 @@
+"""Test module for SQLite configuration profiles."""
+import os
+import shutil
+import tempfile
+import unittest
+from web.app import create_app
+from web.models import db
+
+
+class TestSqliteProfiles(unittest.TestCase):
+    """Test class for SQLite pragmas and engine options."""
+
+    def setUp(self):
+        """Create a temporary database file path."""
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'warehouse.db')
+        self.uri = f'sqlite:///{path}'
+
+    def tearDown(self):
+        """Remove the temporary database directory."""
+        shutil.rmtree(self.directory)
+
+    def pragmas(self, profile):
+        """Return journal mode, synchronous and busy timeout of a profile."""
+        app = create_app({
+            'PROFILE': profile, 'SQLALCHEMY_DATABASE_URI': self.uri
+        })
+        with app.app_context():
+            values = tuple(
+                db.session.execute(db.text(f'PRAGMA {name}')).scalar()
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            )
+            pool_size = db.engine.pool.size()
+            db.session.remove()
+            db.engine.dispose()
+        return values, pool_size
+
+    def test_default_profile_keeps_sqlite_defaults(self):
+        """Test that the default profile sets no pragmas."""
+        values, _ = self.pragmas('default')
+        self.assertEqual(values[:2], ('delete', 2))
+
+    def test_production_profile_enables_wal(self):
+        """Test that the production profile tunes SQLite and the pool."""
+        values, pool_size = self.pragmas('production')
+        self.assertEqual(values, ('wal', 1, 5000))
+        self.assertEqual(pool_size, 10)
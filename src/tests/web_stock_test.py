@@ -0,0 +1,138 @@
+"""Test module for atomic stock adjustments."""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from web.app import create_app
+from web.models import db, Warehouse, Item
+from web.stock import add_stock, take_stock
+from tests.web_helpers import WebTestCase
+
+
+class TestStockAdjustments(WebTestCase):
+    """Test class for add and take adjustments."""
+
+    def setUp(self):
+        """Set up a warehouse with items of quantity 1 and 2."""
+        super().setUp()
+        self.seed_warehouses(1)
+
+    def quantity(self, item_id):
+        """Return the current quantity of an item."""
+        with self.app.app_context():
+            return db.session.get(Item, item_id).quantity
+
+    def adjust(self, item_id, action, amount, warehouse_id=1):
+        """Post an adjustment form for an item."""
+        return self.client.post(
+            f'/warehouse/{warehouse_id}/item/{item_id}/adjust',
+            data={'action': action, 'amount': amount}
+        )
+
+    def test_add_increases_quantity(self):
+        """Test that adding increases quantity."""
+        self.adjust(1, 'add', '4')
+        self.assertEqual(self.quantity(1), 5)
+
+    def test_take_clamps_at_zero(self):
+        """Test that taking more than is in stock empties the item."""
+        self.adjust(2, 'take', '1')
+        self.assertEqual(self.quantity(2), 1)
+        self.adjust(2, 'take', '10')
+        self.assertEqual(self.quantity(2), 0)
+
+    def test_invalid_adjustments_do_nothing(self):
+        """Test negative amounts, unknown actions and wrong warehouses."""
+        self.adjust(2, 'take', '-3')
+        self.adjust(2, 'add', 'abc')
+        self.adjust(2, 'steal', '1')
+        self.adjust(2, 'take', '1', warehouse_id=999)
+        self.assertEqual(self.quantity(2), 2)
+
+    def test_take_returns_amount_taken(self):
+        """Test that take_stock returns the amount actually taken."""
+        with self.app.app_context():
+            self.assertEqual(take_stock(1, 2, 5), 2)
+            self.assertEqual(take_stock(1, 2, 5), 0)
+            self.assertEqual(take_stock(1, 999, 5), 0)
+            self.assertEqual(add_stock(1, 999, 5), 0)
+
+    def test_batch_adjustments(self):
+        """Test that a JSON batch returns the amounts applied."""
+        response = self.client.post('/warehouse/1/items/adjust', json={
+            'adjustments': [
+                {'item_id': 1, 'action': 'add', 'amount': 3},
+                {'item_id': 2, 'action': 'take', 'amount': 5},
+                {'item_id': 1, 'action': 'take', 'amount': 2},
+                'invalid'
+            ]
+        })
+        self.assertEqual(response.get_json(), {'results': [3, 2, 2]})
+        self.assertEqual((self.quantity(1), self.quantity(2)), (2, 0))
+
+    def test_malformed_batches_are_rejected(self):
+        """Test that malformed batches get 400 and change nothing."""
+        for body in ([], {'adjustments': 5},
+                     {'adjustments': [{'item_id': 'x', 'action': 'add'}]},
+                     {'adjustments': [{'item_id': True, 'action': 'add'}]},
+                     {'adjustments': [{'item_id': 2 ** 64, 'action': 'add'}]}):
+            response = self.client.post('/warehouse/1/items/adjust',
+                                        json=body)
+            self.assertEqual(response.status_code, 400)
+        response = self.client.post('/warehouse/1/items/adjust', json={
+            'adjustments': [{'item_id': 1, 'action': 'add', 'amount': 1e30},
+                            {'item_id': 1, 'action': 'add', 'amount': 2 ** 63}]
+        })
+        self.assertEqual(response.get_json(), {'results': [0, 0]})
+        self.assertEqual(self.quantity(1), 1)
+
+
+class TestConcurrentAdjustments(unittest.TestCase):
+    """Test class for adjustments from concurrent threads."""
+
+    def setUp(self):
+        """Create an app backed by a database file shared by threads."""
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, 'warehouse.db')
+        self.app = create_app({
+            'PROFILE': 'production',
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'
+        })
+        with self.app.app_context():
+            db.session.add(Warehouse(
+                name='Shared', items=[Item(name='Bolt', quantity=300)]
+            ))
+            db.session.commit()
+
+    def tearDown(self):
+        """Dispose the engine and remove the database file."""
+        with self.app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def run_threads(self, adjust, threads=8, repeats=50):
+        """Run an adjustment repeatedly in threads and return the sum."""
+        results = []
+
+        def work():
+            with self.app.app_context():
+                for _ in range(repeats):
+                    results.append(adjust(1, 1, 1))
+                    db.session.commit()
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        with self.app.app_context():
+            return sum(results), db.session.get(Item, 1).quantity
+
+    def test_concurrent_takes_lose_no_updates(self):
+        """Test that concurrent takes hand out exactly the stock."""
+        self.assertEqual(self.run_threads(take_stock), (300, 0))
+
+    def test_concurrent_adds_lose_no_updates(self):
+        """Test that concurrent adds are all counted."""
+        self.assertEqual(self.run_threads(add_stock), (400, 700))
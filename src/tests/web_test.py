@@ -1,27 +1,11 @@
 """Test module for the warehouse web application."""
-import unittest
-from web.app import create_app
 from web.models import db, Warehouse, Item
+from tests.web_helpers import WebTestCase
 
 
-class TestWebApp(unittest.TestCase):
+class TestWebApp(WebTestCase):
     """Test class for web application functionality."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.app = create_app({
-            'TESTING': True,
-            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'
-        })
-        self.client = self.app.test_client()
-        with self.app.app_context():
-            db.create_all()
-
-    def tearDown(self):
-        """Tear down test fixtures."""
-        with self.app.app_context():
-            db.drop_all()
-
     def test_index_shows_empty_warehouse_list(self):
         """Test that index shows empty warehouse list."""
         response = self.client.get('/')
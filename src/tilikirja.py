@@ -0,0 +1,328 @@
+"""Event-sourced storage ledger module.
+
+A ``Tilikirja`` records every change of its storages as a fixed size
+binary event in an append-only log file: the time in nanoseconds, the
+storage number, the kind of event and the amount actually added or
+taken after clamping. Additions that fill the storage and takes that
+empty it have kinds of their own, so replaying the log repeats exactly
+the arithmetic of ``Varasto`` and rebuilds bit-identical balances.
+
+Every ``tilannevali`` events the balances of all storages are saved as
+a snapshot. The state at any time is rebuilt by loading the latest
+snapshot before that time and replaying the events after it, which are
+scanned straight from a memory map of the log.
+"""
+import bisect
+import glob
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from varasto import Varasto
+
+TAPAHTUMA = struct.Struct("<qIBd")
+TILANNE = struct.Struct("<qqI")
+LUONTI, LISAYS, TAYTTO, OTTO, TYHJENNYS = range(5)
+
+Tapahtuma = namedtuple("Tapahtuma", ["aika", "varasto", "laji", "maara"])
+
+
+def _toista(nakyma, tilavuudet, saldot):
+    """Apply the events in a buffer to lists of volumes and balances."""
+    for _, tunnus, laji, maara in TAPAHTUMA.iter_unpack(nakyma):
+        if laji == LISAYS:
+            saldot[tunnus] += maara
+        elif laji == OTTO:
+            saldot[tunnus] -= maara
+        elif laji == LUONTI:
+            tilavuudet.append(maara)
+            saldot.append(0.0)
+        else:
+            saldot[tunnus] = tilavuudet[tunnus] if laji == TAYTTO else 0.0
+
+
+class _Ajat:  # pylint: disable=too-few-public-methods
+    """Sequence of the event times in a log buffer, for bisect."""
+
+    def __init__(self, nakyma):
+        """Initialize view of the log buffer."""
+        self.nakyma = nakyma
+
+    def __len__(self):
+        """Return the number of events."""
+        return len(self.nakyma) // TAPAHTUMA.size
+
+    def __getitem__(self, indeksi):
+        """Return the time of the event at index."""
+        return TAPAHTUMA.unpack_from(
+            self.nakyma, indeksi * TAPAHTUMA.size
+        )[0]
+
+
+class Tilikirja:  # pylint: disable=too-many-instance-attributes
+    """Append-only ledger of storage events with periodic snapshots."""
+
+    def __init__(self, hakemisto, tilannevali=1_000_000, kello=time.time_ns):
+        """Open or create a ledger in the given directory.
+
+        An existing log is replayed from its latest snapshot, and any
+        missing snapshots are written on the way.
+        """
+        self.hakemisto = hakemisto
+        self.tilannevali = tilannevali
+        self.kello = kello
+        self.tilavuudet, self.saldot, self.tilannekuvat = [], [], []
+        self.aika = self.tapahtumia = 0
+        self._loki = None
+        os.makedirs(hakemisto, exist_ok=True)
+        self._avaa_loki()
+
+    @property
+    def _loki_polku(self):
+        """Return the path of the log file."""
+        return os.path.join(self.hakemisto, "tapahtumat.log")
+
+    def _avaa_loki(self):
+        """Drop a torn last event, restore the state and open the log."""
+        with open(self._loki_polku, "ab") as loki:
+            self.tapahtumia = loki.tell() // TAPAHTUMA.size
+            loki.truncate(self.tapahtumia * TAPAHTUMA.size)
+        self._lataa_tilannekuvat()
+        self._toista_loppuun()
+        self._loki = open(  # pylint: disable=consider-using-with
+            self._loki_polku, "ab"
+        )
+
+    def _lataa_tilannekuvat(self):
+        """Find the snapshots covered by the log and load the latest."""
+        for polku in glob.glob(os.path.join(self.hakemisto, "tilanne-*")):
+            with open(polku, "rb") as tiedosto:
+                tapahtumia, aika, _ = TILANNE.unpack(
+                    tiedosto.read(TILANNE.size)
+                )
+            if tapahtumia <= self.tapahtumia:
+                self.tilannekuvat.append((aika, tapahtumia))
+        self.tilannekuvat.sort()
+        if self.tilannekuvat:
+            self.aika, tapahtumia = self.tilannekuvat[-1]
+            self.tilavuudet, self.saldot = self._lataa_tilannekuva(tapahtumia)
+
+    def _toista_loppuun(self):
+        """Replay the events after the latest snapshot."""
+        alku = self.tilannekuvat[-1][1] if self.tilannekuvat else 0
+        with self._nakyma() as nakyma:
+            while alku < self.tapahtumia:
+                alku = self._toista_jakso(nakyma, alku)
+
+    def _toista_jakso(self, nakyma, alku):
+        """Replay events up to the next snapshot and return where it ends.
+
+        A snapshot is written whenever the end is a multiple of
+        tilannevali.
+        """
+        loppu = min(alku - alku % self.tilannevali + self.tilannevali,
+                    self.tapahtumia)
+        _toista(nakyma[alku * TAPAHTUMA.size:loppu * TAPAHTUMA.size],
+                self.tilavuudet, self.saldot)
+        self.aika = _Ajat(nakyma)[loppu - 1]
+        if loppu % self.tilannevali == 0:
+            self.tallenna_tilannekuva(loppu)
+        return loppu
+
+    def _tilannekuva_polku(self, tapahtumia):
+        """Return the path of the snapshot taken after events."""
+        return os.path.join(self.hakemisto, f"tilanne-{tapahtumia:012d}.bin")
+
+    def tallenna_tilannekuva(self, tapahtumia=None):
+        """Save the balances after the given number of events.
+
+        The balances must be those after that many events, which by
+        default is all of them. The snapshot is written to a temporary
+        file that replaces the final one only when complete, so a crash
+        never leaves a torn snapshot behind.
+        """
+        if tapahtumia is None:
+            tapahtumia = self.tapahtumia
+        valiaikainen = os.path.join(self.hakemisto, "tilanne.tmp")
+        self._kirjoita_tilannekuva(valiaikainen, tapahtumia)
+        os.replace(valiaikainen, self._tilannekuva_polku(tapahtumia))
+        self.tilannekuvat.append((self.aika, tapahtumia))
+
+    def _kirjoita_tilannekuva(self, polku, tapahtumia):
+        """Write the balances to a file and flush it to disk."""
+        with open(polku, "wb") as tiedosto:
+            tiedosto.write(TILANNE.pack(
+                tapahtumia, self.aika, len(self.tilavuudet)
+            ))
+            tiedosto.write(array("d", self.tilavuudet).tobytes())
+            tiedosto.write(array("d", self.saldot).tobytes())
+            tiedosto.flush()
+            os.fsync(tiedosto.fileno())
+
+    def _lataa_tilannekuva(self, tapahtumia):
+        """Return the volumes and balances of a snapshot as lists."""
+        with open(self._tilannekuva_polku(tapahtumia), "rb") as tiedosto:
+            sisalto = tiedosto.read()
+        varastoja = TILANNE.unpack_from(sisalto)[2]
+        sarakkeet = array("d")
+        sarakkeet.frombytes(sisalto[TILANNE.size:])
+        return sarakkeet[:varastoja].tolist(), sarakkeet[varastoja:].tolist()
+
+    @contextmanager
+    def _nakyma(self):
+        """Yield a zero-copy view of the log through a memory map."""
+        if self._loki:
+            self._loki.flush()
+        if not self.tapahtumia:
+            yield memoryview(b"")
+            return
+        with open(self._loki_polku, "rb") as tiedosto, mmap.mmap(
+            tiedosto.fileno(), 0, access=mmap.ACCESS_READ
+        ) as kartta, memoryview(kartta) as nakyma:
+            yield nakyma
+
+    def uusi_varasto(self, tilavuus, alku_saldo=0):
+        """Create a storage whose changes are recorded in this ledger."""
+        return TilikirjaVarasto(self, tilavuus, alku_saldo)
+
+    def varasto(self, tunnus):
+        """Return a storage of this ledger by its number.
+
+        The storage shares its volume and balance with every other
+        storage of the same number, and its changes are recorded like
+        those of the storage that was created. Raises IndexError if
+        there is no such storage.
+        """
+        if not 0 <= tunnus < len(self.tilavuudet):
+            raise IndexError(f"no storage {tunnus}")
+        return TilikirjaVarasto.avaa(self, tunnus)
+
+    def kirjaa(self, tunnus, laji, maara):
+        """Append an event to the log and apply it to the current state."""
+        self.aika = max(self.kello(), self.aika)
+        tietue = TAPAHTUMA.pack(self.aika, tunnus, laji, maara)
+        self._loki.write(tietue)
+        _toista(tietue, self.tilavuudet, self.saldot)
+        self.tapahtumia += 1
+        if self.tapahtumia % self.tilannevali == 0:
+            self.tallenna_tilannekuva()
+
+    def tilanne(self, aika=None):
+        """Return lists of the volumes and balances at a time.
+
+        Without a time, the current state is returned.
+        """
+        if aika is None:
+            return list(self.tilavuudet), list(self.saldot)
+        indeksi = bisect.bisect_right(
+            self.tilannekuvat, aika, key=lambda kuva: kuva[0]
+        )
+        alku = self.tilannekuvat[indeksi - 1][1] if indeksi else 0
+        tilavuudet, saldot = (
+            self._lataa_tilannekuva(alku) if indeksi else ([], [])
+        )
+        with self._nakyma() as nakyma:
+            loppu = bisect.bisect_right(_Ajat(nakyma), aika, lo=alku)
+            _toista(nakyma[alku * TAPAHTUMA.size:loppu * TAPAHTUMA.size],
+                    tilavuudet, saldot)
+        return tilavuudet, saldot
+
+    def varastot(self, aika=None):
+        """Return the storages as they were at a time."""
+        return [
+            Varasto(tilavuus, saldo)
+            for tilavuus, saldo in zip(*self.tilanne(aika))
+        ]
+
+    def tapahtumat(self, tunnus=None):
+        """Yield the logged events, optionally of one storage only."""
+        self._loki.flush()
+        with open(self._loki_polku, "rb") as tiedosto:
+            for tietueet in iter(
+                lambda: tiedosto.read(TAPAHTUMA.size * 4096), b""
+            ):
+                yield from (
+                    Tapahtuma(*tapahtuma)
+                    for tapahtuma in TAPAHTUMA.iter_unpack(tietueet)
+                    if tunnus is None or tapahtuma[1] == tunnus
+                )
+
+    def __len__(self):
+        """Return the number of logged events."""
+        return self.tapahtumia
+
+    def sulje(self):
+        """Write buffered events to disk and close the log."""
+        self._loki.flush()
+        os.fsync(self._loki.fileno())
+        self._loki.close()
+
+    def __enter__(self):
+        """Return the ledger for use in a with statement."""
+        return self
+
+    def __exit__(self, *_virhe):
+        """Close the ledger."""
+        self.sulje()
+
+
+class TilikirjaVarasto(Varasto):
+    """Storage that records each change in a ledger.
+
+    The volume and balance are read from the ledger's current state, so
+    every storage of the same number clamps against the same balance.
+    Changes are applied by recording them.
+    """
+    __slots__ = ("kirja", "tunnus")
+
+    def __init__(self, kirja, tilavuus, alku_saldo = 0):
+        """Initialize storage and record its creation."""
+        # pylint: disable=super-init-not-called
+        self.kirja = kirja
+        self.tunnus = len(kirja.tilavuudet)
+        tilavuus = self._aseta_tilavuus(tilavuus)
+        kirja.kirjaa(self.tunnus, LUONTI, tilavuus)
+        alku_saldo = self._aseta_saldo(alku_saldo, tilavuus)
+        if alku_saldo > 0:
+            kirja.kirjaa(self.tunnus, LISAYS, alku_saldo)
+
+    @classmethod
+    def avaa(cls, kirja, tunnus):
+        """Return a storage already in a ledger without recording it."""
+        varasto = cls.__new__(cls)
+        varasto.kirja = kirja
+        varasto.tunnus = tunnus
+        return varasto
+
+    @property
+    def tilavuus(self):
+        """Return the volume of the storage in the ledger."""
+        return self.kirja.tilavuudet[self.tunnus]
+
+    @property
+    def saldo(self):
+        """Return the balance of the storage in the ledger."""
+        return self.kirja.saldot[self.tunnus]
+
+    def lisaa_varastoon(self, maara):
+        """Record an addition."""
+        if maara < 0:
+            return
+        if maara <= self.paljonko_mahtuu():
+            self.kirja.kirjaa(self.tunnus, LISAYS, maara)
+        else:
+            self.kirja.kirjaa(self.tunnus, TAYTTO, self.paljonko_mahtuu())
+
+    def ota_varastosta(self, maara):
+        """Record a take and return the amount taken."""
+        if maara < 0:
+            return 0.0
+        if maara > self.saldo:
+            otettu = self.saldo
+            self.kirja.kirjaa(self.tunnus, TYHJENNYS, otettu)
+            return otettu
+        self.kirja.kirjaa(self.tunnus, OTTO, maara)
+        return maara
@@ -1,6 +1,8 @@
 """Varasto module for managing storage."""
 class Varasto:
     """Class representing a storage container."""
+    __slots__ = ("tilavuus", "saldo")
+
     def __init__(self, tilavuus, alku_saldo = 0):
         """Initialize Varasto with given volume and initial balance."""
         self.tilavuus = self._aseta_tilavuus(tilavuus)
@@ -0,0 +1,377 @@
+"""JSON API for the warehouse web application.
+
+Responses about a single warehouse carry an ETag and Last-Modified
+header derived from the warehouse version, which every change to its
+items bumps, and from its creation time, since a new warehouse can get
+the id of a deleted one. Polling clients that send them back get an
+empty 304 reply without the items being loaded.
+"""
+from flask import Response, jsonify, request
+from werkzeug.http import is_resource_modified
+from web.bulk import import_items
+from web.cache import get_cache
+from web.capacity import warehouses_with_space
+from web.fulfillment import fulfill_order, order_shard, transfer_stock
+from web.models import db, Warehouse, Item, touch_warehouse
+from web.queries import warehouse_items
+from web.routes import (
+    cached_summaries, json_object, parse_cursor, parse_search
+)
+from web.search import search_items
+from web.sharding import add_warehouse, get_shards
+from web.validation import clean_item, is_id, parse_capacity
+
+
+def register_api_routes(app):
+    """Register all JSON API routes."""
+    app.json.compact = True
+    register_warehouse_api(app)
+    register_warehouse_detail_api(app)
+    register_capacity_api(app)
+    register_item_api(app)
+    register_item_bulk_api(app)
+    register_item_detail_api(app)
+    register_search_api(app)
+    register_order_api(app)
+
+
+def not_found():
+    """Return a JSON 404 response."""
+    return jsonify(error='not found'), 404
+
+
+def warehouse_json(warehouse):
+    """Serialize a warehouse."""
+    return {'id': warehouse.id, 'name': warehouse.name,
+            'version': warehouse.version, 'capacity': warehouse.capacity,
+            'used': warehouse.used, 'free': warehouse.free}
+
+
+def space_json(row):
+    """Serialize a warehouse with room for items."""
+    return {'id': row.id, 'name': row.name, 'capacity': row.capacity,
+            'free': row.free}
+
+
+def summary_json(row):
+    """Serialize a warehouse summary row."""
+    return {'id': row.id, 'name': row.name, 'item_count': row.item_count,
+            'total_quantity': row.total_quantity}
+
+
+def item_json(item):
+    """Serialize an item."""
+    return {'id': item.id, 'name': item.name, 'quantity': item.quantity}
+
+
+def hit_json(hit):
+    """Serialize an item search hit."""
+    return {'id': hit.id, 'name': hit.name, 'quantity': hit.quantity,
+            'warehouse_id': hit.warehouse_id,
+            'warehouse_name': hit.warehouse_name}
+
+
+def order_line_json(line):
+    """Serialize a fulfilled order line and the items it was taken from."""
+    return {
+        'name': line.name, 'requested': line.requested,
+        'allocated': sum(item.quantity for item in line.allocations),
+        'allocations': [item._asdict() for item in line.allocations]
+    }
+
+
+def order_json(order):
+    """Serialize the lines of a fulfilled order and whether it is complete."""
+    lines = [order_line_json(line) for line in order]
+    return {'lines': lines,
+            'complete': all(line['allocated'] == line['requested']
+                            for line in lines)}
+
+
+def item_pairs(data):
+    """Yield (name, quantity) pairs from a JSON object or list of them."""
+    records = data if isinstance(data, list) else [data]
+    for record in records:
+        if isinstance(record, dict):
+            yield record.get('name', ''), record.get('quantity')
+
+
+def order_lines(data):
+    """Return the valid (name, quantity) lines of a JSON order body.
+
+    Returns None unless the body is an object whose ``lines``, if given,
+    is a list.
+    """
+    if data is None or not isinstance(data.get('lines', []), list):
+        return None
+    return [
+        line for line in (
+            clean_item(*pair) for pair in item_pairs(data.get('lines'))
+        ) if line
+    ]
+
+
+def parse_ids():
+    """Return the valid item ids listed in a JSON body.
+
+    Returns None unless the body is an object whose ``ids`` is a list.
+    """
+    data = json_object()
+    ids = data.get('ids', []) if data is not None else None
+    if not isinstance(ids, list):
+        return None
+    return [item_id for item_id in ids if is_id(item_id)]
+
+
+def invalid_transfer(source_id, data):
+    """Return why a JSON transfer cannot be made, or None if it can."""
+    if order_lines(data) is None:
+        return 'lines must be a list'
+    target_id = data.get('target')
+    if not is_id(target_id) or target_id == source_id:
+        return 'target must be the id of another warehouse'
+    shards = get_shards()
+    if shards.engine_for(source_id) is not shards.engine_for(target_id):
+        return 'target warehouse is on another shard'
+    if not db.session.get(Warehouse, target_id):
+        return 'target warehouse not found'
+    return None
+
+
+def invalid_warehouse(data):
+    """Return why a JSON warehouse cannot be created, or None if it can."""
+    if data is None:
+        return 'body must be a JSON object'
+    name = data.get('name')
+    if not isinstance(name, str) or not name.strip():
+        return 'name must be a non-empty string'
+    capacity = data.get('capacity')
+    if capacity is not None and parse_capacity(capacity) is None:
+        return 'capacity must be a positive integer'
+    return None
+
+
+def warehouse_etag(warehouse):
+    """Return the ETag of a warehouse's current version."""
+    created = warehouse.created_at
+    stamp = f'{created:%Y%m%d%H%M%S%f}' if created else '0'
+    return f'warehouse-{warehouse.id}-{stamp}-v{warehouse.version}'
+
+
+def versioned_response(warehouse_id, build):
+    """Return build(warehouse) as JSON, or 304 if the client is current."""
+    warehouse = db.session.get(Warehouse, warehouse_id)
+    if not warehouse:
+        return not_found()
+    etag = warehouse_etag(warehouse)
+    if is_resource_modified(
+        request.environ, etag=etag, last_modified=warehouse.updated_at
+    ):
+        response = jsonify(build(warehouse))
+    else:
+        response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = warehouse.updated_at
+    return response
+
+
+def register_warehouse_api(app):
+    """Register warehouse collection API routes."""
+
+    @app.route('/api/warehouses')
+    def api_list_warehouses():
+        """List a page of warehouses with item counts."""
+        rows, next_page = cached_summaries(
+            parse_cursor(), app.config['WAREHOUSES_PER_PAGE']
+        )
+        response = jsonify(
+            warehouses=[summary_json(row) for row in rows], next=next_page
+        )
+        response.add_etag()
+        return response.make_conditional(request)
+
+    @app.route('/api/warehouses', methods=['POST'])
+    def api_create_warehouse():
+        """Create a warehouse from a JSON body with a name and capacity.
+
+        Without a capacity the warehouse has no limit.
+        """
+        data = json_object()
+        error = invalid_warehouse(data)
+        if error:
+            return jsonify(error=error), 400
+        warehouse = add_warehouse(
+            data['name'].strip(), parse_capacity(data.get('capacity'))
+        )
+        db.session.commit()
+        return jsonify(warehouse_json(warehouse)), 201
+
+    @app.route('/api/cache/stats')
+    def api_cache_stats():
+        """Return cache hit and miss counters."""
+        return jsonify(get_cache().stats())
+
+
+def register_warehouse_detail_api(app):
+    """Register single warehouse API routes."""
+
+    @app.route('/api/warehouses/<int:warehouse_id>')
+    def api_get_warehouse(warehouse_id):
+        """Return a warehouse."""
+        return versioned_response(warehouse_id, warehouse_json)
+
+    @app.route('/api/warehouses/<int:warehouse_id>', methods=['DELETE'])
+    def api_delete_warehouse(warehouse_id):
+        """Delete a warehouse and all its items."""
+        warehouse = db.session.get(Warehouse, warehouse_id)
+        if not warehouse:
+            return not_found()
+        db.session.delete(warehouse)
+        db.session.commit()
+        return '', 204
+
+
+def register_capacity_api(app):
+    """Register the route finding warehouses with free capacity."""
+
+    @app.route('/api/warehouses/space')
+    def api_warehouses_with_space():
+        """List a page of warehouses with room for ``amount`` items."""
+        rows, next_page = warehouses_with_space(
+            request.args.get('amount', 1, type=int), parse_space_cursor(),
+            app.config['WAREHOUSES_PER_PAGE']
+        )
+        return jsonify(
+            warehouses=[space_json(row) for row in rows], next=next_page
+        )
+
+
+def parse_space_cursor():
+    """Parse the (free, id) keyset cursor of warehouses with room."""
+    free = request.args.get('after_free', type=int)
+    warehouse_id = request.args.get('after_id', type=int)
+    if free is None or warehouse_id is None:
+        return None
+    return free, warehouse_id
+
+
+def register_item_api(app):
+    """Register item collection API routes."""
+
+    @app.route('/api/warehouses/<int:warehouse_id>/items')
+    def api_list_items(warehouse_id):
+        """List a page of a warehouse's items."""
+        def build(warehouse):
+            page = warehouse_items(
+                warehouse.id, request.args.get('after', type=int),
+                request.args.get('prefix', '').strip(),
+                app.config['ITEMS_PER_PAGE']
+            )
+            items = [item_json(item) for item in page]
+            return {'items': items, 'next': page.next_after}
+        return versioned_response(warehouse_id, build)
+
+
+def register_item_bulk_api(app):
+    """Register routes that create or delete many items at once."""
+
+    @app.route('/api/warehouses/<int:warehouse_id>/items', methods=['POST'])
+    def api_create_items(warehouse_id):
+        """Create one item or a list of items; invalid ones are skipped."""
+        if not db.session.get(Warehouse, warehouse_id):
+            return not_found()
+        created = import_items(
+            warehouse_id, item_pairs(request.get_json(silent=True)),
+            app.config['BULK_CHUNK_SIZE']
+        )
+        return jsonify(created=created), 201
+
+    @app.route('/api/warehouses/<int:warehouse_id>/items', methods=['DELETE'])
+    def api_delete_items(warehouse_id):
+        """Delete the items whose ids are listed in a JSON body."""
+        ids = parse_ids()
+        if ids is None:
+            return jsonify(error='ids must be a list'), 400
+        result = db.session.execute(
+            db.delete(Item)
+            .where(Item.warehouse_id == warehouse_id, Item.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            touch_warehouse(warehouse_id)
+        db.session.commit()
+        return jsonify(deleted=result.rowcount)
+
+
+def register_item_detail_api(app):
+    """Register single item API routes."""
+
+    def find_item(warehouse_id, item_id):
+        item = db.session.get(Item, item_id)
+        if item and item.warehouse_id == warehouse_id:
+            return item
+        return None
+
+    @app.route('/api/warehouses/<int:warehouse_id>/items/<int:item_id>')
+    def api_get_item(warehouse_id, item_id):
+        """Return an item."""
+        item = find_item(warehouse_id, item_id)
+        return jsonify(item_json(item)) if item else not_found()
+
+    @app.route(
+        '/api/warehouses/<int:warehouse_id>/items/<int:item_id>',
+        methods=['DELETE']
+    )
+    def api_delete_item(warehouse_id, item_id):
+        """Delete an item."""
+        item = find_item(warehouse_id, item_id)
+        if not item:
+            return not_found()
+        db.session.delete(item)
+        touch_warehouse(warehouse_id)
+        db.session.commit()
+        return '', 204
+
+
+def register_search_api(app):
+    """Register the item search API route."""
+
+    @app.route('/api/search')
+    def api_search_items():
+        """Return a page of items of all warehouses matching ``q``."""
+        page = search_items(*parse_search())
+        return jsonify(
+            hits=[hit_json(hit) for hit in page.hits],
+            totals=[total._asdict() for total in page.totals],
+            next=page.next_after
+        )
+
+
+def register_order_api(app):
+    """Register order fulfillment and stock transfer routes."""
+
+    @app.route('/api/orders', methods=['POST'])
+    def api_fulfill_order():
+        """Take the ``lines`` of an order from all warehouses."""
+        order = order_lines(json_object())
+        if order is None:
+            return jsonify(error='lines must be a list'), 400
+        shard = order_shard(name for name, _ in order)
+        if shard is None:
+            return jsonify(error='order is stocked on several shards'), 400
+        return jsonify(order_json(fulfill_order(order, shard)))
+
+    @app.route('/api/warehouses/<int:warehouse_id>/transfers',
+               methods=['POST'])
+    def api_transfer_stock(warehouse_id):
+        """Move the ``lines`` of stock to the ``target`` warehouse."""
+        if not db.session.get(Warehouse, warehouse_id):
+            return not_found()
+        data = json_object() or {}
+        error = invalid_transfer(warehouse_id, data)
+        if error:
+            return jsonify(error=error), 400
+        transfers = transfer_stock(
+            warehouse_id, data['target'], order_lines(data)
+        )
+        return jsonify(lines=[transfer._asdict() for transfer in transfers])
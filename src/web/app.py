@@ -1,29 +1,120 @@
 """Flask web application for warehouse management."""
 import os
 from flask import Flask
+from web.api import register_api_routes
+from web.cache import init_cache
+from web.group_commit import init_group_commit
 from web.models import db
 from web.routes import register_routes
+from web.schema import is_memory_database, load_template, prepare_schema
+from web.sharding import check_layout, init_sharding
+from web.sqlite import configure_engine
+
+DEFAULT_CONFIG = {
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'WAREHOUSES_PER_PAGE': 50,
+    'ITEMS_PER_PAGE': 100,
+    'STREAM_WAREHOUSE_PAGES': False,
+    'BULK_CHUNK_SIZE': 1000,
+    'SQLITE_PRAGMAS': {},
+    'CACHE_BACKEND': None,
+    'CACHE_MAX_ENTRIES': 1024,
+    'CACHE_TTL': 60,
+    'CACHE_SOCKET': None,
+    'METRICS_ENABLED': False,
+    'PROFILE_SLOW_REQUESTS': False,
+    'PROFILE_THRESHOLD_MS': 500,
+    'PROFILE_DIR': None,
+    'GROUP_COMMIT': False,
+    'GROUP_COMMIT_INTERVAL_MS': 5,
+    'GROUP_COMMIT_MAX_OPERATIONS': 100,
+    'GROUP_COMMIT_WAIT': True,
+    'SHARD_DATABASE_URIS': (),
+    'SEARCH_RESULTS_PER_PAGE': 50,
+    'FAST_START': False,
+    'DATABASE_TEMPLATE': None,
+}
+
+PROFILES = {
+    'default': {},
+    'production': {
+        'SQLITE_PRAGMAS': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,
+        },
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_pre_ping': True,
+        },
+        'FAST_START': True,
+    },
+}
 
 
 def create_app(config=None):
     """Create and configure the Flask application."""
     app = Flask(__name__)
     configure_app(app, config)
-    db.init_app(app)
-    with app.app_context():
-        db.create_all()
+    init_database(app)
+    init_cache(app)
+    init_group_commit(app)
+    init_instrumentation(app)
     register_routes(app)
+    register_api_routes(app)
     return app
 
 
+def init_instrumentation(app):
+    """Install the request instrumentation enabled in the app config.
+
+    The metrics module and cProfile are only imported when enabled.
+    """
+    if app.config['METRICS_ENABLED'] or app.config['PROFILE_SLOW_REQUESTS']:
+        # pylint: disable-next=import-outside-toplevel
+        from web.metrics import init_instrumentation as install
+        install(app)
+
+
+def init_database(app):
+    """Bind the databases to the app and create or upgrade their schema.
+
+    An in-memory database starts as a copy of DATABASE_TEMPLATE if set.
+    Raises RuntimeError if the databases do not match the shard layout.
+    """
+    db.init_app(app)
+    with app.app_context():
+        engines = init_sharding(app).engines
+        for engine in engines:
+            configure_engine(engine, app.config['SQLITE_PRAGMAS'])
+        template = app.config['DATABASE_TEMPLATE']
+        if template is not None and is_memory_database(db.engine):
+            load_template(db.engine, template)
+        for index, engine in enumerate(engines):
+            prepare_schema(engine, app.config['FAST_START'])
+            check_layout(engine, index, len(engines))
+
+
 def configure_app(app, config):
-    """Configure the Flask application."""
+    """Configure the Flask application.
+
+    The configuration profile is taken from the ``PROFILE`` key of config
+    or the ``WAREHOUSE_PROFILE`` environment variable, and explicit config
+    values override the profile.
+    """
+    config = config or {}
     base_dir = os.path.abspath(os.path.dirname(__file__))
     db_path = os.path.join(base_dir, 'warehouse.db')
     app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    if config:
-        app.config.update(config)
+    app.config.update(DEFAULT_CONFIG)
+    profile = config.get(
+        'PROFILE', os.environ.get('WAREHOUSE_PROFILE', 'default')
+    )
+    app.config.update(PROFILES[profile])
+    app.config.update(config)
 
 
 if __name__ == '__main__':
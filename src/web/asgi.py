@@ -0,0 +1,193 @@
+"""ASGI serving mode with non-blocking database reads.
+
+``create_asgi_app`` wraps the Flask application for ASGI servers::
+
+    uvicorn --factory web.asgi:create_asgi_app
+
+The warehouse list and warehouse pages are served on the event loop,
+reading through SQLAlchemy's async engine and aiosqlite and sharing the
+page cache with the synchronous views. Every other request, including
+writes, streamed pages and the JSON API, runs the synchronous Flask view
+in a worker thread through asgiref, so both modes serve the same routes.
+With sharded warehouses every request takes the synchronous path.
+The async engine opens its own connections, so the database must be a
+file rather than ``sqlite:///:memory:``. This mode needs the packages
+of the optional ``asgi`` dependency group::
+
+    poetry install --with asgi
+"""
+from asgiref.wsgi import WsgiToAsgi
+from flask import redirect, render_template, request, url_for
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.datastructures import Headers
+from werkzeug.test import EnvironBuilder
+from web.app import create_app
+from web.cache import get_cache
+from web.metrics import instrument_engine
+from web.models import Warehouse
+from web.queries import (
+    ItemPage, split_summaries, warehouse_items_query, warehouse_summaries_query
+)
+from web.routes import (
+    pack_summaries, parse_cursor, parse_item_page, unpack_summaries
+)
+from web.sqlite import install_pragmas
+
+
+def async_database_uri(uri):
+    """Return the aiosqlite variant of a SQLite database URI."""
+    return make_url(uri).set(drivername='sqlite+aiosqlite')
+
+
+def scope_environ(scope):
+    """Build a WSGI environ for an ASGI HTTP scope, without a body."""
+    headers = Headers([
+        (name.decode('latin-1'), value.decode('latin-1'))
+        for name, value in scope['headers']
+    ])
+    host = headers.get('host', 'localhost')
+    return EnvironBuilder(
+        path=scope['path'],
+        base_url=f"{scope.get('scheme', 'http')}://{host}",
+        query_string=scope['query_string'].decode('latin-1'),
+        method=scope['method'],
+        headers=headers
+    ).get_environ()
+
+
+async def send_response(response, send):
+    """Send a complete Flask response as ASGI messages."""
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in response.headers.items()
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+class AsyncWarehouseApp:
+    """ASGI application serving the read-heavy pages asynchronously."""
+
+    def __init__(self, app):
+        """Wrap a Flask app and create its async engine."""
+        self.app = app
+        self.fallback = WsgiToAsgi(app.wsgi_app)
+        self.engine = create_async_engine(
+            async_database_uri(app.config['SQLALCHEMY_DATABASE_URI']),
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        )
+        install_pragmas(self.engine.sync_engine, app.config['SQLITE_PRAGMAS'])
+        instrument_engine(app, self.engine.sync_engine)
+        self.sessions = async_sessionmaker(self.engine)
+        self.views = {
+            'index': self.index,
+            'view_warehouse': self.view_warehouse,
+        }
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI connection."""
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        response = None
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            response = await self.dispatch(scope)
+        if response is None:
+            await self.fallback(scope, receive, send)
+        else:
+            await send_response(response, send)
+
+    async def lifespan(self, receive, send):
+        """Acknowledge startup and dispose of the engine on shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def dispatch(self, scope):
+        """Serve a request with an async view, or return None if none fits.
+
+        The request hooks run as they do for the synchronous views, and
+        the async engine's statements are timed like the app's, so
+        metrics and profiling cover the async pages too.
+        """
+        with self.app.request_context(scope_environ(scope)):
+            view = self.native_view()
+            if view is None:
+                return None
+            response = self.app.preprocess_request()
+            if response is None:
+                response = await view(**request.view_args)
+            return self.app.process_response(self.app.make_response(response))
+
+    def native_view(self):
+        """Return the async view for the current request, or None."""
+        if self.app.config['SHARD_DATABASE_URIS']:
+            return None
+        if (request.endpoint == 'view_warehouse'
+                and self.app.config['STREAM_WAREHOUSE_PAGES']):
+            return None
+        return self.views.get(request.endpoint)
+
+    async def index(self):
+        """Display a page of warehouses with their item counts."""
+        cursor = parse_cursor()
+        limit = self.app.config['WAREHOUSES_PER_PAGE']
+
+        async def render():
+            warehouses, next_page = await self.cached_summaries(cursor, limit)
+            return render_template(
+                'index.html', warehouses=warehouses, next_page=next_page
+            )
+        return await get_cache().aget_or_set(
+            'index', f'page:{cursor}:{limit}', render
+        )
+
+    async def cached_summaries(self, cursor, limit):
+        """Return a cached page of warehouse summaries and the next cursor."""
+        async def compute():
+            async with self.engine.connect() as connection:
+                result = await connection.execute(
+                    warehouse_summaries_query(cursor, limit)
+                )
+                return pack_summaries(*split_summaries(result.all(), limit))
+        return unpack_summaries(await get_cache().aget_or_set(
+            'index', f'summaries:{cursor}:{limit}', compute
+        ))
+
+    async def view_warehouse(self, warehouse_id):
+        """View a specific warehouse and a page of its items."""
+        page = parse_item_page()
+        response = await get_cache().aget_or_set(
+            f'warehouse:{warehouse_id}', f'page:{page}',
+            lambda: self.render_warehouse(warehouse_id, page)
+        )
+        return response or redirect(url_for('index'))
+
+    async def render_warehouse(self, warehouse_id, page):
+        """Render a page of a warehouse, or return None if it is missing."""
+        after, prefix, limit = page
+        async with self.sessions() as session:
+            warehouse = await session.get(Warehouse, warehouse_id)
+            if not warehouse:
+                return None
+            items = list(await session.scalars(
+                warehouse_items_query(warehouse_id, after, prefix, limit)
+            ))
+        return render_template(
+            'warehouse.html', warehouse=warehouse,
+            items=ItemPage(lambda: items, limit), prefix=prefix
+        )
+
+
+def create_asgi_app(config=None):
+    """Create the Flask application wrapped for an ASGI server."""
+    return AsyncWarehouseApp(create_app(config))
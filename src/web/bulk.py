@@ -0,0 +1,127 @@
+"""Streaming bulk import and export of warehouse items."""
+import csv
+import io
+import json
+from itertools import islice
+from web.capacity import (
+    clamp_rows, deferred_used_capacity, free_capacity
+)
+from web.models import db, Item, touch_warehouse
+from web.search import deferred_indexing, index_pending
+from web.validation import clean_item
+
+
+def parse_csv(stream):
+    """Yield (name, quantity) pairs from CSV lines."""
+    for row in csv.reader(stream):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def parse_ndjson(stream):
+    """Yield (name, quantity) pairs from newline-delimited JSON lines."""
+    for line in stream:
+        record = _load_record(line)
+        yield record.get('name', ''), record.get('quantity')
+
+
+def _load_record(line):
+    """Parse one JSON object, or return an empty one if malformed."""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return {}
+    return record if isinstance(record, dict) else {}
+
+
+def _item_rows(pairs, warehouse_id):
+    """Yield insertable rows for the valid (name, quantity) pairs."""
+    for pair in pairs:
+        item = clean_item(*pair)
+        if item:
+            yield {
+                'name': item[0], 'quantity': item[1],
+                'warehouse_id': warehouse_id
+            }
+
+
+def import_items(warehouse_id, pairs, chunk_size=1000):
+    """Insert valid items in chunked transactions.
+
+    Each chunk is written with one executemany INSERT and committed on
+    its own, so memory use is bounded by the chunk size. The imported
+    items are added to the search index with one statement at the end,
+    also when reading the input fails after some chunks were committed.
+    Quantities are clamped to the capacity of the warehouse, and items
+    that no longer fit are left out. Returns the number of items
+    inserted.
+    """
+    rows = _item_rows(pairs, warehouse_id)
+    inserted = 0
+    try:
+        while chunk := list(islice(rows, chunk_size)):
+            inserted += _insert_chunk(warehouse_id, chunk)
+            touch_warehouse(warehouse_id)
+            db.session.commit()
+    finally:
+        _index_imported(inserted)
+    return inserted
+
+
+def _index_imported(inserted):
+    """Index the committed items of an import, if it inserted any."""
+    if inserted:
+        db.session.rollback()
+        index_pending()
+        db.session.commit()
+
+
+def _insert_chunk(warehouse_id, chunk):
+    """Insert what fits of a chunk of rows and return the rows inserted.
+
+    Deferring search indexing first takes the write lock, so the free
+    capacity read next stays current until the commit. The used capacity
+    of the warehouse grows once by the chunk's total.
+    """
+    with deferred_indexing():
+        rows = list(clamp_rows(chunk, free_capacity(warehouse_id)))
+        if rows:
+            with deferred_used_capacity(
+                warehouse_id, sum(row['quantity'] for row in rows)
+            ):
+                db.session.execute(Item.__table__.insert(), rows)
+    return len(rows)
+
+
+def _item_batches(warehouse_id, batch_size=1000):
+    """Yield batches of (name, quantity) rows of a warehouse by id."""
+    result = db.session.execute(
+        db.select(Item.name, Item.quantity)
+        .where(Item.warehouse_id == warehouse_id)
+        .order_by(Item.id),
+        execution_options={'yield_per': batch_size}
+    )
+    yield from result.partitions()
+
+
+def export_csv(warehouse_id):
+    """Yield the items of a warehouse as CSV text chunks."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(('name', 'quantity'))
+    for batch in _item_batches(warehouse_id):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_ndjson(warehouse_id):
+    """Yield the items of a warehouse as newline-delimited JSON chunks."""
+    for batch in _item_batches(warehouse_id):
+        yield ''.join(
+            json.dumps({'name': name, 'quantity': quantity},
+                       separators=(',', ':')) + '\n'
+            for name, quantity in batch
+        )
@@ -0,0 +1,246 @@
+"""Read-through cache for rendered pages and warehouse summaries.
+
+Entries live in namespaces: ``index`` for the warehouse list and
+``warehouse:<id>`` for a single warehouse. Each namespace has a
+generation number stored in the backend and part of every key, so
+invalidating a namespace is a single write that makes all its old
+entries unreachable. Namespaces are invalidated after the commit of any
+transaction that created, deleted or touched a warehouse.
+
+Invalidation only reaches the backend of the process that committed, so
+servers with several worker processes need a shared backend such as
+memcached. The in-process LRU suits a single process, and no profile
+enables a cache by default.
+"""
+import hashlib
+import json
+import socket
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from web.models import db, Warehouse, CHANGED_WAREHOUSES
+
+
+class NullBackend:
+    """Backend that stores nothing, used when caching is disabled."""
+
+    def get(self, _key):
+        """Return None for every key."""
+        return None
+
+    def set(self, key, value):
+        """Discard the value."""
+
+
+class LRUBackend:
+    """In-process LRU cache with a size bound and time-to-live.
+
+    Other processes cannot invalidate its entries, so it serves stale
+    pages for up to the TTL when several processes share a database.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60.0):
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a fresh value for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        """Return the number of stored entries."""
+        return len(self._entries)
+
+
+class MemcachedBackend:
+    """Client for a memcached server on a local socket.
+
+    ``address`` is a Unix socket path or ``host:port``. Values are stored
+    as JSON. Connection errors are treated as cache misses, so an
+    unavailable server only costs performance.
+    """
+
+    def __init__(self, address, ttl=60):
+        """Initialize the client; connections are opened per thread."""
+        self.address = address
+        self.ttl = int(ttl)
+        self._local = threading.local()
+
+    def _connect(self):
+        """Return this thread's connection, opening it if needed."""
+        if getattr(self._local, 'stream', None) is None:
+            if self.address.startswith('/'):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(self.address)
+            else:
+                host, port = self.address.rsplit(':', 1)
+                sock = socket.create_connection((host, int(port)))
+            self._local.stream = sock.makefile('rwb')
+        return self._local.stream
+
+    def _command(self, command, payload=None):
+        """Send a command and return the response stream."""
+        stream = self._connect()
+        stream.write(command.encode() + b'\r\n')
+        if payload is not None:
+            stream.write(payload + b'\r\n')
+        stream.flush()
+        return stream
+
+    @staticmethod
+    def _key(key):
+        """Return a memcached-safe key."""
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the value for key, or None."""
+        try:
+            stream = self._command(f'get {self._key(key)}')
+            header = stream.readline().split()
+            if header[:1] != [b'VALUE']:
+                return None
+            data = stream.read(int(header[3]) + 2)
+            stream.readline()
+            return json.loads(data)
+        except (OSError, IndexError, ValueError):
+            self._local.stream = None
+            return None
+
+    def set(self, key, value):
+        """Store a value."""
+        data = json.dumps(value).encode()
+        try:
+            self._command(
+                f'set {self._key(key)} 0 {self.ttl} {len(data)}', data
+            ).readline()
+        except OSError:
+            self._local.stream = None
+
+
+class Cache:
+    """Generational read-through cache with hit and miss counters."""
+
+    def __init__(self, backend):
+        """Initialize the cache on a backend."""
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def generation(self, namespace):
+        """Return the current generation of a namespace."""
+        generation = self.backend.get(f'gen:{namespace}')
+        if generation is None:
+            generation = self.invalidate(namespace)
+        return generation
+
+    def invalidate(self, namespace):
+        """Start a new generation of a namespace and return it."""
+        generation = time.time_ns()
+        self.backend.set(f'gen:{namespace}', generation)
+        return generation
+
+    def get_or_set(self, namespace, key, compute):
+        """Return a cached value, computing and storing it on a miss.
+
+        A None result from compute is returned but not cached.
+        """
+        full_key, value = self._lookup(namespace, key)
+        if value is None:
+            value = compute()
+            self._store(full_key, value)
+        return value
+
+    async def aget_or_set(self, namespace, key, compute):
+        """Like get_or_set, but compute is a coroutine function."""
+        full_key, value = self._lookup(namespace, key)
+        if value is None:
+            value = await compute()
+            self._store(full_key, value)
+        return value
+
+    def _lookup(self, namespace, key):
+        """Return the full key and cached value, counting hits and misses."""
+        full_key = f'{namespace}:{self.generation(namespace)}:{key}'
+        value = self.backend.get(full_key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return full_key, value
+
+    def _store(self, full_key, value):
+        """Store a computed value unless it is None."""
+        if value is not None:
+            self.backend.set(full_key, value)
+
+    def stats(self):
+        """Return hit and miss counters."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def create_backend(config):
+    """Create the cache backend selected by the CACHE_BACKEND setting."""
+    backend = config['CACHE_BACKEND']
+    if backend == 'memory':
+        return LRUBackend(config['CACHE_MAX_ENTRIES'], config['CACHE_TTL'])
+    if backend == 'memcached':
+        return MemcachedBackend(config['CACHE_SOCKET'], config['CACHE_TTL'])
+    return NullBackend()
+
+
+def init_cache(app):
+    """Attach a cache configured from the app config to the app."""
+    app.extensions['warehouse_cache'] = Cache(create_backend(app.config))
+
+
+def get_cache(app=None):
+    """Return the cache of the app, or of the current app."""
+    return (app or current_app).extensions['warehouse_cache']
+
+
+@event.listens_for(db.session, 'after_flush')
+def _record_changed_warehouses(session, _flush_context):
+    """Remember warehouses created or deleted in the flush."""
+    for instance in session.new | session.deleted:
+        if isinstance(instance, Warehouse):
+            session.info.setdefault(CHANGED_WAREHOUSES, set()).add(
+                instance.id
+            )
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_changed_warehouses(session):
+    """Invalidate the cache entries of warehouses changed by the commit."""
+    changed = session.info.pop(CHANGED_WAREHOUSES, ())
+    if changed and 'warehouse_cache' in current_app.extensions:
+        cache = get_cache()
+        cache.invalidate('index')
+        for warehouse_id in changed:
+            cache.invalidate(f'warehouse:{warehouse_id}')
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_changed_warehouses(session):
+    """Forget changes of a rolled back transaction."""
+    session.info.pop(CHANGED_WAREHOUSES, None)
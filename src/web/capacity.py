@@ -0,0 +1,186 @@
+"""Warehouse capacity with the semantics of Varasto.
+
+A warehouse with a capacity holds items up to that total quantity, like
+the volume of a Varasto. Additions are clamped as in
+``Varasto.lisaa_varastoon``: whatever does not fit is left out, and an
+item added to a full warehouse is not stored at all. Warehouses without
+a capacity take everything.
+
+The used capacity of a warehouse is a running total that triggers on the
+item table update in the same transaction as every insert, quantity
+change and delete, so reading it never sums the items. Bulk imports
+switch the insert trigger off for each chunk and add the chunk's total
+with one statement instead. Free capacity is a column computed from it
+and indexed, so warehouses with room for an amount are found with an
+index range scan.
+"""
+import heapq
+import itertools
+from collections import namedtuple
+from contextlib import contextmanager
+from sqlalchemy import String, bindparam, exists, func, select, tuple_
+from web.models import db, Warehouse, Item
+from web.sharding import query_shards
+
+CAPACITY_STATE = (
+    "CREATE TABLE IF NOT EXISTS item_capacity_state ("
+    "id INTEGER PRIMARY KEY CHECK (id = 1), deferred BOOLEAN NOT NULL)",
+    "INSERT OR IGNORE INTO item_capacity_state VALUES (1, 0)",
+)
+
+CAPACITY_TRIGGERS = (
+    "CREATE TRIGGER item_capacity_insert AFTER INSERT ON item "
+    "WHEN NOT (SELECT deferred FROM item_capacity_state) "
+    "BEGIN UPDATE warehouse SET used = used + new.quantity "
+    "WHERE id = new.warehouse_id; END",
+    "CREATE TRIGGER item_capacity_delete AFTER DELETE ON item "
+    "BEGIN UPDATE warehouse SET used = used - old.quantity "
+    "WHERE id = old.warehouse_id; END",
+    "CREATE TRIGGER item_capacity_update "
+    "AFTER UPDATE OF quantity, warehouse_id ON item "
+    "BEGIN UPDATE warehouse SET used = used - old.quantity "
+    "WHERE id = old.warehouse_id; "
+    "UPDATE warehouse SET used = used + new.quantity "
+    "WHERE id = new.warehouse_id; END",
+)
+
+USED_CAPACITY = (
+    "UPDATE warehouse SET used = (SELECT coalesce(sum(quantity), 0) "
+    "FROM item WHERE item.warehouse_id = warehouse.id)"
+)
+
+WarehouseSpace = namedtuple(
+    'WarehouseSpace', ['id', 'name', 'capacity', 'free']
+)
+
+
+def create_capacity_triggers(engine):
+    """Create the triggers keeping used capacity up to date, or update them.
+
+    The used capacity of existing warehouses is computed when the
+    triggers are first created.
+    """
+    with engine.begin() as connection:
+        for statement in CAPACITY_STATE:
+            connection.exec_driver_sql(statement)
+        current = dict(connection.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+        ).all())
+        if 'item_capacity_insert' not in current:
+            connection.exec_driver_sql(USED_CAPACITY)
+        for statement in set(CAPACITY_TRIGGERS) - set(current.values()):
+            connection.exec_driver_sql(
+                f'DROP TRIGGER IF EXISTS {statement.split()[2]}'
+            )
+            connection.exec_driver_sql(statement)
+
+
+@contextmanager
+def deferred_used_capacity(warehouse_id, quantity):
+    """Count the items inserted in the block as one addition of quantity.
+
+    The insert trigger is switched off inside the current transaction
+    only, so the items inserted in the block must all belong to the
+    warehouse and their quantities sum to quantity. If the block fails,
+    rolling the transaction back switches the trigger on again.
+    """
+    db.session.execute(db.text('UPDATE item_capacity_state SET deferred = 1'))
+    yield
+    db.session.execute(
+        db.update(Warehouse)
+        .where(Warehouse.id == warehouse_id)
+        .values(used=Warehouse.used + quantity)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(db.text('UPDATE item_capacity_state SET deferred = 0'))
+
+
+def fitting(amount):
+    """Return the part of an amount that fits in the selected warehouse."""
+    return func.min(amount, func.coalesce(Warehouse.free, amount))
+
+
+def fits(warehouse_id, amount):
+    """Return the condition that a whole amount fits in a warehouse."""
+    return exists().where(
+        Warehouse.id == warehouse_id,
+        func.coalesce(Warehouse.free, amount) >= amount
+    )
+
+
+def clamped_item_insert():
+    """Return the INSERT of an item with as much of its quantity as fits.
+
+    The statement takes ``name``, ``quantity`` and ``warehouse_id``
+    parameters, can be executed with many of them at once, and inserts
+    nothing into a full or missing warehouse.
+    """
+    quantity = bindparam('quantity')
+    return Item.__table__.insert().from_select(
+        ['name', 'quantity', 'warehouse_id'],
+        select(bindparam('name', type_=String), fitting(quantity),
+               Warehouse.id)
+        .where(Warehouse.id == bindparam('warehouse_id'),
+               func.coalesce(Warehouse.free, 1) > 0)
+    )
+
+
+def free_capacity(warehouse_id):
+    """Return the free capacity of a warehouse, or None without a limit."""
+    return db.session.scalar(
+        select(Warehouse.free).where(Warehouse.id == warehouse_id)
+    )
+
+
+def clamp_rows(rows, free):
+    """Yield item rows with quantities clamped to the free capacity left.
+
+    Each row takes what fits of the capacity the rows before it left
+    free, and the rows that no longer fit are left out. A free capacity
+    of None means there is no limit.
+    """
+    if free is None:
+        yield from rows
+        return
+    for row in rows:
+        quantity = min(row['quantity'], free)
+        if quantity <= 0:
+            return
+        free -= quantity
+        yield {**row, 'quantity': quantity}
+
+
+def free_space_query(amount, after=None, limit=50):
+    """Return the statement selecting warehouses with room for an amount.
+
+    Warehouses are ordered by free capacity and id, so the tightest fits
+    come first, and ``after`` is the ``(free, id)`` of the last warehouse
+    on the previous page. One extra row is selected to tell whether a
+    next page exists.
+    """
+    query = (
+        select(Warehouse.id, Warehouse.name, Warehouse.capacity,
+               Warehouse.free)
+        .where(Warehouse.free >= amount)
+        .order_by(Warehouse.free, Warehouse.id)
+        .limit(limit + 1)
+    )
+    if after:
+        query = query.where(tuple_(Warehouse.free, Warehouse.id) > after)
+    return query
+
+
+def warehouses_with_space(amount, after=None, limit=50):
+    """Return a page of warehouses with room for an amount of items.
+
+    Warehouses without a capacity are not listed. Returns the
+    WarehouseSpace rows of the page and the cursor of the next page, or
+    None on the last page.
+    """
+    pages = query_shards(lambda _shard: free_space_query(amount, after, limit))
+    rows = [WarehouseSpace(*row) for row in itertools.islice(
+        heapq.merge(*pages, key=lambda row: (row.free, row.id)), limit + 1
+    )]
+    if len(rows) > limit:
+        return rows[:limit], (rows[limit - 1].free, rows[limit - 1].id)
+    return rows, None
@@ -0,0 +1,233 @@
+"""Order fulfillment and stock transfers between warehouses.
+
+Stock is taken like ``Varasto.ota_varastosta``: a line asking for more
+than is in stock takes what is available, and the line reports how much
+it got and from where. Lines for the same item name are merged, and
+each name is taken from its items in warehouse id order.
+
+An order is taken in one transaction on one shard, so with sharded
+warehouses an order is refused if its items are stocked on several of
+them. Lines are processed in name order and the items of each name are
+selected FOR UPDATE in (warehouse_id, id) order, so concurrent orders
+lock rows in the same order and cannot deadlock on databases with row
+locks. The items of a name are read only until they cover its line, and
+all the takes are then made with one executemany UPDATE. Like the
+conditional UPDATEs of ``web.stock``, it only matches items that still
+hold what was read, so stock never goes below zero; if another writer
+got in between, the takes are rolled back to a savepoint and the lines
+read again. On SQLite the first take holds the database write lock
+until commit, so the second read stays current. Transfers lock their
+warehouses before reading and only touch them if stock moved. The
+items of a name are found through the (name, warehouse_id, quantity)
+index, so the time to allocate an order grows with its lines and the
+warehouses stocking them, not with the total inventory.
+"""
+from collections import namedtuple
+from itertools import chain
+from sqlalchemy import bindparam, select
+from web.capacity import clamped_item_insert, free_capacity
+from web.models import db, Item, Warehouse, touch_warehouse
+from web.sharding import get_shards, query_shards, use_shard
+from web.sqlite import begin_immediate
+from web.stock import add_stock
+
+Allocation = namedtuple('Allocation', ['warehouse_id', 'item_id', 'quantity'])
+OrderLine = namedtuple('OrderLine', ['name', 'requested', 'allocations'])
+Transfer = namedtuple('Transfer', ['name', 'requested', 'moved'])
+
+TAKE = (
+    Item.__table__.update()
+    .where(Item.id == bindparam('item_id'),
+           Item.warehouse_id == bindparam('owner'),
+           Item.quantity >= bindparam('taken'))
+    .values(quantity=Item.quantity - bindparam('taken'))
+)
+
+
+def merge_lines(lines):
+    """Return the (name, quantity) totals of order lines in name order."""
+    totals = {}
+    for name, quantity in lines:
+        totals[name] = totals.get(name, 0) + quantity
+    return sorted(totals.items())
+
+
+def stock_query(name, warehouse_id=None):
+    """Return the statement locking the stocked items of a name in order.
+
+    ``warehouse_id`` optionally restricts the items to one warehouse.
+    """
+    query = (
+        select(Item.id, Item.warehouse_id, Item.quantity)
+        .where(Item.name == name, Item.quantity > 0)
+        .order_by(Item.warehouse_id, Item.id)
+        .with_for_update()
+    )
+    if warehouse_id is not None:
+        query = query.where(Item.warehouse_id == warehouse_id)
+    return query
+
+
+def read_allocations(name, amount, warehouse_id=None):
+    """Return the Allocations that would take up to amount of a name.
+
+    The stocked items are streamed and only read until they cover the
+    amount.
+    """
+    allocations = []
+    result = db.session.execute(stock_query(name, warehouse_id))
+    for item_id, owner, quantity in result:
+        if amount <= 0:
+            break
+        taken = min(amount, quantity)
+        allocations.append(Allocation(owner, item_id, taken))
+        amount -= taken
+    result.close()
+    return allocations
+
+
+def apply_allocations(allocations):
+    """Take allocations with one UPDATE and return whether all matched.
+
+    If any item no longer holds its allocation, nothing is taken.
+    """
+    if not allocations:
+        return True
+    savepoint = db.session.begin_nested()
+    result = db.session.execute(TAKE, [
+        {'item_id': item_id, 'owner': owner, 'taken': taken}
+        for owner, item_id, taken in allocations
+    ])
+    if result.rowcount == len(allocations):
+        savepoint.commit()
+        return True
+    savepoint.rollback()
+    return False
+
+
+def take_lines(order, warehouse_id=None):
+    """Take up to the quantity of each (name, quantity) line.
+
+    Returns the Allocations of each name, taken in the current
+    transaction. ``warehouse_id`` optionally restricts the takes to one
+    warehouse. The warehouses taken from are not touched.
+    """
+    while True:
+        allocations = {
+            name: read_allocations(name, amount, warehouse_id)
+            for name, amount in order
+        }
+        if apply_allocations(list(chain(*allocations.values()))):
+            return allocations
+
+
+def order_shard(names):
+    """Return the engine of the shard to take an order of item names from.
+
+    That is the only shard stocking any of the names, or the first shard
+    if none does. Returns None if several shards stock them.
+    """
+    shards = get_shards()
+    if shards.pool is None:
+        return shards.engines[0]
+    names = list(names)
+    stocking = [
+        engine for engine, rows in zip(shards.engines, query_shards(
+            lambda _shard: select(Item.id)
+            .where(Item.name.in_(names), Item.quantity > 0).limit(1)
+        )) if rows
+    ]
+    if len(stocking) > 1:
+        return None
+    return (stocking or shards.engines)[0]
+
+
+def fulfill_order(lines, shard=None):
+    """Take the stock of an order from all warehouses and commit it.
+
+    ``lines`` is an iterable of (name, quantity) pairs. With sharded
+    warehouses ``shard`` is the engine from ``order_shard`` to take the
+    order from. Returns an OrderLine for each item name in name order.
+    """
+    order = merge_lines(lines)
+    if shard is not None:
+        use_shard(shard)
+    allocations = take_lines(order)
+    for warehouse_id in sorted({
+        allocation.warehouse_id
+        for allocation in chain(*allocations.values())
+    }):
+        touch_warehouse(warehouse_id)
+    db.session.commit()
+    return [OrderLine(name, requested, allocations[name])
+            for name, requested in order]
+
+
+def put_stock(warehouse_id, name, amount):
+    """Add an amount to the item of a name in a warehouse, or create it."""
+    item_id = db.session.scalar(
+        select(Item.id)
+        .where(Item.warehouse_id == warehouse_id, Item.name == name)
+        .order_by(Item.id)
+        .limit(1)
+    )
+    if item_id is None:
+        db.session.execute(clamped_item_insert(), {
+            'name': name, 'quantity': amount, 'warehouse_id': warehouse_id
+        })
+    else:
+        add_stock(warehouse_id, item_id, amount)
+
+
+def move_stock(source_id, target_id, name, amount):
+    """Move up to amount of an item name that fits in the target.
+
+    Returns the amount moved.
+    """
+    free = free_capacity(target_id)
+    amount = amount if free is None else min(amount, free)
+    moved = sum(
+        allocation.quantity
+        for allocation in take_lines([(name, amount)], source_id)[name]
+    )
+    if moved:
+        put_stock(target_id, name, moved)
+    return moved
+
+
+def lock_warehouses(warehouse_ids):
+    """Lock warehouses against other writers until commit.
+
+    SQLite takes the database write lock, other databases lock the
+    warehouse rows in id order.
+    """
+    begin_immediate(db.session.connection())
+    db.session.execute(
+        select(Warehouse.id)
+        .where(Warehouse.id.in_(warehouse_ids))
+        .order_by(Warehouse.id)
+        .with_for_update()
+    ).all()
+
+
+def transfer_stock(source_id, target_id, lines):
+    """Move stock of item names from one warehouse to another and commit.
+
+    ``lines`` is an iterable of (name, quantity) pairs. Each name moves
+    what the source has of it, up to what fits in the target, into the
+    target's item of that name. Both warehouses are locked first, so the
+    free capacity read for each line stays current, and are touched only
+    if anything moved. Returns a Transfer for each item name in name
+    order.
+    """
+    lock_warehouses([source_id, target_id])
+    result = [
+        Transfer(name, requested,
+                 move_stock(source_id, target_id, name, requested))
+        for name, requested in merge_lines(lines)
+    ]
+    if any(transfer.moved for transfer in result):
+        touch_warehouse(source_id)
+        touch_warehouse(target_id)
+    db.session.commit()
+    return result
@@ -0,0 +1,162 @@
+"""Group commit of item writes.
+
+With GROUP_COMMIT enabled, item writes from concurrent requests are
+queued and applied by a writer thread in one transaction per batch, or
+per shard of a batch when warehouses are sharded. A batch is committed
+once it holds GROUP_COMMIT_MAX_OPERATIONS writes or
+GROUP_COMMIT_INTERVAL_MS after its first write, so a burst of requests
+pays for one commit instead of one each. With GROUP_COMMIT_WAIT, a
+request returns only after its batch has committed; without it, the
+request is acknowledged as soon as its write is queued, trading
+durability of the last few writes for latency.
+
+Each write runs in a savepoint of its batch's transaction, so a write
+that fails is rolled back alone and the rest of the batch still
+commits. Failed writes are logged, since without GROUP_COMMIT_WAIT no
+request is left to report them.
+"""
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from web.models import db
+from web.sharding import current_shard, use_shard
+
+
+class GroupCommitQueue:
+    """Queue of write operations committed in batches by a thread."""
+
+    def __init__(self, app, interval=0.005, max_operations=100):
+        """Initialize the queue; the writer thread starts on first use."""
+        self.app = app
+        self.interval = interval
+        self.max_operations = max_operations
+        self.commits = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, operation, *args, shard=None):
+        """Queue ``operation(*args)`` and return a future of its result.
+
+        ``shard`` is the engine of the shard the operation writes to, or
+        None for the default database.
+        """
+        future = Future()
+        self._start()
+        self._queue.put((future, shard, operation, args))
+        return future
+
+    def flush(self):
+        """Wait until every queued operation has been committed."""
+        self._queue.join()
+
+    def _start(self):
+        """Start the writer thread if it is not running."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        """Commit batches of queued operations forever."""
+        while True:
+            batch = self._collect()
+            shards = {}
+            for entry in batch:
+                shards.setdefault(entry[1], []).append(entry)
+            for shard, operations in shards.items():
+                self._commit(shard, operations)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _collect(self):
+        """Wait for an operation and gather the rest of its batch."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.max_operations:
+            try:
+                batch.append(self._queue.get(
+                    timeout=max(0.0, deadline - time.monotonic())
+                ))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, shard, batch):
+        """Apply a batch on a shard in one transaction and resolve it.
+
+        If the commit fails, every operation of the batch fails with the
+        same error. Any error is caught so that the writer thread keeps
+        running and no request waits forever.
+        """
+        try:
+            outcomes = self._apply(shard, batch)
+        except Exception as error:  # pylint: disable=broad-except
+            self.app.logger.error('group commit of %d writes failed',
+                                  len(batch), exc_info=error)
+            for future, *_ in batch:
+                future.set_exception(error)
+            return
+        self.commits += 1
+        for resolve, value in outcomes:
+            resolve(value)
+
+    def _apply(self, shard, batch):
+        """Run the operations of a batch on a shard and commit them.
+
+        Returns how to resolve the future of each operation: with its
+        result, or with the error that rolled it back.
+        """
+        with self.app.app_context():
+            use_shard(shard)
+            try:
+                outcomes = [self._run_operation(*entry) for entry in batch]
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        return outcomes
+
+    def _run_operation(self, future, _shard, operation, args):
+        """Run an operation in a savepoint and return how to resolve it."""
+        try:
+            with db.session.begin_nested():
+                return future.set_result, operation(*args)
+        except Exception as error:  # pylint: disable=broad-except
+            self.app.logger.error('group commit write %s failed',
+                                  operation.__name__, exc_info=error)
+            return future.set_exception, error
+
+
+def init_group_commit(app):
+    """Attach a group commit queue to the app if it is enabled."""
+    if app.config['GROUP_COMMIT']:
+        app.extensions['group_commit'] = GroupCommitQueue(
+            app,
+            app.config['GROUP_COMMIT_INTERVAL_MS'] / 1000,
+            app.config['GROUP_COMMIT_MAX_OPERATIONS']
+        )
+
+
+def run_write(operation, *args):
+    """Run a write operation and commit it, or queue it for group commit.
+
+    Returns the result of the operation, or None when group commit
+    acknowledges writes before they are committed.
+    """
+    commit_queue = current_app.extensions.get('group_commit')
+    if commit_queue is None:
+        result = operation(*args)
+        db.session.commit()
+        return result
+    # Return the request's connection to the pool first, so that waiting
+    # requests cannot leave the writer thread without a connection.
+    db.session.close()
+    future = commit_queue.submit(operation, *args, shard=current_shard())
+    if current_app.config['GROUP_COMMIT_WAIT']:
+        return future.result()
+    return None
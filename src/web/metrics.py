@@ -0,0 +1,191 @@
+"""Opt-in request instrumentation and slow request profiling.
+
+With METRICS_ENABLED, every request records its wall time, the number
+and duration of SQL statements, template render time and response size
+per endpoint, and ``/metrics`` serves the totals in the Prometheus text
+format. With PROFILE_SLOW_REQUESTS, requests run under cProfile and
+those slower than PROFILE_THRESHOLD_MS are dumped as ``.prof`` files to
+PROFILE_DIR for pstats, snakeviz or flameprof.
+"""
+import cProfile
+import os
+import threading
+import time
+from collections import defaultdict
+from flask import (
+    Response, before_render_template, g, has_request_context, request,
+    template_rendered
+)
+from sqlalchemy import event
+from web.cache import get_cache
+
+FIELDS = {
+    'requests': 'Requests handled.',
+    'request_seconds': 'Wall time spent handling requests.',
+    'sql_statements': 'SQL statements executed.',
+    'sql_seconds': 'Time spent executing SQL statements.',
+    'template_seconds': 'Time spent rendering templates.',
+    'response_bytes': 'Bytes in response bodies of known length.',
+}
+
+
+class RouteMetrics:
+    """Thread-safe totals of request measurements per endpoint."""
+
+    def __init__(self):
+        """Initialize empty totals."""
+        self._totals = defaultdict(lambda: dict.fromkeys(FIELDS, 0))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, measurements):
+        """Add the measurements of one request to an endpoint's totals."""
+        with self._lock:
+            totals = self._totals[endpoint]
+            totals['requests'] += 1
+            for field, value in measurements.items():
+                totals[field] += value
+
+    def snapshot(self):
+        """Return a copy of the totals per endpoint."""
+        with self._lock:
+            return {key: dict(value) for key, value in self._totals.items()}
+
+
+def prometheus_text(snapshot, cache_stats):
+    """Format endpoint totals and cache counters for Prometheus."""
+    lines = []
+    for field, description in FIELDS.items():
+        name = f'warehouse_{field}_total'
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        lines += [
+            f'{name}{{endpoint="{endpoint}"}} {totals[field]}'
+            for endpoint, totals in sorted(snapshot.items())
+        ]
+    for field, value in cache_stats.items():
+        name = f'warehouse_cache_{field}_total'
+        lines += [f'# TYPE {name} counter', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def init_instrumentation(app):
+    """Install the instrumentation enabled in the app config."""
+    if app.config['METRICS_ENABLED']:
+        init_metrics(app)
+    if app.config['PROFILE_SLOW_REQUESTS']:
+        init_profiling(app)
+
+
+def _add(field, value):
+    """Add to a measurement of the current request, if it is measured."""
+    if has_request_context() and 'measurements' in g:
+        g.measurements[field] += value
+
+
+def init_metrics(app):
+    """Record request metrics and serve them at /metrics."""
+    metrics = RouteMetrics()
+    for engine in app.extensions['shards'].engines:
+        _listen_sql(engine)
+    _listen_templates(app)
+    app.before_request(_start_measuring)
+
+    @app.after_request
+    def finish_measuring(response):
+        g.measurements['request_seconds'] += time.perf_counter()
+        g.measurements['response_bytes'] = response.content_length or 0
+        metrics.record(request.endpoint, g.measurements)
+        return response
+
+    register_metrics_route(app, metrics)
+
+
+def instrument_engine(app, engine):
+    """Time SQL statements of an engine created outside the app."""
+    if app.config['METRICS_ENABLED']:
+        _listen_sql(engine)
+
+
+def register_metrics_route(app, metrics):
+    """Register the Prometheus metrics endpoint."""
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """Serve request metrics in the Prometheus text format."""
+        return Response(
+            prometheus_text(metrics.snapshot(), get_cache().stats()),
+            mimetype='text/plain; version=0.0.4'
+        )
+
+
+def _start_measuring():
+    """Start measuring the current request."""
+    g.measurements = dict.fromkeys(list(FIELDS)[1:], 0)
+    g.measurements['request_seconds'] = -time.perf_counter()
+
+
+def _listen_sql(engine):
+    """Time SQL statements of measured requests."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_execute(conn, *_args):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_execute(conn, *_args):
+        started = conn.info['query_start'].pop()
+        _add('sql_statements', 1)
+        _add('sql_seconds', time.perf_counter() - started)
+
+
+def _listen_templates(app):
+    """Time template rendering of measured requests."""
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+
+
+def _template_started(_sender, **_extra):
+    """Remember when template rendering started."""
+    g.template_start = time.perf_counter()
+
+
+def _template_finished(_sender, **_extra):
+    """Add template render time to the current request."""
+    _add('template_seconds', time.perf_counter() - g.template_start)
+
+
+def init_profiling(app):
+    """Profile requests and dump those slower than the threshold."""
+    directory = app.config['PROFILE_DIR'] or os.path.join(
+        app.instance_path, 'profiles'
+    )
+    threshold = app.config['PROFILE_THRESHOLD_MS'] / 1000
+    app.before_request(_start_profiler)
+
+    @app.after_request
+    def stop_profiler(response):
+        _stop_profiler(directory, threshold)
+        return response
+
+
+def _start_profiler():
+    """Start profiling the current request."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another request in this process is already being profiled.
+        return
+    g.profiler = (profiler, time.perf_counter())
+
+
+def _stop_profiler(directory, threshold):
+    """Stop profiling and dump the profile if the request was slow."""
+    if 'profiler' not in g:
+        return
+    profiler, started = g.pop('profiler')
+    profiler.disable()
+    if time.perf_counter() - started < threshold:
+        return
+    os.makedirs(directory, exist_ok=True)
+    profiler.dump_stats(os.path.join(
+        directory, f'{request.endpoint}-{time.time_ns()}.prof'
+    ))
@@ -0,0 +1,30 @@
+"""Lightweight schema migrations for existing warehouse databases."""
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+from web.models import db
+
+
+def upgrade_schema(engine):
+    """Bring an existing database up to date with the models.
+
+    ``db.create_all`` only creates missing tables, so columns and indexes
+    added to tables that already exist are created here.
+    """
+    for table in db.metadata.sorted_tables:
+        add_missing_columns(engine, table)
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def add_missing_columns(engine, table):
+    """Add columns of a model table that the database table lacks."""
+    existing = {
+        column['name'] for column in inspect(engine).get_columns(table.name)
+    }
+    with engine.begin() as connection:
+        for column in table.columns:
+            if column.name not in existing:
+                definition = CreateColumn(column).compile(engine)
+                connection.exec_driver_sql(
+                    f'ALTER TABLE {table.name} ADD COLUMN {definition}'
+                )
@@ -1,14 +1,62 @@
 """Database models for the warehouse application."""
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
-db = SQLAlchemy()
+# Session info key collecting ids of warehouses changed in a transaction.
+CHANGED_WAREHOUSES = 'changed_warehouses'
+# Session info key holding the engine of the shard the session uses.
+SHARD_ENGINE = 'shard_engine'
+
+
+class ShardedSession(Session):  # pylint: disable=too-few-public-methods
+    """Session that sends every statement to the shard it is routed to.
+
+    A session that has not been routed uses the default database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        """Return the engine of the session's shard."""
+        engine = self.info.get(SHARD_ENGINE)
+        if bind is None and engine is not None:
+            return engine
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': ShardedSession})
+
+
+def utc_now():
+    """Return the current UTC time without time zone information."""
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def utc_stamp():
+    """Return the current UTC time to the microsecond."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class Warehouse(db.Model):  # pylint: disable=too-few-public-methods
-    """Model representing a warehouse."""
+    """Model representing a warehouse.
+
+    ``capacity`` limits the total quantity of the items like the volume of
+    a Varasto, or is None for a warehouse without a limit. ``used`` is
+    the running total of the item quantities, kept up to date by triggers
+    on the item table, and ``free`` is computed from the two.
+    ``created_at`` tells apart warehouses that were given the id of a
+    deleted one.
+    """
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
+    capacity = db.Column(db.Integer)
+    used = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    free = db.Column(db.Integer, db.Computed('capacity - used'), index=True)
+    version = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
+    updated_at = db.Column(db.DateTime, default=utc_now)
+    created_at = db.Column(db.DateTime, default=utc_stamp)
     items = db.relationship(
         'Item', backref='warehouse', cascade='all, delete-orphan'
     )
@@ -17,9 +65,36 @@ class Warehouse(db.Model):  # pylint: disable=too-few-public-methods
 class Item(db.Model):  # pylint: disable=too-few-public-methods
     """Model representing an item in a warehouse."""
 
+    __table_args__ = (
+        # Pages of a warehouse's items are read in id order from this
+        # index, which the (warehouse_id, name) index cannot give.
+        db.Index('ix_item_warehouse_id', 'warehouse_id'),
+        db.Index('ix_item_warehouse_id_name', 'warehouse_id', 'name'),
+        db.Index(
+            'ix_item_name_warehouse_id_quantity',
+            'name', 'warehouse_id', 'quantity'
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=0)
     warehouse_id = db.Column(
         db.Integer, db.ForeignKey('warehouse.id'), nullable=False
     )
+
+
+def touch_warehouse(warehouse_id):
+    """Bump the version of a warehouse whose contents changed.
+
+    Called in the same transaction as the change, so the version seen by
+    readers always matches the committed items. The id is also recorded
+    in the session so that caches can be invalidated after commit.
+    """
+    db.session.info.setdefault(CHANGED_WAREHOUSES, set()).add(warehouse_id)
+    db.session.execute(
+        db.update(Warehouse)
+        .where(Warehouse.id == warehouse_id)
+        .values(version=Warehouse.version + 1, updated_at=utc_now())
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,106 @@
+"""Database queries for the warehouse application.
+
+Statements are built by the ``*_query`` functions so that the same
+queries can run on the synchronous session and on the async engine.
+"""
+from collections import namedtuple
+from sqlalchemy import func, tuple_
+from web.models import db, Warehouse, Item
+
+# Sorts after every character, so names starting with a prefix sort
+# below the prefix followed by it.
+PREFIX_END = chr(0x10FFFF)
+
+WarehouseSummary = namedtuple(
+    'WarehouseSummary', ['id', 'name', 'item_count', 'total_quantity']
+)
+
+
+def warehouse_summaries_query(after=None, limit=50):
+    """Return the statement selecting a page of warehouse summaries.
+
+    Warehouses are ordered by name and id, and ``after`` is the
+    ``(name, id)`` of the last warehouse on the previous page. One extra
+    row is selected to tell whether a next page exists.
+    """
+    query = (
+        db.select(
+            Warehouse.id,
+            Warehouse.name,
+            func.count(Item.id).label('item_count'),
+            func.coalesce(func.sum(Item.quantity), 0).label('total_quantity')
+        )
+        .outerjoin(Item)
+        .group_by(Warehouse.name, Warehouse.id)
+        .order_by(Warehouse.name, Warehouse.id)
+        .limit(limit + 1)
+    )
+    if after:
+        query = query.where(tuple_(Warehouse.name, Warehouse.id) > after)
+    return query
+
+
+def split_summaries(rows, limit):
+    """Return the summary rows of a page and the next page cursor."""
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], (last.name, last.id)
+    return rows, None
+
+
+class ItemPage:  # pylint: disable=too-few-public-methods
+    """Lazily fetched page of items.
+
+    ``fetch`` returns the rows and is called only when the page is
+    iterated, so a streamed response fetches rows inside its own context
+    and never holds the whole page. Once iteration has finished,
+    ``next_after`` holds the cursor of the next page, or None on the last
+    page.
+    """
+
+    def __init__(self, fetch, limit):
+        """Initialize page for rows with one extra look-ahead row."""
+        self._fetch = fetch
+        self._limit = limit
+        self.next_after = None
+
+    def __iter__(self):
+        """Yield at most limit items and record the next page cursor."""
+        last = None
+        for count, item in enumerate(self._fetch()):
+            if count == self._limit:
+                self.next_after = last.id
+                return
+            last = item
+            yield item
+
+
+def warehouse_items_query(warehouse_id, after=None, prefix='', limit=100):
+    """Return the statement selecting a page of a warehouse's items.
+
+    ``after`` is the id of the last item on the previous page and
+    ``prefix`` optionally restricts items to names starting with it,
+    case-sensitively. The prefix is a range of names rather than a LIKE
+    pattern, so that it is read from the (warehouse_id, name) index.
+    """
+    query = (
+        db.select(Item)
+        .where(Item.warehouse_id == warehouse_id)
+        .order_by(Item.id)
+        .limit(limit + 1)
+    )
+    if after:
+        query = query.where(Item.id > after)
+    if prefix:
+        query = query.where(Item.name >= prefix,
+                            Item.name < prefix + PREFIX_END)
+    return query
+
+
+def warehouse_items(warehouse_id, after=None, prefix='', limit=100):
+    """Return a page of a warehouse's items ordered by id."""
+    query = warehouse_items_query(warehouse_id, after, prefix, limit)
+    return ItemPage(
+        lambda: db.session.scalars(query, execution_options={'yield_per': 100}),
+        limit
+    )
@@ -1,12 +1,37 @@
 """Routes for the warehouse web application."""
-from flask import render_template, request, redirect, url_for
-from web.models import db, Warehouse, Item
+import io
+from flask import (
+    Response, current_app, jsonify, render_template, stream_template,
+    stream_with_context, request, redirect, url_for
+)
+from web.bulk import (
+    parse_csv, parse_ndjson, import_items, export_csv, export_ndjson
+)
+from web.cache import get_cache
+from web.capacity import clamped_item_insert
+from web.group_commit import run_write
+from web.models import db, Warehouse, Item, touch_warehouse
+from web.queries import WarehouseSummary, warehouse_items
+from web.search import search_items
+from web.sharding import add_warehouse, gather_summaries
+from web.stock import adjust_stock, adjust_many
+from web.validation import (
+    clean_item, is_id, parse_capacity, parse_quantity
+)
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+}
 
 
 def register_routes(app):
     """Register all routes for the application."""
     register_warehouse_routes(app)
     register_item_routes(app)
+    register_stock_routes(app)
+    register_bulk_routes(app)
+    register_search_routes(app)
 
 
 def register_warehouse_routes(app):  # pylint: disable=too-many-statements
@@ -14,17 +39,28 @@ def register_warehouse_routes(app):  # pylint: disable=too-many-statements
 
     @app.route('/')
     def index():
-        """Display list of all warehouses."""
-        warehouses = Warehouse.query.order_by(Warehouse.name).all()
-        return render_template('index.html', warehouses=warehouses)
+        """Display a page of warehouses with their item counts."""
+        cursor = parse_cursor()
+        limit = app.config['WAREHOUSES_PER_PAGE']
+
+        def render():
+            warehouses, next_page = cached_summaries(cursor, limit)
+            return render_template(
+                'index.html', warehouses=warehouses, next_page=next_page
+            )
+        return get_cache().get_or_set('index', f'page:{cursor}:{limit}',
+                                      render)
 
     @app.route('/warehouse/create', methods=['POST'])
     def create_warehouse():
-        """Create a new warehouse."""
+        """Create a new warehouse with an optional capacity."""
         name = request.form.get('name', '').strip()
+        capacity = request.form.get('capacity', '').strip()
+        limit = parse_capacity(capacity)
+        if capacity and limit is None:
+            return jsonify(error='capacity must be a positive integer'), 400
         if name:
-            warehouse = Warehouse(name=name)
-            db.session.add(warehouse)
+            add_warehouse(name, limit)
             db.session.commit()
         return redirect(url_for('index'))
 
@@ -39,11 +75,54 @@ def register_warehouse_routes(app):  # pylint: disable=too-many-statements
 
     @app.route('/warehouse/<int:warehouse_id>')
     def view_warehouse(warehouse_id):
-        """View a specific warehouse and its items."""
-        warehouse = db.session.get(Warehouse, warehouse_id)
-        if not warehouse:
-            return redirect(url_for('index'))
-        return render_template('warehouse.html', warehouse=warehouse)
+        """View a specific warehouse and a page of its items."""
+        page = parse_item_page()
+        if app.config['STREAM_WAREHOUSE_PAGES']:
+            response = render_warehouse(warehouse_id, page, stream_template)
+        else:
+            response = get_cache().get_or_set(
+                f'warehouse:{warehouse_id}', f'page:{page}',
+                lambda: render_warehouse(warehouse_id, page, render_template)
+            )
+        return response or redirect(url_for('index'))
+
+
+def render_warehouse(warehouse_id, page, render):
+    """Render a page of a warehouse, or return None if it does not exist.
+
+    ``page`` is the (after, prefix, limit) of the item page.
+    """
+    warehouse = db.session.get(Warehouse, warehouse_id)
+    if not warehouse:
+        return None
+    after, prefix, limit = page
+    items = warehouse_items(warehouse_id, after, prefix, limit)
+    return render(
+        'warehouse.html', warehouse=warehouse, items=items, prefix=prefix
+    )
+
+
+def cached_summaries(cursor, limit):
+    """Return a cached page of warehouse summaries and the next cursor."""
+    def compute():
+        return pack_summaries(*gather_summaries(cursor, limit))
+    return unpack_summaries(get_cache().get_or_set(
+        'index', f'summaries:{cursor}:{limit}', compute
+    ))
+
+
+def pack_summaries(rows, next_page):
+    """Return a summary page in a form any cache backend can store."""
+    return [list(row) for row in rows], next_page
+
+
+def unpack_summaries(packed):
+    """Return the summary rows and next cursor of a cached summary page."""
+    rows, next_page = packed
+    return (
+        [WarehouseSummary(*row) for row in rows],
+        tuple(next_page) if next_page else None
+    )
 
 
 def register_item_routes(app):
@@ -63,26 +142,172 @@ def register_item_routes(app):
     )
     def delete_item(warehouse_id, item_id):
         """Remove an item from a warehouse."""
-        item = db.session.get(Item, item_id)
-        if item and item.warehouse_id == warehouse_id:
-            db.session.delete(item)
-            db.session.commit()
+        run_write(remove_item, warehouse_id, item_id)
+        return redirect(url_for('view_warehouse', warehouse_id=warehouse_id))
+
+
+def register_stock_routes(app):
+    """Register stock adjustment routes."""
+
+    @app.route(
+        '/warehouse/<int:warehouse_id>/item/<int:item_id>/adjust',
+        methods=['POST']
+    )
+    def adjust_item(warehouse_id, item_id):
+        """Add to or take from the quantity of an item."""
+        adjust_stock(
+            warehouse_id, item_id, request.form.get('action'),
+            parse_quantity(request.form.get('amount', 0))
+        )
+        db.session.commit()
         return redirect(url_for('view_warehouse', warehouse_id=warehouse_id))
 
+    @app.route('/warehouse/<int:warehouse_id>/items/adjust', methods=['POST'])
+    def adjust_items(warehouse_id):
+        """Apply a JSON batch of adjustments in one transaction."""
+        adjustments = parse_adjustments()
+        if adjustments is None:
+            return jsonify(error='adjustments must be a list of objects '
+                                 'with integer item ids'), 400
+        return jsonify(results=adjust_many(warehouse_id, adjustments))
+
+
+def register_bulk_routes(app):
+    """Register bulk import and export routes."""
+
+    @app.route('/warehouse/<int:warehouse_id>/items/import', methods=['POST'])
+    def import_warehouse_items(warehouse_id):
+        """Import items into a warehouse from an uploaded CSV/NDJSON file."""
+        upload = request.files.get('file')
+        if upload and db.session.get(Warehouse, warehouse_id):
+            try:
+                import_upload(warehouse_id, upload,
+                              app.config['BULK_CHUNK_SIZE'])
+            except UnicodeDecodeError:
+                return jsonify(error='file must be UTF-8 text'), 400
+        return redirect(url_for('view_warehouse', warehouse_id=warehouse_id))
+
+    @app.route(
+        '/warehouse/<int:warehouse_id>/items/export.<any(csv, ndjson):fmt>'
+    )
+    def export_warehouse_items(warehouse_id, fmt):
+        """Stream all items of a warehouse as a CSV or NDJSON download."""
+        if not db.session.get(Warehouse, warehouse_id):
+            return redirect(url_for('index'))
+        export, mimetype = EXPORT_FORMATS[fmt]
+        return Response(
+            stream_with_context(export(warehouse_id)),
+            mimetype=mimetype,
+            headers={'Content-Disposition':
+                     f'attachment; filename=warehouse-{warehouse_id}.{fmt}'}
+        )
+
+
+def import_upload(warehouse_id, upload, chunk_size):
+    """Import an uploaded CSV or NDJSON file into a warehouse."""
+    stream = io.TextIOWrapper(upload.stream, encoding='utf-8', newline='')
+    parse = parse_csv
+    if upload.filename.endswith(('.ndjson', '.jsonl')):
+        parse = parse_ndjson
+    import_items(warehouse_id, parse(stream), chunk_size)
+
+
+def register_search_routes(app):
+    """Register the item search page."""
+
+    @app.route('/search')
+    def search():
+        """Show a page of the items of all warehouses matching a search."""
+        text, after, limit = parse_search()
+        return render_template(
+            'search.html', text=text, page=search_items(text, after, limit)
+        )
+
 
 def save_item(warehouse_id):
     """Save an item to the database."""
-    name = request.form.get('name', '').strip()
-    quantity = parse_quantity(request.form.get('quantity', 0))
-    if name and quantity > 0:
-        item = Item(name=name, quantity=quantity, warehouse_id=warehouse_id)
-        db.session.add(item)
-        db.session.commit()
+    cleaned = clean_item(
+        request.form.get('name', ''), request.form.get('quantity', 0)
+    )
+    if cleaned:
+        run_write(insert_item, warehouse_id, *cleaned)
+
+
+def insert_item(warehouse_id, name, quantity):
+    """Add an item to a warehouse in the current transaction.
+
+    Only as much of the quantity as fits in the warehouse is stored, and
+    nothing is added to a full warehouse. Returns whether it was added.
+    """
+    result = db.session.execute(clamped_item_insert(), {
+        'name': name, 'quantity': quantity, 'warehouse_id': warehouse_id
+    })
+    if result.rowcount:
+        touch_warehouse(warehouse_id)
+    return bool(result.rowcount)
+
+
+def remove_item(warehouse_id, item_id):
+    """Delete an item of a warehouse in the current transaction.
+
+    Returns whether the item existed in that warehouse.
+    """
+    item = db.session.get(Item, item_id)
+    if not item or item.warehouse_id != warehouse_id:
+        return False
+    db.session.delete(item)
+    touch_warehouse(warehouse_id)
+    return True
+
+
+def json_object():
+    """Return the JSON object of the request body, or None if not one."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
+
+def parse_adjustments():
+    """Parse (item_id, action, amount) tuples from a JSON request body.
+
+    Entries that are not objects are skipped. Returns None unless the
+    body is an object whose ``adjustments`` list has integer item ids.
+    """
+    data = json_object()
+    entries = data.get('adjustments', []) if data is not None else None
+    if not isinstance(entries, list):
+        return None
+    adjustments = [
+        (entry.get('item_id'), entry.get('action'),
+         parse_quantity(entry.get('amount')))
+        for entry in entries if isinstance(entry, dict)
+    ]
+    if not all(is_id(item_id) for item_id, _, _ in adjustments):
+        return None
+    return adjustments
+
+
+def parse_item_page():
+    """Parse the (after, prefix, limit) of a warehouse's item page."""
+    return (
+        request.args.get('after', type=int),
+        request.args.get('prefix', '').strip(),
+        current_app.config['ITEMS_PER_PAGE']
+    )
+
+
+def parse_search():
+    """Parse the (text, after, limit) of a page of search results."""
+    return (
+        request.args.get('q', '').strip(),
+        request.args.get('after', 0, type=int),
+        current_app.config['SEARCH_RESULTS_PER_PAGE']
+    )
 
 
-def parse_quantity(value):
-    """Parse quantity from form input."""
-    try:
-        return int(value)
-    except ValueError:
-        return 0
+def parse_cursor():
+    """Parse the (name, id) keyset cursor of the warehouse list."""
+    name = request.args.get('after_name')
+    warehouse_id = request.args.get('after_id', type=int)
+    if name is None or warehouse_id is None:
+        return None
+    return name, warehouse_id
@@ -0,0 +1,82 @@
+"""Schema preparation and fast start of up-to-date databases.
+
+Preparing a database creates missing tables, upgrades existing ones, and
+creates the search index and capacity triggers, which reflects every
+table of every database. Once a database is prepared its
+``PRAGMA user_version`` is set to a marker computed from the DDL of the
+whole schema. With FAST_START, a database that carries the current
+marker is not reflected at all, and since any change to the schema
+changes the marker, older databases are still upgraded.
+
+A prepared database can be serialized and loaded into the in-memory
+database of a new app through DATABASE_TEMPLATE, so that test suites
+creating an app per test prepare the schema only once.
+"""
+import zlib
+from functools import cache
+from sqlalchemy.schema import CreateIndex, CreateTable
+from web.capacity import (
+    CAPACITY_STATE, CAPACITY_TRIGGERS, create_capacity_triggers
+)
+from web.migrations import upgrade_schema
+from web.models import db
+from web.search import (
+    SEARCH_STATE, SEARCH_TABLE, SEARCH_TRIGGERS, create_search_index
+)
+from web.sharding import SHARD_LAYOUT
+
+
+@cache
+def schema_version():
+    """Return the schema marker, a positive 31-bit checksum of its DDL."""
+    ddl = [SEARCH_TABLE, *SEARCH_STATE, *SEARCH_TRIGGERS, *CAPACITY_STATE,
+           *CAPACITY_TRIGGERS, SHARD_LAYOUT]
+    for table in db.metadata.sorted_tables:
+        ddl.append(str(CreateTable(table)))
+        ddl += sorted(str(CreateIndex(index)) for index in table.indexes)
+    return zlib.crc32('\n'.join(ddl).encode()) % 0x7fffffff + 1
+
+
+def stored_version(engine):
+    """Return the schema marker stored in a database, 0 if there is none."""
+    with engine.connect() as connection:
+        return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def prepare_schema(engine, fast_start=False):
+    """Create or upgrade the schema of a database and mark it current.
+
+    With fast_start, a database already marked current is left as is.
+    """
+    if fast_start and stored_version(engine) == schema_version():
+        return
+    db.metadata.create_all(engine)
+    upgrade_schema(engine)
+    create_search_index(engine)
+    create_capacity_triggers(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(SHARD_LAYOUT)
+        connection.exec_driver_sql(
+            f'PRAGMA user_version = {schema_version()}'
+        )
+
+
+def is_memory_database(engine):
+    """Return whether an engine's database lives in memory."""
+    return engine.url.database in (None, '', ':memory:')
+
+
+def serialize_database(engine):
+    """Return the contents of a database as bytes for DATABASE_TEMPLATE."""
+    with engine.connect() as connection:
+        return connection.connection.driver_connection.serialize()
+
+
+def load_template(engine, template):
+    """Replace the contents of an in-memory database with a template.
+
+    The template is loaded into the engine's single connection, so the
+    database must be ``sqlite:///:memory:``.
+    """
+    with engine.connect() as connection:
+        connection.connection.driver_connection.deserialize(template)
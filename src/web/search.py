@@ -0,0 +1,219 @@
+"""Full-text search of items across all warehouses.
+
+Item names are indexed by an SQLite FTS5 table whose triggers keep it in
+step with the item table, so added, renamed and deleted items, including
+those of a deleted warehouse, are reindexed in the same transaction.
+Bulk imports switch the insert trigger off for each chunk they commit
+and record its ids as pending, and the whole import is indexed with one
+statement at its end, since FTS5 writes the index far faster in one
+large transaction than in many small ones. The triggers leave pending
+items alone, and searches do not find them until the import ends.
+Pending items of an import that did not finish are indexed by the next
+import or when the schema is prepared. The index stores prefixes of up
+to SEARCH_PREFIX_LENGTH characters, so a search reads only the hits of
+the page it returns.
+Hits are ordered by item id and paged with an id cursor; with sharded
+warehouses each shard is searched in parallel and the cursor also
+encodes the shard.
+"""
+import heapq
+import itertools
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from sqlalchemy import column, func, inspect, literal_column, table
+from web.models import db, Warehouse, Item
+from web.sharding import get_shards, query_shards
+
+SEARCH_PREFIX_LENGTH = 5
+
+SEARCH_TABLE = (
+    "CREATE VIRTUAL TABLE item_search USING fts5("
+    "name, content='item', content_rowid='id', prefix='1 2 3 4 5')"
+)
+
+SEARCH_STATE = (
+    "CREATE TABLE IF NOT EXISTS item_search_state ("
+    "id INTEGER PRIMARY KEY CHECK (id = 1), deferred BOOLEAN NOT NULL)",
+    "INSERT OR IGNORE INTO item_search_state VALUES (1, 0)",
+    "CREATE TABLE IF NOT EXISTS item_search_pending ("
+    "first_id INTEGER PRIMARY KEY, last_id INTEGER NOT NULL)",
+)
+
+
+def _indexed(row):
+    """Return the trigger condition that an item row is not pending."""
+    return (
+        "coalesce((SELECT last_id FROM item_search_pending "
+        f"WHERE first_id <= {row}.id ORDER BY first_id DESC LIMIT 1), 0) "
+        f"< {row}.id"
+    )
+
+
+SEARCH_TRIGGERS = (
+    "CREATE TRIGGER item_search_insert AFTER INSERT ON item "
+    "WHEN NOT (SELECT deferred FROM item_search_state) "
+    f"AND {_indexed('new')} "
+    "BEGIN INSERT INTO item_search(rowid, name) "
+    "VALUES (new.id, new.name); END",
+    "CREATE TRIGGER item_search_delete AFTER DELETE ON item "
+    f"WHEN {_indexed('old')} "
+    "BEGIN INSERT INTO item_search(item_search, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER item_search_rename AFTER UPDATE OF name ON item "
+    f"WHEN {_indexed('old')} "
+    "BEGIN INSERT INTO item_search(item_search, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    "INSERT INTO item_search(rowid, name) VALUES (new.id, new.name); END",
+)
+
+INDEX_PENDING = (
+    "INSERT INTO item_search(rowid, name) "
+    "SELECT item.id, item.name FROM item_search_pending "
+    "JOIN item ON item.id BETWEEN first_id AND last_id",
+    "DELETE FROM item_search_pending",
+)
+
+ITEM_SEARCH = table('item_search', column('rowid'))
+
+SearchPage = namedtuple('SearchPage', ['hits', 'totals', 'next_after'])
+NameTotal = namedtuple(
+    'NameTotal', ['name', 'total_quantity', 'warehouse_count']
+)
+
+
+def create_search_index(engine):
+    """Create the item search index and its triggers, or update them.
+
+    Items that already exist are indexed when the index is created, and
+    pending items are indexed.
+    """
+    with engine.begin() as connection:
+        if not inspect(connection).has_table('item_search'):
+            connection.exec_driver_sql(SEARCH_TABLE)
+            connection.exec_driver_sql(
+                "INSERT INTO item_search(item_search) VALUES ('rebuild')"
+            )
+        for statement in SEARCH_STATE:
+            connection.exec_driver_sql(statement)
+        current = set(connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger'"
+        ).scalars())
+        for statement in set(SEARCH_TRIGGERS) - current:
+            connection.exec_driver_sql(
+                f'DROP TRIGGER IF EXISTS {statement.split()[2]}'
+            )
+            connection.exec_driver_sql(statement)
+        for statement in INDEX_PENDING:
+            connection.exec_driver_sql(statement)
+
+
+@contextmanager
+def deferred_indexing():
+    """Leave the items inserted in the block out of the search index.
+
+    The insert trigger is switched off inside the current transaction
+    only, so other connections keep indexing their inserts. The ids
+    inserted in the block are recorded as pending, to be indexed by
+    ``index_pending``. If the block fails, rolling the transaction back
+    switches the trigger on again.
+    """
+    db.session.execute(db.text('UPDATE item_search_state SET deferred = 1'))
+    last_id = db.session.scalar(db.select(func.max(Item.id))) or 0
+    yield
+    inserted_id = db.session.scalar(db.select(func.max(Item.id))) or 0
+    if inserted_id > last_id:
+        db.session.execute(
+            db.text('INSERT INTO item_search_pending VALUES (:first, :last)'),
+            {'first': last_id + 1, 'last': inserted_id}
+        )
+    db.session.execute(db.text('UPDATE item_search_state SET deferred = 0'))
+
+
+def index_pending():
+    """Index every pending item in the current transaction."""
+    for statement in INDEX_PENDING:
+        db.session.execute(db.text(statement))
+
+
+def match_expression(text):
+    """Return the FTS5 query requiring every word of a search text.
+
+    Words of up to SEARCH_PREFIX_LENGTH characters match any word they
+    start. Longer words match whole words only, since expanding a prefix
+    the index does not store reads every row it matches.
+    """
+    return ' '.join(
+        f'"{word}"*' if len(word) <= SEARCH_PREFIX_LENGTH else f'"{word}"'
+        for word in re.findall(r'[^\W_]+', text.lower())
+    )
+
+
+def search_hits_query(match, after=0, limit=50):
+    """Return the statement selecting a page of items matching a query.
+
+    ``after`` is the id of the last item on the previous page. One extra
+    row is selected to tell whether a next page exists.
+    """
+    return (
+        db.select(
+            Item.id, Item.name, Item.quantity, Item.warehouse_id,
+            Warehouse.name.label('warehouse_name')
+        )
+        .select_from(ITEM_SEARCH)
+        .join(Item, Item.id == ITEM_SEARCH.c.rowid)
+        .join(Warehouse, Warehouse.id == Item.warehouse_id)
+        .where(literal_column('item_search').op('MATCH')(match),
+               ITEM_SEARCH.c.rowid > after)
+        .order_by(ITEM_SEARCH.c.rowid)
+        .limit(limit + 1)
+    )
+
+
+def name_totals_query(names):
+    """Return the statement totalling the items with the given names."""
+    return (
+        db.select(
+            Item.name,
+            func.sum(Item.quantity).label('total_quantity'),
+            func.count(Item.warehouse_id.distinct()).label('warehouse_count')
+        )
+        .where(Item.name.in_(names))
+        .group_by(Item.name)
+    )
+
+
+def name_totals(names):
+    """Return the total quantity and warehouses of each item name."""
+    totals = {}
+    for page in query_shards(lambda _shard: name_totals_query(names)):
+        for name, quantity, warehouses in page:
+            previous = totals.get(name, (0, 0))
+            totals[name] = (previous[0] + quantity, previous[1] + warehouses)
+    return [NameTotal(name, *totals[name]) for name in sorted(totals)]
+
+
+def search_items(text, after=0, limit=50):
+    """Return a page of items whose names match a search text.
+
+    The page holds the hits with their warehouses, the totals of the
+    item names on the page across all warehouses, and the cursor of the
+    next page, or None on the last page. A hit's cursor is its item id
+    times the number of shards plus its shard's index.
+    """
+    match = match_expression(text)
+    if not match:
+        return SearchPage([], [], None)
+    count = len(get_shards().engines)
+    pages = query_shards(
+        lambda shard: search_hits_query(match, (after - shard) // count, limit)
+    )
+    hits = list(itertools.islice(heapq.merge(*(
+        [(row.id * count + shard, row) for row in page]
+        for shard, page in enumerate(pages)
+    )), limit + 1))
+    next_after = hits[limit - 1][0] if len(hits) > limit else None
+    rows = [row for _, row in hits[:limit]]
+    return SearchPage(
+        rows, name_totals(sorted({row.name for row in rows})), next_after
+    )
@@ -0,0 +1,173 @@
+"""Horizontal sharding of warehouses over several databases.
+
+With SHARD_DATABASE_URIS set, warehouses are spread over the main
+database and the listed ones, so that writes to warehouses on different
+shards do not wait for the same SQLite write lock. A warehouse and all
+its items live on shard ``(id - 1) % shards``. New warehouses go to the
+shards in turn and take the next id of their shard, and a request whose
+URL names a warehouse has its session routed to that warehouse's shard.
+The warehouse list is gathered from every shard in parallel by a thread
+pool and merged in name order.
+
+Since a warehouse's shard follows from its id, each shard records its
+place in the layout, and an app refuses to start if a database was a
+shard of another layout or holds warehouses of other shards, as an
+unsharded database turned into the first shard would.
+
+Item ids are only unique within a shard, so items are always addressed
+through their warehouse. Shard engines open their own connections, so
+the extra shards must be database files rather than
+``sqlite:///:memory:``.
+"""
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import create_engine, func
+from web.models import db, Warehouse, SHARD_ENGINE
+from web.queries import split_summaries, warehouse_summaries_query
+
+SHARD_LAYOUT = (
+    "CREATE TABLE IF NOT EXISTS shard_layout ("
+    "id INTEGER PRIMARY KEY CHECK (id = 1), "
+    "shard INTEGER NOT NULL, shards INTEGER NOT NULL)"
+)
+
+
+class Shards:
+    """Engines of an app's shards and a pool for querying them all.
+
+    The first shard is the default database of the app.
+    """
+
+    def __init__(self, engines):
+        """Initialize shards with the given engines."""
+        self.engines = engines
+        self.pool = None
+        if len(engines) > 1:
+            self.pool = ThreadPoolExecutor(len(engines), 'shard')
+        self._turns = itertools.count()
+
+    def engine_for(self, warehouse_id):
+        """Return the engine of the shard holding a warehouse."""
+        return self.engines[(warehouse_id - 1) % len(self.engines)]
+
+    def next_index(self):
+        """Return the index of the shard for a new warehouse."""
+        return next(self._turns) % len(self.engines)
+
+
+def init_sharding(app):
+    """Create the shard engines and route requests to their shards.
+
+    Must run in an app context after the database is bound to the app.
+    Returns the shards.
+    """
+    options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    shards = Shards([db.engine] + [
+        create_engine(uri, **options)
+        for uri in app.config['SHARD_DATABASE_URIS']
+    ])
+    app.extensions['shards'] = shards
+    if shards.pool is not None:
+        app.url_value_preprocessor(route_to_shard)
+    return shards
+
+
+def check_layout(engine, index, count):
+    """Check that a database can be shard index of count and record it.
+
+    A database without a recorded layout is checked for warehouses of
+    other shards first. Databases of a single shard record nothing, so
+    unsharded databases stay free to become shards. Raises RuntimeError
+    if the database belongs to another layout.
+    """
+    with engine.begin() as connection:
+        stored = connection.exec_driver_sql(
+            'SELECT shard, shards FROM shard_layout'
+        ).first()
+        if stored is not None and tuple(stored) != (index, count):
+            raise RuntimeError(f'{engine.url} is shard {stored[0] + 1} of '
+                               f'{stored[1]}, not {index + 1} of {count}')
+        if stored is None and count > 1:
+            if connection.exec_driver_sql(
+                'SELECT 1 FROM warehouse WHERE (id - 1) % ? != ? LIMIT 1',
+                (count, index)
+            ).first():
+                raise RuntimeError(f'{engine.url} holds warehouses of other '
+                                   f'shards than {index + 1} of {count}')
+            connection.exec_driver_sql(
+                'INSERT INTO shard_layout VALUES (1, ?, ?)', (index, count)
+            )
+
+
+def get_shards():
+    """Return the shards of the current app."""
+    return current_app.extensions['shards']
+
+
+def use_shard(engine):
+    """Send the statements of the current session to a shard's engine."""
+    db.session.info[SHARD_ENGINE] = engine
+
+
+def current_shard():
+    """Return the shard engine of the current session, if it is routed."""
+    return db.session.info.get(SHARD_ENGINE)
+
+
+def route_to_shard(_endpoint, values):
+    """Route the session of a request naming a warehouse to its shard."""
+    if values and 'warehouse_id' in values:
+        use_shard(get_shards().engine_for(values['warehouse_id']))
+
+
+def add_warehouse(name, capacity=None):
+    """Add a warehouse on the next shard in the current transaction.
+
+    The id is computed by the INSERT itself, so concurrent writers to a
+    shard cannot take the same id. Returns the warehouse.
+    """
+    shards = get_shards()
+    warehouse = Warehouse(name=name, capacity=capacity)
+    if shards.pool is not None:
+        index, count = shards.next_index(), len(shards.engines)
+        use_shard(shards.engines[index])
+        warehouse.id = db.select(
+            func.coalesce(func.max(Warehouse.id), index + 1 - count) + count
+        ).scalar_subquery()
+    db.session.add(warehouse)
+    return warehouse
+
+
+def fetch_all(engine, query):
+    """Return all rows of a query on its own connection to an engine."""
+    with engine.connect() as connection:
+        return connection.execute(query).all()
+
+
+def query_shards(build):
+    """Return the rows of the statement ``build(index)`` on every shard.
+
+    With a single database the statement runs on the session; shards are
+    queried in parallel on connections of their own.
+    """
+    shards = get_shards()
+    if shards.pool is None:
+        return [db.session.execute(build(0)).all()]
+    return list(shards.pool.map(
+        fetch_all, shards.engines, map(build, range(len(shards.engines)))
+    ))
+
+
+def gather_summaries(after=None, limit=50):
+    """Return a page of warehouse summaries from every shard.
+
+    The pages of the shards are merged in (name, id) order, so the page
+    and cursor are those of an unsharded listing.
+    """
+    pages = query_shards(
+        lambda _shard: warehouse_summaries_query(after, limit)
+    )
+    rows = heapq.merge(*pages, key=lambda row: (row.name, row.id))
+    return split_summaries(list(itertools.islice(rows, limit + 1)), limit)
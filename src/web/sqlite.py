@@ -0,0 +1,53 @@
+"""SQLite connection tuning for the warehouse application."""
+from sqlalchemy import event
+
+
+def install_pragmas(engine, pragmas):
+    """Run the given PRAGMA statements on every new SQLite connection."""
+    if not pragmas or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
+def install_savepoints(engine):
+    """Keep savepoints inside their transaction on SQLite connections.
+
+    The sqlite3 module only begins a transaction before a data change,
+    so a SAVEPOINT issued first would begin the transaction itself and
+    releasing it would commit everything. The transaction is begun
+    before such a savepoint instead.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'savepoint')
+    def begin_transaction(connection, _name):
+        dbapi_connection = connection.connection.driver_connection
+        if not dbapi_connection.in_transaction:
+            dbapi_connection.execute('BEGIN')
+
+
+def begin_immediate(connection):
+    """Take the write lock for the rest of a SQLite connection's transaction.
+
+    SQLite otherwise takes it at the transaction's first change, so what
+    was read before that could be changed by other writers. Does nothing
+    if the transaction has already begun or on other databases.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    dbapi_connection = connection.connection.driver_connection
+    if not dbapi_connection.in_transaction:
+        dbapi_connection.execute('BEGIN IMMEDIATE')
+
+
+def configure_engine(engine, pragmas):
+    """Install the pragmas and savepoint handling on an app engine."""
+    install_pragmas(engine, pragmas)
+    install_savepoints(engine)
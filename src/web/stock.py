@@ -0,0 +1,96 @@
+"""Atomic stock adjustments for warehouse items.
+
+Quantities are changed with single conditional UPDATE statements instead
+of loading and saving the item, so concurrent adjustments never overwrite
+each other. The semantics mirror Varasto: negative amounts change
+nothing, adding more than fits in the warehouse fills it to capacity,
+and taking more than is in stock empties the item. Both return the
+amount actually applied.
+"""
+from sqlalchemy import select, update
+from web.capacity import fits
+from web.models import db, Warehouse, Item, touch_warehouse
+
+
+def _item_update(warehouse_id, item_id, *conditions):
+    """Return an UPDATE statement for one item of a warehouse."""
+    return (
+        update(Item)
+        .where(Item.id == item_id, Item.warehouse_id == warehouse_id,
+               *conditions)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def add_stock(warehouse_id, item_id, amount):
+    """Add up to amount to an item and return the amount added.
+
+    The UPDATE only matches while the whole amount fits in the warehouse.
+    If it does not match, the free capacity is read and the addition is
+    retried for that, so the warehouse never goes over its capacity.
+    """
+    added = amount
+    while added > 0:
+        result = db.session.execute(
+            _item_update(warehouse_id, item_id, fits(warehouse_id, added))
+            .values(quantity=Item.quantity + added)
+        )
+        if result.rowcount:
+            return added
+        free = db.session.scalar(
+            select(Warehouse.free).join(Item)
+            .where(Item.id == item_id, Item.warehouse_id == warehouse_id)
+        )
+        added = min(amount, free or 0)
+    return 0
+
+
+def take_stock(warehouse_id, item_id, amount):
+    """Take up to amount from an item and return the amount taken.
+
+    The UPDATE only matches while at least the requested amount is in
+    stock. If it does not match, the remaining quantity is read and the
+    take is retried for that, so the result never goes below zero.
+    """
+    taken = amount
+    while taken > 0:
+        result = db.session.execute(
+            _item_update(warehouse_id, item_id, Item.quantity >= taken)
+            .values(quantity=Item.quantity - taken)
+        )
+        if result.rowcount:
+            return taken
+        remaining = db.session.scalar(
+            select(Item.quantity)
+            .where(Item.id == item_id, Item.warehouse_id == warehouse_id)
+        )
+        taken = min(amount, remaining or 0)
+    return 0
+
+
+ADJUSTMENTS = {'add': add_stock, 'take': take_stock}
+
+
+def adjust_stock(warehouse_id, item_id, action, amount):
+    """Apply an 'add' or 'take' adjustment and return the amount applied."""
+    adjust = ADJUSTMENTS.get(action)
+    if adjust is None:
+        return 0
+    applied = adjust(warehouse_id, item_id, amount)
+    if applied:
+        touch_warehouse(warehouse_id)
+    return applied
+
+
+def adjust_many(warehouse_id, adjustments):
+    """Apply many adjustments in one transaction.
+
+    ``adjustments`` is an iterable of ``(item_id, action, amount)``
+    tuples. Returns the amounts applied in the same order.
+    """
+    results = [
+        adjust_stock(warehouse_id, item_id, action, amount)
+        for item_id, action, amount in adjustments
+    ]
+    db.session.commit()
+    return results
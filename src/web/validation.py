@@ -0,0 +1,44 @@
+"""Validation of item input for the warehouse application."""
+
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def parse_quantity(value):
+    """Parse quantity from form input or a JSON value.
+
+    Invalid input, JSON numbers that are not integers, booleans and
+    quantities outside SQLite's 64-bit integer range parse as 0.
+    """
+    if isinstance(value, (bool, float)):
+        return 0
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return 0
+    return quantity if abs(quantity) <= MAX_INTEGER else 0
+
+
+def is_id(value):
+    """Return whether a JSON value is a valid row id."""
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and 0 < value <= MAX_INTEGER)
+
+
+def clean_item(name, quantity):
+    """Return a validated (name, quantity) pair, or None if invalid.
+
+    Names must be strings, so JSON values such as null are not items.
+    """
+    if not isinstance(name, str):
+        return None
+    name = name.strip()
+    quantity = parse_quantity(quantity)
+    if name and quantity > 0:
+        return name, quantity
+    return None
+
+
+def parse_capacity(value):
+    """Parse an optional warehouse capacity; None means no limit."""
+    capacity = parse_quantity(value)
+    return capacity if capacity > 0 else None